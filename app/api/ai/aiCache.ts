@@ -0,0 +1,140 @@
+import fs from 'fs';
+import path from 'path';
+import crypto from 'crypto';
+import type { AIProvider } from './providers';
+
+// Response cache for /api/ai. Completions are keyed on a hash of the provider
+// id and the normalized prompt (line endings and trailing whitespace don't
+// count). Recent completions live in an in-memory LRU; with DSA_AI_CACHE_DIR
+// set they are also written there and survive eviction and restarts. While a
+// prompt is being generated, identical requests attach to the same generation
+// and receive its chunks (from the start) as they arrive.
+
+const MAX_MEMORY_ENTRIES = 128;
+const CACHE_TTL_MS = Number(process.env.DSA_AI_CACHE_TTL_MS) || 24 * 60 * 60 * 1000;
+const CACHE_DIR = process.env.DSA_AI_CACHE_DIR || '';
+
+export type CompletionSource = 'cache' | 'coalesced' | 'model';
+
+// Map iteration order is insertion order, so the first key is the least recently used
+const memory = new Map<string, { text: string; created: number }>();
+const inFlight = new Map<string, Generation>();
+
+// One model call, readable by any number of requests while it runs
+class Generation {
+  chunks: string[] = [];
+  done = false;
+  error: Error | null = null;
+  private waiters: (() => void)[] = [];
+
+  push(text: string) {
+    this.chunks.push(text);
+    this.wake();
+  }
+
+  finish(error: Error | null = null) {
+    this.done = true;
+    this.error = error;
+    this.wake();
+  }
+
+  private wake() {
+    const waiters = this.waiters;
+    this.waiters = [];
+    for (const wake of waiters) wake();
+  }
+
+  async *read(): AsyncGenerator<string> {
+    let next = 0;
+    while (true) {
+      while (next < this.chunks.length) yield this.chunks[next++];
+      if (this.error) throw this.error;
+      if (this.done) return;
+      await new Promise<void>((resolve) => this.waiters.push(resolve));
+    }
+  }
+}
+
+export function normalizePrompt(prompt: string) {
+  return prompt.replace(/\r\n?/g, '\n').replace(/[ \t]+$/gm, '').trim();
+}
+
+function cachePath(key: string) {
+  return path.join(CACHE_DIR, `${key}.json`);
+}
+
+function remember(key: string, entry: { text: string; created: number }) {
+  memory.delete(key);
+  memory.set(key, entry);
+  while (memory.size > MAX_MEMORY_ENTRIES) {
+    memory.delete(memory.keys().next().value);
+  }
+}
+
+async function lookup(key: string): Promise<string | null> {
+  const cached = memory.get(key);
+  if (cached && Date.now() - cached.created < CACHE_TTL_MS) {
+    remember(key, cached);
+    return cached.text;
+  }
+  memory.delete(key);
+  if (!CACHE_DIR) return null;
+  try {
+    const entry = JSON.parse(await fs.promises.readFile(cachePath(key), 'utf8'));
+    if (Date.now() - entry.created >= CACHE_TTL_MS) return null;
+    remember(key, entry);
+    return entry.text;
+  } catch {
+    return null;
+  }
+}
+
+async function store(key: string, text: string) {
+  const entry = { text, created: Date.now() };
+  remember(key, entry);
+  if (!CACHE_DIR) return;
+  try {
+    // Completions echo user code: keep them readable by this user only
+    await fs.promises.mkdir(CACHE_DIR, { recursive: true, mode: 0o700 });
+    await fs.promises.writeFile(cachePath(key), JSON.stringify(entry), { mode: 0o600 });
+  } catch {
+    // Disk tier unavailable: the completion is still served from memory until evicted
+  }
+}
+
+async function generate(key: string, generation: Generation, provider: AIProvider, prompt: string) {
+  try {
+    for await (const text of provider.stream(prompt)) generation.push(text);
+    // Failed or aborted generations are not cached
+    await store(key, generation.chunks.join(''));
+    generation.finish();
+  } catch (error: any) {
+    generation.finish(error instanceof Error ? error : new Error(String(error)));
+  } finally {
+    inFlight.delete(key);
+  }
+}
+
+// The completion for `prompt` as a stream of text chunks, plus where it came from
+export async function completion(provider: AIProvider, prompt: string): Promise<{ source: CompletionSource; chunks: AsyncIterable<string> }> {
+  const normalized = normalizePrompt(prompt);
+  const key = crypto.createHash('sha256').update(`${provider.id}\0${normalized}`).digest('hex');
+
+  const running = inFlight.get(key);
+  if (running) return { source: 'coalesced', chunks: running.read() };
+
+  const cached = await lookup(key);
+  if (cached !== null) {
+    return { source: 'cache', chunks: (async function* () { yield cached; })() };
+  }
+
+  // Another request may have started the same generation while the disk tier was read
+  const started = inFlight.get(key);
+  if (started) return { source: 'coalesced', chunks: started.read() };
+
+  const generation = new Generation();
+  inFlight.set(key, generation);
+  // Runs to completion even if this request goes away, so the result is cached for the others
+  generate(key, generation, provider, normalized);
+  return { source: 'model', chunks: generation.read() };
+}
@@ -0,0 +1,69 @@
+import { GoogleGenerativeAI } from '@google/generative-ai';
+
+// Model providers for /api/ai. A provider streams the completion for one
+// prompt as text chunks; DSA_AI_PROVIDER picks one ('gemini' by default, or
+// 'fake': a local deterministic model for testing the route without a key).
+
+export type AIProvider = {
+  // Part of the response cache key: switching model must not serve stale answers
+  id: string;
+  stream: (prompt: string) => AsyncIterable<string>;
+};
+
+const GEMINI_MODEL = 'gemini-2.0-flash';
+
+function geminiProvider(): AIProvider {
+  return {
+    id: `gemini:${GEMINI_MODEL}`,
+    async *stream(prompt) {
+      const genAI = new GoogleGenerativeAI(process.env.GEMINI_API_KEY!);
+      const model = genAI.getGenerativeModel({ model: GEMINI_MODEL });
+      const result = await model.generateContentStream({
+        contents: [{ role: 'user', parts: [{ text: prompt }] }],
+      });
+      for await (const chunk of result.stream) {
+        const text = chunk.text();
+        if (text) yield text;
+      }
+    },
+  };
+}
+
+// Echoes a summary of the prompt word by word, DSA_AI_FAKE_DELAY_MS apart
+function fakeProvider(): AIProvider {
+  const delayMs = Number(process.env.DSA_AI_FAKE_DELAY_MS ?? 20);
+  return {
+    id: 'fake',
+    async *stream(prompt) {
+      const lines = prompt.split('\n');
+      const reply = `**Fake model** (${prompt.length} characters, ${lines.length} lines)\n\n` +
+        '```\n' + lines.slice(1, 6).join('\n') + '\n```\n';
+      for (const word of reply.split(/(?<=\s)/)) {
+        if (delayMs > 0) await new Promise((resolve) => setTimeout(resolve, delayMs));
+        yield word;
+      }
+    },
+  };
+}
+
+const PROVIDERS: Record<string, () => AIProvider> = {
+  gemini: geminiProvider,
+  fake: fakeProvider,
+};
+
+let current: AIProvider | null = null;
+
+export function aiProvider(): AIProvider {
+  if (!current) {
+    const name = process.env.DSA_AI_PROVIDER || 'gemini';
+    const create = PROVIDERS[name];
+    if (!create) throw new Error(`Unknown AI provider: ${name}`);
+    current = create();
+  }
+  return current;
+}
+
+// Swap the provider in-process (tests, or a custom model behind the same route)
+export function setAIProvider(provider: AIProvider | null) {
+  current = provider;
+}
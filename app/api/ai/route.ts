@@ -1,10 +1,12 @@
 import { NextRequest, NextResponse } from 'next/server';
-import { GoogleGenerativeAI } from '@google/generative-ai';
-
-const GEMINI_API_KEY = process.env.GEMINI_API_KEY;
+import { aiProvider } from './providers';
+import { completion, CompletionSource } from './aiCache';
 
+// Code assistant: the completion streams back as NDJSON while it is generated
+// (or from the response cache, see aiCache.ts); {"stream": false} returns it
+// in one JSON body instead.
 export async function POST(req: NextRequest) {
-  const { prompt, type, code } = await req.json();
+  const { prompt, type, code, stream } = await req.json();
   let systemPrompt = '';
   if (type === 'explain') {
     systemPrompt = `You are an expert programming assistant. Explain the following code in detail, including its logic, purpose, and any important edge cases. Format your answer in clear sections with examples if possible.`;
@@ -15,22 +17,41 @@ export async function POST(req: NextRequest) {
   } else if (type === 'testcases') {
     systemPrompt = `You are a software testing expert. Suggest a comprehensive set of test cases (including edge cases) for the following code. For each test case, provide input and expected output. Format your answer as a markdown table with columns: Test Case Description | Input | Expected Output.`;
   }
+  let source: CompletionSource;
+  let chunks: AsyncIterable<string>;
   try {
-    const genAI = new GoogleGenerativeAI(GEMINI_API_KEY!);
-    const model = genAI.getGenerativeModel({ model: 'gemini-2.0-flash' });
-    const result = await model.generateContent({
-      contents: [
-        {
-          role: 'user',
-          parts: [
-            { text: `${systemPrompt}\n${code || prompt}` }
-          ]
-        }
-      ]
-    });
-    const text = result.response.text();
-    return NextResponse.json({ result: text });
+    ({ source, chunks } = await completion(aiProvider(), `${systemPrompt}\n${code || prompt}`));
   } catch (error: any) {
     return NextResponse.json({ error: error.message }, { status: 500 });
   }
-} 
\ No newline at end of file
+  const headers = { 'X-AI-Cache': source };
+
+  // Non-streaming clients get the whole completion in one JSON body
+  if (stream === false) {
+    try {
+      let text = '';
+      for await (const chunk of chunks) text += chunk;
+      return NextResponse.json({ result: text, source }, { headers });
+    } catch (error: any) {
+      return NextResponse.json({ error: error.message }, { status: 500 });
+    }
+  }
+
+  // Streamed: one JSON object per line, {"text"} chunks then {"done"} or {"error"}
+  const encoder = new TextEncoder();
+  const body = new ReadableStream({
+    async start(controller) {
+      const send = (message: Record<string, any>) => controller.enqueue(encoder.encode(JSON.stringify(message) + '\n'));
+      try {
+        for await (const text of chunks) send({ text });
+        send({ done: true, source });
+      } catch (error: any) {
+        send({ error: error.message });
+      }
+      controller.close();
+    },
+  });
+  return new Response(body, {
+    headers: { ...headers, 'Content-Type': 'application/x-ndjson; charset=utf-8', 'Cache-Control': 'no-cache' },
+  });
+}
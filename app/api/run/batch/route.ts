@@ -0,0 +1,106 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { spawn } from 'child_process';
+import path from 'path';
+import fs from 'fs';
+import os from 'os';
+
+const MAX_CASES = 100;
+const MAX_CONCURRENCY = 8;
+const DEFAULT_CASE_TIMEOUT_MS = 5000;
+const MAX_CASE_TIMEOUT_MS = 10000;
+
+// Trace one code body against many inputs / test cases. Cases fan out across a
+// pool of forked workers in py_batch.py that share the compiled prelude.
+export async function POST(req: NextRequest): Promise<NextResponse> {
+  const { language, code, cases, functionName, options } = await req.json();
+
+  if (language !== 'python') {
+    return NextResponse.json({ error: 'Batch tracing is only supported for Python.' }, { status: 400 });
+  }
+  if (!Array.isArray(cases) || cases.length === 0) {
+    return NextResponse.json({ error: 'Provide a non-empty "cases" array.' }, { status: 400 });
+  }
+  if (cases.length > MAX_CASES) {
+    return NextResponse.json({ error: `At most ${MAX_CASES} cases per batch.` }, { status: 400 });
+  }
+
+  const tracerScript = path.resolve(process.cwd(), 'app', 'api', 'run', 'py_batch.py');
+  if (!fs.existsSync(tracerScript)) {
+    return NextResponse.json({ error: `Tracer script not found: ${tracerScript}` }, { status: 500 });
+  }
+
+  const concurrency = Math.max(1, Math.min(Number(options?.concurrency) || os.cpus().length, MAX_CONCURRENCY));
+  const caseTimeoutMs = Math.max(100, Math.min(Number(options?.timeoutMs) || DEFAULT_CASE_TIMEOUT_MS, MAX_CASE_TIMEOUT_MS));
+  // Whole-batch guard: every wave of cases may use its full timeout, plus startup slack
+  const batchTimeoutMs = Math.ceil(cases.length / concurrency) * caseTimeoutMs + 5000;
+
+  return new Promise<NextResponse>((resolve) => {
+    const child = spawn('python3', [tracerScript], { stdio: ['pipe', 'pipe', 'pipe'] });
+
+    let result = '';
+    let error = '';
+    let timedOut = false;
+
+    const timeout = setTimeout(() => {
+      timedOut = true;
+      child.kill('SIGKILL');
+    }, batchTimeoutMs);
+
+    child.stdin.write(JSON.stringify({
+      code,
+      cases,
+      functionName,
+      concurrency,
+      timeout: caseTimeoutMs / 1000,
+      trace: options?.trace !== false,
+    }));
+    child.stdin.end();
+
+    child.stdout.on('data', data => {
+      result += data.toString();
+    });
+
+    child.stderr.on('data', data => {
+      error += data.toString();
+    });
+
+    child.on('close', (exitCode) => {
+      clearTimeout(timeout);
+
+      if (timedOut) {
+        resolve(NextResponse.json({ error: 'Batch timed out.' }, { status: 500 }));
+        return;
+      }
+
+      let batch: any;
+      try {
+        batch = JSON.parse(result);
+      } catch (e) {
+        resolve(NextResponse.json({ error: error || 'Failed to parse batch output.', stderr: error, exitCode }, { status: 500 }));
+        return;
+      }
+      if (batch.error) {
+        resolve(NextResponse.json({ error: batch.error, stderr: error }, { status: 500 }));
+        return;
+      }
+
+      const results: any[] = batch.results || [];
+      resolve(NextResponse.json({
+        results,
+        summary: {
+          total: results.length,
+          passed: results.filter(r => r?.passed === true).length,
+          failed: results.filter(r => r?.passed === false).length,
+          timedOut: results.filter(r => r?.timedOut).length,
+          timeMs: batch.timeMs,
+        },
+        stderr: error,
+      }));
+    });
+
+    child.on('error', (err) => {
+      clearTimeout(timeout);
+      resolve(NextResponse.json({ error: `Process error: ${err.message}` }, { status: 500 }));
+    });
+  });
+}
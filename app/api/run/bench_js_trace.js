@@ -0,0 +1,117 @@
+const fs = require('fs');
+const { Interpreter } = require('js-interpreter');
+const { traceJS } = require('./js_trace');
+
+// Benchmark for js_trace.js: the line-coalesced tracer against the previous
+// per-node tracer (one step per interpreter.step(), every scope property
+// converted each time), reproduced below. Reports median time, step count,
+// trace size and variable conversions for each.
+//
+// usage: node bench_js_trace.js [--runs N] [--json] [program.js]
+
+const SAMPLE_PROGRAM = `function bubbleSort(arr) {
+  var n = arr.length;
+  for (var i = 0; i < n; i++) {
+    for (var j = 0; j < n - i - 1; j++) {
+      if (arr[j] > arr[j + 1]) {
+        var tmp = arr[j];
+        arr[j] = arr[j + 1];
+        arr[j + 1] = tmp;
+      }
+    }
+  }
+  return arr;
+}
+var arr = [5, 3, 8, 1, 2, 9, 4, 7];
+console.log(bubbleSort(arr));
+`;
+
+// The previous tracer's stepping loop (visual detection left out: it only adds to its cost)
+function tracePerNode(code) {
+  const steps = [];
+  let output = '';
+  let conversions = 0;
+  const interpreter = new Interpreter(code, function(interpreter, globalObject) {
+    interpreter.setProperty(globalObject, 'console', interpreter.nativeToPseudo({
+      log: function(...args) {
+        output += args.join(' ') + '\n';
+      }
+    }));
+  });
+  let ok = true;
+  while (ok) {
+    ok = interpreter.step();
+    const scope = interpreter.getScope();
+    const properties = (scope.object || scope).properties;
+    const vars = {};
+    for (const name in properties) {
+      vars[name] = interpreter.pseudoToNative(properties[name]);
+      conversions++;
+    }
+    steps.push({
+      line: interpreter.stateStack[0]?.node.loc?.start?.line || 0,
+      variables: vars,
+      output,
+      stack: interpreter.stateStack.map(s => s.node.type),
+    });
+  }
+  return { steps, conversions };
+}
+
+function measure(fn, runs) {
+  const times = [];
+  let result;
+  for (let i = 0; i < runs; i++) {
+    const start = process.hrtime.bigint();
+    result = fn();
+    times.push(Number(process.hrtime.bigint() - start) / 1e6);
+  }
+  times.sort((a, b) => a - b);
+  return { ms: Math.round(times[Math.floor(times.length / 2)] * 1000) / 1000, result };
+}
+
+function main() {
+  const args = process.argv.slice(2);
+  const asJson = args.includes('--json');
+  const runs = args.includes('--runs') ? Number(args[args.indexOf('--runs') + 1]) : 5;
+  const file = args.find(a => a.endsWith('.js'));
+  const code = file ? fs.readFileSync(file, 'utf8') : SAMPLE_PROGRAM;
+
+  // Warm-up run each, not counted
+  tracePerNode(code);
+  traceJS(code, { maxSteps: Infinity });
+
+  const perNode = measure(() => tracePerNode(code), runs);
+  const coalesced = measure(() => traceJS(code, { maxSteps: Infinity }), runs);
+  const summary = {
+    node: process.version,
+    runs,
+    perNode: {
+      median_ms: perNode.ms,
+      steps: perNode.result.steps.length,
+      bytes: JSON.stringify(perNode.result.steps).length,
+      conversions: perNode.result.conversions,
+    },
+    coalesced: {
+      median_ms: coalesced.ms,
+      steps: coalesced.result.steps.length,
+      bytes: JSON.stringify(coalesced.result.steps).length,
+      conversions: coalesced.result.stats.converted,
+      reused: coalesced.result.stats.reused,
+      nodes: coalesced.result.stats.nodes,
+    },
+  };
+  if (asJson) {
+    console.log(JSON.stringify(summary));
+    return;
+  }
+
+  console.log(`Node ${summary.node}, ${runs} runs`);
+  for (const [label, s] of [['Per-node', summary.perNode], ['Coalesced', summary.coalesced]]) {
+    console.log(`${label.padEnd(10)} ${String(s.median_ms).padStart(10)} ms  ${String(s.steps).padStart(7)} steps  ${String(s.bytes).padStart(10)} bytes  ${String(s.conversions).padStart(8)} conversions`);
+  }
+  console.log(`Speed-up: ${(summary.perNode.median_ms / summary.coalesced.median_ms).toFixed(1)}x, ` +
+    `${(summary.perNode.bytes / summary.coalesced.bytes).toFixed(1)}x smaller`);
+}
+
+main();
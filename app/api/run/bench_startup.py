@@ -0,0 +1,106 @@
+import sys
+import os
+import json
+import time
+import statistics
+import subprocess
+
+# Startup benchmark for py_trace.py: module import cost (python -X importtime)
+# and end-to-end time to first traced step over a few runs.
+#
+# usage: python3 bench_startup.py [--runs N] [--json] [program.py]
+# With --json the summary is printed as one JSON object so it can be tracked over time.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TRACER = os.path.join(HERE, 'py_trace.py')
+
+SAMPLE_PROGRAM = '''def bubble_sort(arr):
+    n = len(arr)
+    for i in range(n):
+        for j in range(n - i - 1):
+            if arr[j] > arr[j + 1]:
+                arr[j], arr[j + 1] = arr[j + 1], arr[j]
+    return arr
+
+arr = [5, 3, 8, 1, 2]
+print(bubble_sort(arr))
+'''
+
+
+def import_times(code):
+    """Run the tracer once under -X importtime; returns (total_us, [(cumulative_us, module)])"""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', TRACER], input=code,
+                          capture_output=True, text=True, cwd=HERE)
+    imports = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Top-level imports only (nested ones are indented under their parent)
+        if not name.startswith('  '):
+            imports.append((int(cumulative), name.strip()))
+    imports.sort(reverse=True)
+    return sum(us for us, _ in imports), imports
+
+
+def timed_run(code):
+    """One end-to-end tracer run; returns the --timing dict plus wall-clock ms"""
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, TRACER, '--timing'], input=code,
+                          capture_output=True, text=True, cwd=HERE)
+    wall_ms = (time.perf_counter() - start) * 1000
+    timing = {}
+    for line in proc.stderr.splitlines():
+        if line.startswith('{'):
+            timing = json.loads(line)
+    timing['wall_ms'] = round(wall_ms, 3)
+    return timing
+
+
+def main():
+    args = sys.argv[1:]
+    as_json = '--json' in args
+    runs = 10
+    if '--runs' in args:
+        runs = int(args[args.index('--runs') + 1])
+    files = [a for a in args if a.endswith('.py')]
+    code = SAMPLE_PROGRAM
+    if files:
+        with open(files[0]) as f:
+            code = f.read()
+
+    total_us, imports = import_times(code)
+    # First run warms the OS page cache; not counted
+    timed_run(code)
+    samples = [timed_run(code) for _ in range(runs)]
+
+    def median(key):
+        values = [s[key] for s in samples if s.get(key) is not None]
+        return round(statistics.median(values), 3) if values else None
+
+    summary = {
+        'python': sys.version.split()[0],
+        'runs': runs,
+        'import_ms': round(total_us / 1000, 3),
+        'top_imports': [{'module': name, 'ms': round(us / 1000, 3)} for us, name in imports[:10]],
+        'median_import_ms': median('import_ms'),
+        'median_first_step_ms': median('first_step_ms'),
+        'median_total_ms': median('total_ms'),
+        'median_wall_ms': median('wall_ms'),
+    }
+    if as_json:
+        print(json.dumps(summary))
+        return
+
+    print(f"Python {summary['python']}, {runs} runs")
+    print(f"Imports (-X importtime): {summary['import_ms']} ms")
+    for entry in summary['top_imports']:
+        print(f"  {entry['ms']:8.3f} ms  {entry['module']}")
+    print(f"Median import:      {summary['median_import_ms']} ms")
+    print(f"Median first step:  {summary['median_first_step_ms']} ms")
+    print(f"Median total:       {summary['median_total_ms']} ms")
+    print(f"Median wall clock:  {summary['median_wall_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
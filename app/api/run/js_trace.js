@@ -1,8 +1,135 @@
 const { Interpreter } = require('js-interpreter');
-const readline = require('readline');
 
-function traceJS(code) {
-  let steps = [];
+// JavaScript tracer. The interpreter steps one AST node at a time; steps are
+// coalesced to one per executed source line, per entry into a different
+// function scope and per loop iteration (so a loop written on one line still
+// gets a step each time round), the granularity of the Python tracer's line
+// events.
+// Variables are converted from interpreter objects only when the code since
+// the previous step could have changed them: names assigned, updated or
+// passed to a call, and anything sharing an object with them. Everything else
+// reuses the previous step's converted value.
+//
+// Step format follows py_trace.py: {line, current_line, variables, output,
+// call_stack, stack, visuals, visual}. Linked-list nodes carry ids that stay
+// stable across steps, and grids use py_grid.py's keyframe / diff encoding.
+
+const MAX_STEPS = 1000;
+const TIMEOUT_MS = 8000;
+const MAX_OUTPUT_CHARS = 1000;
+const MAX_DEPTH = 32;
+// Same interval as py_grid.KEYFRAME_INTERVAL (in steps)
+const KEYFRAME_INTERVAL = 64;
+const POINTER_NAMES = ['i', 'j', 'k', 'left', 'right', 'mid', 'l', 'r', 'm', 'start', 'end', 'top', 'bottom', 'front', 'back', 'low', 'high'];
+const PIECES = ['Q', 'K', 'N', 'B', 'R', 'P'];
+// Nodes that only group statements; their own line isn't executed code
+const CONTAINER_NODES = new Set(['Program', 'BlockStatement']);
+
+function isPrimitive(v) {
+  return v === null || (typeof v !== 'object' && typeof v !== 'function');
+}
+
+const LOOP_NODES = new Set(['ForStatement', 'ForInStatement', 'ForOfStatement', 'WhileStatement', 'DoWhileStatement']);
+
+// Loop bodies: each entry into one starts an iteration
+function loopBodies(ast) {
+  const bodies = new Set();
+  const visit = (node) => {
+    if (!node || typeof node.type !== 'string') return;
+    if (LOOP_NODES.has(node.type)) bodies.add(node.body);
+    for (const key in node) {
+      const child = node[key];
+      if (key === 'loc' || !child || typeof child !== 'object') continue;
+      if (Array.isArray(child)) child.forEach(visit);
+      else visit(child);
+    }
+  };
+  visit(ast);
+  return bodies;
+}
+
+// Names declared at the top level of the program (hoisted into the global scope)
+function declaredNames(ast) {
+  const names = new Set();
+  const visit = (node) => {
+    if (!node || typeof node.type !== 'string') return;
+    if (node.type === 'FunctionDeclaration') {
+      names.add(node.id.name);
+      return;
+    }
+    if (node.type === 'FunctionExpression') return;
+    if (node.type === 'VariableDeclarator') names.add(node.id.name);
+    for (const key in node) {
+      const child = node[key];
+      if (key === 'loc' || !child || typeof child !== 'object') continue;
+      if (Array.isArray(child)) child.forEach(visit);
+      else visit(child);
+    }
+  };
+  visit(ast);
+  return names;
+}
+
+function cellState(v) {
+  if (typeof v === 'string') {
+    if (PIECES.includes(v)) return { state: 'piece', piece: v };
+    if (v === 'X') return { state: 'blocked' };
+    return null;
+  }
+  return v === 1 ? { state: 'visited' } : null;
+}
+
+// Keyframe / diff encoding of grid visuals, as in py_grid.GridEncoder
+function createGridEncoder() {
+  const grids = new Map();
+  return function encode(visual, source, rows, stepIndex) {
+    const prev = grids.get(visual.name);
+    if (!prev || prev.source !== source || prev.rows !== visual.rows || prev.cols !== visual.cols || stepIndex - prev.keyStep >= KEYFRAME_INTERVAL) {
+      const states = new Map();
+      rows.forEach((row, r) => row.forEach((v, c) => {
+        const state = cellState(v);
+        if (state) states.set(`${r},${c}`, state);
+      }));
+      grids.set(visual.name, {
+        source, rows: visual.rows, cols: visual.cols, prev: rows.map(row => row.slice()), states, keyStep: stepIndex, step: stepIndex,
+      });
+      visual.cells = rows.map(row => row.slice());
+      visual.cellStates = Array.from(states, ([key, s]) => {
+        const [row, col] = key.split(',').map(Number);
+        return { row, col, ...s };
+      });
+      return visual;
+    }
+    const cellDiffs = [];
+    const stateDiffs = [];
+    rows.forEach((row, r) => {
+      const old = prev.prev[r];
+      row.forEach((v, c) => {
+        if (v === old[c]) return;
+        cellDiffs.push([r, c, v]);
+        const key = `${r},${c}`;
+        const state = cellState(v);
+        if (JSON.stringify(state) !== JSON.stringify(prev.states.get(key) || null)) {
+          stateDiffs.push([r, c, state]);
+          if (state) prev.states.set(key, state);
+          else prev.states.delete(key);
+        }
+      });
+      prev.prev[r] = row.slice();
+    });
+    visual.delta = true;
+    visual.cellDiffs = cellDiffs;
+    visual.stateDiffs = stateDiffs;
+    visual.prevOffset = stepIndex - prev.step;
+    prev.step = stepIndex;
+    return visual;
+  };
+}
+
+function traceJS(code, options = {}) {
+  const maxSteps = options.maxSteps || MAX_STEPS;
+  const deadline = Date.now() + (options.timeoutMs || TIMEOUT_MS);
+  const steps = [];
   let output = '';
   const interpreter = new Interpreter(code, function(interpreter, globalObject) {
     interpreter.setProperty(globalObject, 'console', interpreter.nativeToPseudo({
@@ -11,138 +138,307 @@ function traceJS(code) {
       }
     }));
   });
-  function isLinkedList(obj) {
-    return obj && typeof obj === 'object' && 'value' in obj && 'next' in obj;
+  const stateStack = () => (interpreter.getStateStack ? interpreter.getStateStack() : interpreter.stateStack);
+  const scopeObject = (scope) => scope.object || scope;
+  const globalScope = interpreter.getScope();
+  // Builtins live in the global scope too; only show what the program declares
+  const userGlobals = declaredNames(interpreter.ast);
+  const bodies = loopBodies(interpreter.ast);
+  // Interpreter states of loop bodies already counted (a new state is pushed per iteration)
+  const iterations = new WeakSet();
+  const encodeGrid = createGridEncoder();
+
+  // Stable ids for interpreter objects (linked-list nodes keep theirs across steps)
+  const objectIds = new WeakMap();
+  let nextObjectId = 0;
+  const objectId = (obj) => {
+    if (!objectIds.has(obj)) objectIds.set(obj, nextObjectId++);
+    return objectIds.get(obj);
+  };
+
+  const isFunction = (v) => interpreter.isa(v, interpreter.FUNCTION);
+  const isArray = (v) => interpreter.isa(v, interpreter.ARRAY);
+
+  // Converted variables of the current scope: name -> {value, native, reachable}
+  let cache = new Map();
+  let cacheScope = null;
+  // Names the code since the last step may have changed (refreshAll: anything may have)
+  const dirty = new Set();
+  let refreshAll = true;
+  const stats = { nodes: 0, converted: 0, reused: 0 };
+
+  // Interpreter value -> plain JSON value, collecting the objects it reaches
+  function toNative(value, reachable, depth = 0, path = new Set()) {
+    if (isPrimitive(value)) return value;
+    if (isFunction(value)) return '<function>';
+    if (path.has(value) || depth > MAX_DEPTH) return '<circular>';
+    reachable.add(value);
+    path.add(value);
+    let native;
+    if (isArray(value)) {
+      const length = value.properties.length || 0;
+      native = new Array(length);
+      for (let i = 0; i < length; i++) native[i] = toNative(value.properties[i], reachable, depth + 1, path);
+    } else {
+      native = {};
+      for (const key in value.properties) {
+        const v = value.properties[key];
+        if (isPrimitive(v) || !isFunction(v)) native[key] = toNative(v, reachable, depth + 1, path);
+      }
+    }
+    path.delete(value);
+    return native;
   }
-  function extractLinkedList(node) {
-    let nodes = [];
-    let seen = new Set();
-    while (node && typeof node === 'object' && !seen.has(node)) {
-      seen.add(node);
-      nodes.push({
-        id: node,
-        value: node.value,
-        next: node.next || null
-      });
-      node = node.next;
+
+  // Record which variables a node about to run can change
+  function markTarget(target) {
+    if (!target) return;
+    while (target.type === 'MemberExpression') target = target.object;
+    if (target.type === 'Identifier') dirty.add(target.name);
+    else if (target.type === 'ThisExpression' || target.type === 'CallExpression') refreshAll = true;
+  }
+  function markDirty(node) {
+    switch (node.type) {
+      case 'AssignmentExpression':
+        markTarget(node.left);
+        break;
+      case 'UpdateExpression':
+        markTarget(node.argument);
+        break;
+      case 'UnaryExpression':
+        if (node.operator === 'delete') markTarget(node.argument);
+        break;
+      case 'VariableDeclarator':
+        dirty.add(node.id.name);
+        break;
+      case 'ForInStatement':
+        markTarget(node.left.type === 'VariableDeclaration' ? node.left.declarations[0].id : node.left);
+        break;
+      case 'CallExpression':
+      case 'NewExpression':
+        // Methods can mutate their receiver, natives their arguments
+        if (node.callee.type === 'MemberExpression') markTarget(node.callee);
+        node.arguments.forEach(arg => {
+          if (arg.type === 'Identifier' || arg.type === 'MemberExpression') markTarget(arg);
+        });
+        break;
     }
-    return nodes.length > 1 ? nodes : null;
   }
-  function stepper() {
-    let ok = interpreter.step();
-    let scope = interpreter.getScope();
-    let vars = {};
-    for (let name in scope.properties) {
-      vars[name] = interpreter.pseudoToNative(scope.properties[name]);
-    }
-    let step = {
-      line: interpreter.stateStack[0]?.node.loc?.start?.line || 0,
-      variables: vars,
-      output,
-      stack: interpreter.stateStack.map(s => s.node.type)
-    };
-    // Linked List detection and pointers
-    let pointerMap = {};
-    let nodeIds = new Set();
-    for (let k in vars) {
-      if (isLinkedList(vars[k])) {
-        let nodes = extractLinkedList(vars[k]);
-        if (nodes) {
-          step.visual = { type: 'linked-list', nodes };
-          nodeIds = new Set(nodes.map(n => n.id));
-          break;
-        }
+
+  function snapshotVariables(scope) {
+    if (scope !== cacheScope) {
+      cache = new Map();
+      cacheScope = scope;
+    }
+    // Objects reachable from a changed name are stale in every name that shares them
+    const staleSet = new Set();
+    if (!refreshAll) {
+      for (const name of dirty) cache.get(name)?.reachable.forEach(obj => staleSet.add(obj));
+    }
+    const stale = Array.from(staleSet);
+    const properties = scopeObject(scope).properties;
+    const isGlobal = scope === globalScope;
+    const vars = {};
+    for (const name in properties) {
+      if (isGlobal && !userGlobals.has(name)) continue;
+      const value = properties[name];
+      if (!isPrimitive(value) && isFunction(value)) continue;
+      let entry = cache.get(name);
+      const fresh = entry && !refreshAll && !dirty.has(name) && entry.value === value &&
+        !stale.some(obj => entry.reachable.has(obj));
+      if (fresh) {
+        stats.reused++;
+      } else {
+        const reachable = new Set();
+        entry = { value, native: toNative(value, reachable), reachable };
+        cache.set(name, entry);
+        stats.converted++;
       }
+      vars[name] = entry.native;
     }
-    if (step.visual && step.visual.type === 'linked-list') {
-      for (let varName in vars) {
-        if (isLinkedList(vars[varName])) {
-          let nodeId = vars[varName];
-          if (nodeIds.has(nodeId)) {
-            pointerMap[nodeId] = pointerMap[nodeId] || [];
-            pointerMap[nodeId].push(varName);
-          }
-        }
+    dirty.clear();
+    refreshAll = false;
+    return vars;
+  }
+
+  function callStack(stack) {
+    const frames = [{ function: '<module>', filename: '<string>', line_number: 0 }];
+    for (let i = 0; i < stack.length; i++) {
+      const state = stack[i];
+      const node = state.node;
+      // Calls made inside polyfills (no location) aren't the user's frames
+      if ((node.type !== 'CallExpression' && node.type !== 'NewExpression') || !node.loc) continue;
+      // Entering the function pushes its body, in the new scope, directly on top of the
+      // call; until then (callee and arguments still running) it isn't a frame
+      const entered = stack[i + 1];
+      if (!entered || entered.scope === state.scope) continue;
+      const callee = node.callee;
+      const name = callee.type === 'Identifier' ? callee.name
+        : callee.type === 'MemberExpression' && !callee.computed ? callee.property.name : '<anonymous>';
+      frames[frames.length - 1].line_number = node.loc?.start?.line || 0;
+      frames.push({ function: name, filename: '<string>', line_number: 0 });
+    }
+    return frames;
+  }
+
+  function pointersInto(vars, length) {
+    const pointers = {};
+    for (const name in vars) {
+      const v = vars[name];
+      if (typeof v === 'number' && Number.isInteger(v) && v >= 0 && v < length && POINTER_NAMES.includes(name.toLowerCase())) {
+        (pointers[v] = pointers[v] || []).push(name);
       }
-      if (Object.keys(pointerMap).length > 0) {
-        step.pointers = pointerMap;
+    }
+    return pointers;
+  }
+
+  function linkedListVisual(name, head, properties) {
+    const valueKey = 'value' in head.properties ? 'value' : 'val';
+    const nodes = [];
+    const seen = new Set();
+    let node = head;
+    while (node && !isPrimitive(node) && !seen.has(node) && nodes.length <= 20) {
+      seen.add(node);
+      const next = node.properties.next;
+      nodes.push({
+        id: objectId(node),
+        value: toNative(node.properties[valueKey], new Set()),
+        next: next && !isPrimitive(next) ? objectId(next) : null,
+      });
+      node = next;
+    }
+    if (nodes.length < 2) return null;
+    const pointers = {};
+    for (const other in properties) {
+      if (seen.has(properties[other])) {
+        const id = objectId(properties[other]);
+        (pointers[id] = pointers[id] || []).push(other);
       }
     }
-    // Array detection and pointers
-    let arrayIndices = {};
-    for (let k in vars) {
-      if (Array.isArray(vars[k]) && vars[k].every(x => typeof x === 'number' || typeof x === 'string' || typeof x === 'boolean' || x === null)) {
-        step.visual = { type: 'array', values: vars[k] };
-        for (let var2 in vars) {
-          if (typeof vars[var2] === 'number' && vars[var2] >= 0 && vars[var2] < vars[k].length) {
-            if (["left","right","mid","l","r","m","start","end"].includes(var2.toLowerCase())) {
-              arrayIndices[vars[var2]] = arrayIndices[vars[var2]] || [];
-              arrayIndices[vars[var2]].push(var2);
-            }
-          }
+    return { visual: { type: 'linked-list', nodes, name, pointers }, members: seen };
+  }
+
+  function detectVisuals(vars, scope, stepIndex) {
+    const visuals = [];
+    const properties = scopeObject(scope).properties;
+    const listed = new Set();
+    for (const name in vars) {
+      const value = vars[name];
+      const pseudo = properties[name];
+      const lower = name.toLowerCase();
+      if (Array.isArray(value)) {
+        if (value.length > 0 && lower.includes('stack')) {
+          visuals.push({ type: 'stack', values: value, name, pointers: { [value.length - 1]: ['top'] } });
+        } else if (value.length > 0 && lower.includes('queue')) {
+          visuals.push({ type: 'queue', values: value, name, pointers: { 0: ['front'], [value.length - 1]: ['rear'] } });
+        } else if (value.length > 0 && lower.includes('heap')) {
+          visuals.push({ type: 'heap', values: value, name, pointers: pointersInto(vars, value.length) });
+        } else if (value.length > 0 && value.every(row => Array.isArray(row) && row.length === value[0].length && row.every(isPrimitive)) && value[0].length > 0) {
+          const visual = { type: 'grid', rows: value.length, cols: value[0].length, name };
+          visuals.push(encodeGrid(visual, pseudo, value, stepIndex));
+        } else if (value.every(isPrimitive)) {
+          visuals.push({ type: 'array', values: value, name, pointers: pointersInto(vars, value.length) });
+        }
+      } else if (value && typeof value === 'object' && lower.includes('graph')) {
+        const ids = Object.keys(value);
+        const nodes = ids.map((id, idx) => ({ id, label: id, x: 100 + 400 * (idx / Math.max(1, ids.length - 1)), y: 180 }));
+        const edges = [];
+        for (const src of ids) {
+          if (Array.isArray(value[src])) value[src].forEach(dst => edges.push({ from: src, to: dst }));
         }
-        if (Object.keys(arrayIndices).length > 0) {
-          step.pointers = arrayIndices;
+        visuals.push({ type: 'graph', nodes, edges, name });
+      } else if (value && typeof value === 'object' && 'next' in value && ('value' in value || 'val' in value) && !listed.has(pseudo)) {
+        const list = linkedListVisual(name, pseudo, properties);
+        if (list) {
+          list.members.forEach(node => listed.add(node));
+          visuals.push(list.visual);
         }
-        break;
-      }
-    }
-    // Stack detection (array used as stack)
-    for (let k in vars) {
-      if (Array.isArray(vars[k]) && vars[k].length > 0 && k.toLowerCase().includes('stack')) {
-        step.visual = { type: 'stack', values: vars[k] };
-        step.pointers = { [vars[k].length - 1]: ['top'] };
-        break;
       }
     }
-    // Queue detection (array used as queue)
-    for (let k in vars) {
-      if (Array.isArray(vars[k]) && vars[k].length > 0 && k.toLowerCase().includes('queue')) {
-        step.visual = { type: 'queue', values: vars[k] };
-        step.pointers = { 0: ['front'], [vars[k].length - 1]: ['rear'] };
-        break;
-      }
+    return visuals;
+  }
+
+  let lastLine = 0;
+  let lastScope = null;
+  let truncated = false;
+  let more = true;
+  while (more) {
+    stats.nodes++;
+    if ((stats.nodes & 0xfff) === 0 && Date.now() > deadline) {
+      steps.push({ error: `Execution timed out after ${TIMEOUT_MS / 1000} seconds.` });
+      return { steps, output, stats };
     }
-    // Heap detection (array used as heap)
-    for (let k in vars) {
-      if (Array.isArray(vars[k]) && vars[k].length > 0 && k.toLowerCase().includes('heap')) {
-        step.visual = { type: 'heap', values: vars[k] };
-        break;
-      }
+    const stack = stateStack();
+    const top = stack[stack.length - 1];
+    const node = top.node;
+    if (bodies.has(node) && !iterations.has(top)) {
+      // Back round the loop: the next located node starts a step even on the same line
+      iterations.add(top);
+      lastLine = 0;
     }
-    // Graph detection (object as adjacency list)
-    for (let k in vars) {
-      if (vars[k] && typeof vars[k] === 'object' && !Array.isArray(vars[k]) && k.toLowerCase().includes('graph')) {
-        const adj = vars[k];
-        const nodeIds = Object.keys(adj);
-        const nodes = nodeIds.map((id, idx) => ({ id, label: id, x: 100 + 400 * (idx / Math.max(1, nodeIds.length-1)), y: 180 }));
-        const edges = [];
-        for (const src in adj) {
-          if (Array.isArray(adj[src])) {
-            for (const dst of adj[src]) {
-              edges.push({ from: src, to: dst });
-            }
+    // Polyfill nodes carry no location: they run as part of the calling line
+    const line = node.loc?.start?.line || 0;
+    if (line && !CONTAINER_NODES.has(node.type)) {
+      const scope = interpreter.getScope();
+      if (line !== lastLine || scope !== lastScope) {
+        if (scope !== lastScope) refreshAll = true;
+        if (steps.length < maxSteps) {
+          const variables = snapshotVariables(scope);
+          const frames = callStack(stack);
+          const step = {
+            line,
+            current_line: line,
+            variables,
+            output: output.slice(-MAX_OUTPUT_CHARS),
+            call_stack: frames,
+            stack: frames.map(f => f.function),
+          };
+          const visuals = detectVisuals(variables, scope, steps.length);
+          if (visuals.length) {
+            step.visuals = visuals;
+            step.visual = visuals[0]; // For backward compatibility
           }
+          steps.push(step);
+        } else {
+          truncated = true;
         }
-        step.visual = { type: 'graph', nodes, edges };
-        break;
+        lastLine = line;
+        lastScope = scope;
       }
+      if (!truncated) markDirty(node);
+    }
+    more = interpreter.step();
+  }
+  // Final state, so the last line's effects and all output are visible
+  if (!truncated && steps.length > 0) {
+    const last = steps[steps.length - 1];
+    refreshAll = true;
+    const variables = lastScope ? snapshotVariables(lastScope) : last.variables;
+    const step = { ...last, variables, output: output.slice(-MAX_OUTPUT_CHARS), note: 'end of program' };
+    const visuals = lastScope ? detectVisuals(variables, lastScope, steps.length) : [];
+    delete step.visuals;
+    delete step.visual;
+    if (visuals.length) {
+      step.visuals = visuals;
+      step.visual = visuals[0];
     }
     steps.push(step);
-    return ok;
   }
-  while (stepper());
-  return steps;
+  return { steps, output, stats };
 }
 
-let code = '';
-const rl = readline.createInterface({ input: process.stdin });
-rl.on('line', line => code += line + '\n');
-rl.on('close', () => {
-  try {
-    const trace = traceJS(code);
-    console.log(JSON.stringify(trace));
-  } catch (e) {
-    console.log(JSON.stringify([{ error: e.message }]));
-  }
-}); 
\ No newline at end of file
+module.exports = { traceJS };
+
+if (require.main === module) {
+  let code = '';
+  process.stdin.setEncoding('utf8');
+  process.stdin.on('data', chunk => { code += chunk; });
+  process.stdin.on('end', () => {
+    try {
+      const { steps } = traceJS(code);
+      console.log(JSON.stringify(steps));
+    } catch (e) {
+      console.log(JSON.stringify([{ error: e.message }]));
+    }
+  });
+}
@@ -0,0 +1,157 @@
+import { spawn, ChildProcessWithoutNullStreams } from 'child_process';
+import path from 'path';
+
+// Live mode workers: one warm py_live.py process per editor session. The
+// worker keeps the previous run's checkpoints, so re-running after an edit
+// only re-executes the top-level statements from the edit onwards. Requests
+// and responses are JSON lines; each worker handles one request at a time.
+// At the worker cap, a new session replaces the least recently used idle
+// worker; when every worker is busy it is turned away rather than killing
+// another session's run.
+
+const MAX_WORKERS = 8;
+const IDLE_MS = 5 * 60 * 1000; // 5 minutes
+const LIVE_TIMEOUT_MS = 8000;
+const SESSION_PATTERN = /^[0-9A-Za-z-]{8,64}$/;
+
+type LiveWorker = {
+  child: ChildProcessWithoutNullStreams;
+  buffer: string;
+  stderr: string;
+  // Resolves the in-flight request with its response line (or null if the worker died)
+  pending: ((line: string | null) => void) | null;
+  queue: Promise<unknown>;
+  // Requests queued or running on this worker
+  active: number;
+  idleTimer: NodeJS.Timeout | null;
+};
+
+export type LiveResult = {
+  trace: any[];
+  live?: { statements: number; resumedAt: number; reusedSteps: number; elapsedMs: number };
+  stderr: string;
+};
+
+// Map iteration order is insertion order, so the first key is the least recently used
+const workers = new Map<string, LiveWorker>();
+
+export function isLiveSession(sessionId: unknown): sessionId is string {
+  return typeof sessionId === 'string' && SESSION_PATTERN.test(sessionId);
+}
+
+function stopWorker(sessionId: string) {
+  const worker = workers.get(sessionId);
+  if (!worker) return;
+  workers.delete(sessionId);
+  if (worker.idleTimer) clearTimeout(worker.idleTimer);
+  worker.child.kill('SIGKILL');
+}
+
+// Make room for one more worker by stopping idle ones, least recently used first
+function evictIdle(): boolean {
+  for (const [id, worker] of workers) {
+    if (workers.size < MAX_WORKERS) break;
+    if (worker.active === 0) stopWorker(id);
+  }
+  return workers.size < MAX_WORKERS;
+}
+
+function startWorker(sessionId: string): LiveWorker | null {
+  if (!evictIdle()) return null;
+  const script = path.resolve(process.cwd(), 'app', 'api', 'run', 'py_live.py');
+  const child = spawn('python3', [script], { stdio: ['pipe', 'pipe', 'pipe'] });
+  const worker: LiveWorker = { child, buffer: '', stderr: '', pending: null, queue: Promise.resolve(), active: 0, idleTimer: null };
+
+  child.stdout.on('data', data => {
+    worker.buffer += data.toString();
+    let newline;
+    while ((newline = worker.buffer.indexOf('\n')) >= 0) {
+      const line = worker.buffer.slice(0, newline);
+      worker.buffer = worker.buffer.slice(newline + 1);
+      const pending = worker.pending;
+      worker.pending = null;
+      pending?.(line);
+    }
+  });
+  child.stderr.on('data', data => {
+    worker.stderr += data.toString();
+  });
+  const onExit = () => {
+    if (workers.get(sessionId) === worker) workers.delete(sessionId);
+    const pending = worker.pending;
+    worker.pending = null;
+    pending?.(null);
+  };
+  child.on('close', onExit);
+  child.on('error', onExit);
+  // Writes to a worker that just died surface through 'close' instead
+  child.stdin.on('error', () => {});
+
+  workers.set(sessionId, worker);
+  return worker;
+}
+
+function request(sessionId: string, worker: LiveWorker, code: string): Promise<LiveResult> {
+  return new Promise<LiveResult>((resolve) => {
+    // The worker enforces the run timeout itself; this one catches a hung process
+    let timedOut = false;
+    const timeout = setTimeout(() => {
+      timedOut = true;
+      stopWorker(sessionId);
+    }, LIVE_TIMEOUT_MS + 2000);
+
+    worker.stderr = '';
+    worker.pending = (line) => {
+      clearTimeout(timeout);
+      const stderr = worker.stderr;
+      if (line === null) {
+        resolve({ trace: [{ error: timedOut ? 'Execution timed out.' : stderr || 'Live worker exited.' }], stderr });
+        return;
+      }
+      try {
+        resolve({ ...JSON.parse(line), stderr });
+      } catch (e) {
+        resolve({ trace: [{ error: 'Failed to parse trace output.' }], stderr });
+      }
+    };
+    worker.child.stdin.write(JSON.stringify({ code, timeout: LIVE_TIMEOUT_MS / 1000 }) + '\n');
+  });
+}
+
+const BUSY: LiveResult = { trace: [{ error: 'All live workers are busy. Try again in a moment.' }], stderr: '' };
+
+// Queue one request on `worker`; requests run one at a time in arrival order
+function enqueue(sessionId: string, worker: LiveWorker, code: string): Promise<LiveResult> {
+  if (worker.idleTimer) clearTimeout(worker.idleTimer);
+  worker.active++;
+  const turn = worker.queue.then(() => workers.get(sessionId) === worker);
+  const result = turn.then((current) => {
+    if (current) return request(sessionId, worker, code);
+    // The worker was replaced or killed while this request waited: move to the
+    // session's current worker, so requests queued behind a dead worker share
+    // one replacement (in their original order) instead of each starting their own
+    const next = workers.get(sessionId) ?? startWorker(sessionId);
+    return next ? enqueue(sessionId, next, code) : BUSY;
+  });
+  // A handed-over request frees this queue as soon as it has moved
+  worker.queue = turn.then((current) => (current ? result : undefined)).finally(() => {
+    worker.active--;
+    if (workers.get(sessionId) !== worker || worker.active > 0) return;
+    if (worker.idleTimer) clearTimeout(worker.idleTimer);
+    worker.idleTimer = setTimeout(() => stopWorker(sessionId), IDLE_MS);
+  });
+  return result;
+}
+
+export function runLive(sessionId: string, code: string): Promise<LiveResult> {
+  let worker = workers.get(sessionId) ?? null;
+  if (!worker) {
+    worker = startWorker(sessionId);
+    if (!worker) return Promise.resolve(BUSY);
+  } else {
+    // Mark as most recently used
+    workers.delete(sessionId);
+    workers.set(sessionId, worker);
+  }
+  return enqueue(sessionId, worker, code);
+}
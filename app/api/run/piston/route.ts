@@ -0,0 +1,7 @@
+import { NextResponse } from 'next/server';
+import { pistonClient } from '../pistonClient';
+
+// Counters and latency percentiles of the shared Piston client
+export async function GET(): Promise<NextResponse> {
+  return NextResponse.json(pistonClient().metrics());
+}
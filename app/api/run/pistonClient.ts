@@ -0,0 +1,170 @@
+import http from 'http';
+import https from 'https';
+import crypto from 'crypto';
+
+// Client for the Piston execution API, used for languages without a local
+// tracer. Connections are pooled with keep-alive agents; identical concurrent
+// requests (same language, source and stdin) share one upstream call; finished
+// results are cached for a short TTL in an LRU. DSA_PISTON_URL points it at a
+// self-hosted Piston (or a local stub server); every call reports its latency.
+
+const DEFAULT_BASE_URL = 'https://emkc.org/api/v2/piston';
+const CACHE_TTL_MS = Number(process.env.DSA_PISTON_CACHE_TTL_MS) || 5 * 60 * 1000;
+const MAX_CACHE_ENTRIES = 256;
+const REQUEST_TIMEOUT_MS = 20000;
+const MAX_SOCKETS = 16;
+// Latency samples kept for the percentiles in pistonMetrics()
+const LATENCY_SAMPLES = 512;
+
+export type PistonRequest = {
+  language: string;
+  source: string;
+  stdin?: string;
+};
+
+export type PistonMetrics = {
+  source: 'cache' | 'coalesced' | 'upstream';
+  latencyMs: number; // Time this caller waited
+  upstreamMs?: number; // Time the upstream call took (upstream and coalesced callers)
+};
+
+export type PistonResult = {
+  status: number;
+  data: any;
+  metrics: PistonMetrics;
+};
+
+type Upstream = { status: number; data: any; upstreamMs: number };
+
+export type PistonClientOptions = {
+  baseUrl?: string;
+  cacheTtlMs?: number;
+  maxCacheEntries?: number;
+  timeoutMs?: number;
+};
+
+export function createPistonClient({
+  baseUrl = process.env.DSA_PISTON_URL || DEFAULT_BASE_URL,
+  cacheTtlMs = CACHE_TTL_MS,
+  maxCacheEntries = MAX_CACHE_ENTRIES,
+  timeoutMs = REQUEST_TIMEOUT_MS,
+}: PistonClientOptions = {}) {
+  const executeUrl = new URL(baseUrl.replace(/\/+$/, '') + '/execute');
+  const transport = executeUrl.protocol === 'https:' ? https : http;
+  const agent = new transport.Agent({ keepAlive: true, maxSockets: MAX_SOCKETS });
+
+  // Map iteration order is insertion order, so the first key is the least recently used
+  const cache = new Map<string, { expires: number; status: number; data: any }>();
+  const inFlight = new Map<string, Promise<Upstream>>();
+  const counters = { requests: 0, cacheHits: 0, coalesced: 0, upstream: 0, errors: 0 };
+  const latencies: number[] = [];
+
+  function record(ms: number) {
+    latencies.push(ms);
+    if (latencies.length > LATENCY_SAMPLES) latencies.shift();
+  }
+
+  function post(body: string): Promise<Upstream> {
+    const started = performance.now();
+    return new Promise((resolve, reject) => {
+      const req = transport.request(executeUrl, {
+        method: 'POST',
+        agent,
+        headers: { 'Content-Type': 'application/json', 'Content-Length': Buffer.byteLength(body) },
+        timeout: timeoutMs,
+      }, (res) => {
+        const chunks: Buffer[] = [];
+        res.on('data', (chunk) => chunks.push(chunk));
+        res.on('end', () => {
+          const text = Buffer.concat(chunks).toString('utf8');
+          let data: any;
+          try {
+            data = JSON.parse(text);
+          } catch {
+            data = { message: text || `Execution service returned status ${res.statusCode}` };
+          }
+          resolve({ status: res.statusCode || 502, data, upstreamMs: performance.now() - started });
+        });
+        res.on('error', reject);
+      });
+      req.on('timeout', () => req.destroy(new Error('Execution service timed out.')));
+      req.on('error', reject);
+      req.end(body);
+    });
+  }
+
+  async function execute({ language, source, stdin = '' }: PistonRequest): Promise<PistonResult> {
+    const started = performance.now();
+    counters.requests++;
+    const key = crypto.createHash('sha256').update(JSON.stringify([language, source, stdin])).digest('hex');
+    const elapsed = () => Math.round((performance.now() - started) * 1000) / 1000;
+
+    const cached = cache.get(key);
+    if (cached && cached.expires > Date.now()) {
+      cache.delete(key);
+      cache.set(key, cached);
+      counters.cacheHits++;
+      const latencyMs = elapsed();
+      record(latencyMs);
+      return { status: cached.status, data: cached.data, metrics: { source: 'cache', latencyMs } };
+    }
+    if (cached) cache.delete(key);
+
+    let pending = inFlight.get(key);
+    const leader = !pending;
+    if (pending) {
+      counters.coalesced++;
+    } else {
+      counters.upstream++;
+      pending = post(JSON.stringify({ language, version: '*', files: [{ content: source }], stdin }))
+        .then((result) => {
+          // Only successful runs are reused; errors and rate limits are retried next time
+          if (result.status === 200 && cacheTtlMs > 0) {
+            cache.set(key, { expires: Date.now() + cacheTtlMs, status: result.status, data: result.data });
+            while (cache.size > maxCacheEntries) cache.delete(cache.keys().next().value);
+          }
+          return result;
+        })
+        .finally(() => inFlight.delete(key));
+      inFlight.set(key, pending);
+    }
+
+    try {
+      const { status, data, upstreamMs } = await pending;
+      const latencyMs = elapsed();
+      record(latencyMs);
+      return {
+        status,
+        data,
+        metrics: { source: leader ? 'upstream' : 'coalesced', latencyMs, upstreamMs: Math.round(upstreamMs * 1000) / 1000 },
+      };
+    } catch (err) {
+      counters.errors++;
+      throw err;
+    }
+  }
+
+  function metrics() {
+    const sorted = [...latencies].sort((a, b) => a - b);
+    const percentile = (p: number) => (sorted.length ? sorted[Math.min(sorted.length - 1, Math.floor(p * sorted.length))] : 0);
+    return {
+      baseUrl: executeUrl.origin + executeUrl.pathname.replace(/\/execute$/, ''),
+      ...counters,
+      cacheEntries: cache.size,
+      inFlight: inFlight.size,
+      latencyMs: { p50: percentile(0.5), p95: percentile(0.95), max: sorted[sorted.length - 1] || 0 },
+    };
+  }
+
+  return { execute, metrics, close: () => agent.destroy() };
+}
+
+export type PistonClient = ReturnType<typeof createPistonClient>;
+
+// One client per server process, shared by every route
+let shared: PistonClient | null = null;
+
+export function pistonClient(): PistonClient {
+  if (!shared) shared = createPistonClient();
+  return shared;
+}
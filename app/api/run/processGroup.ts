@@ -0,0 +1,18 @@
+import { spawn, type ChildProcessWithoutNullStreams } from 'child_process';
+
+// Tracers that fork worker pools (py_race.py, py_profile.py) run in their own
+// process group, so a timeout kills the workers along with the parent. Killing
+// only the parent would orphan them, still running and holding stdout open.
+
+export function spawnGroup(script: string): ChildProcessWithoutNullStreams {
+  return spawn('python3', [script], { stdio: ['pipe', 'pipe', 'pipe'], detached: true });
+}
+
+export function killGroup(child: ChildProcessWithoutNullStreams) {
+  try {
+    process.kill(-child.pid!, 'SIGKILL');
+  } catch {
+    // No process groups (Windows) or the group is already gone
+    child.kill('SIGKILL');
+  }
+}
@@ -0,0 +1,91 @@
+import { NextRequest, NextResponse } from 'next/server';
+import path from 'path';
+import fs from 'fs';
+import { spawnGroup, killGroup } from '../processGroup';
+
+const INPUT_KINDS = ['array', 'sorted', 'reversed', 'string', 'int'];
+const CASE_TIMEOUT_MS = 5000;
+const MAX_SIZES = 12;
+
+// Profiling run: per-line hit counts and per-function call counts for the
+// whole program, plus (with functionName) a complexity fit from re-running
+// that function over a sweep of generated input sizes (py_profile.py).
+export async function POST(req: NextRequest): Promise<NextResponse> {
+  const { language, code, functionName, input, sizes } = await req.json();
+
+  if (language !== 'python') {
+    return NextResponse.json({ error: 'Profiling is only supported for Python.' }, { status: 400 });
+  }
+  if (input && !INPUT_KINDS.includes(input)) {
+    return NextResponse.json({ error: `"input" must be one of ${INPUT_KINDS.join(', ')}.` }, { status: 400 });
+  }
+  if (sizes && (!Array.isArray(sizes) || sizes.length > MAX_SIZES)) {
+    return NextResponse.json({ error: `"sizes" must be an array of at most ${MAX_SIZES} numbers.` }, { status: 400 });
+  }
+
+  const profilerScript = path.resolve(process.cwd(), 'app', 'api', 'run', 'py_profile.py');
+  if (!fs.existsSync(profilerScript)) {
+    return NextResponse.json({ error: `Profiler script not found: ${profilerScript}` }, { status: 500 });
+  }
+
+  // Whole program once, then every sweep size may use its full timeout (sizes run 4 at a time)
+  const sweepWaves = functionName ? Math.ceil((sizes?.length || 7) / 4) : 0;
+  const totalTimeoutMs = (1 + sweepWaves) * CASE_TIMEOUT_MS + 5000;
+
+  return new Promise<NextResponse>((resolve) => {
+    const child = spawnGroup(profilerScript);
+
+    let result = '';
+    let error = '';
+    let timedOut = false;
+
+    const timeout = setTimeout(() => {
+      timedOut = true;
+      killGroup(child);
+    }, totalTimeoutMs);
+
+    child.stdin.write(JSON.stringify({
+      code,
+      functionName: functionName || undefined,
+      input: input || 'array',
+      sizes,
+      timeout: CASE_TIMEOUT_MS / 1000,
+    }));
+    child.stdin.end();
+
+    child.stdout.on('data', data => {
+      result += data.toString();
+    });
+
+    child.stderr.on('data', data => {
+      error += data.toString();
+    });
+
+    child.on('close', (exitCode) => {
+      clearTimeout(timeout);
+
+      if (timedOut) {
+        resolve(NextResponse.json({ error: 'Profiling timed out.' }, { status: 500 }));
+        return;
+      }
+
+      let profile: any;
+      try {
+        profile = JSON.parse(result);
+      } catch (e) {
+        resolve(NextResponse.json({ error: error || 'Failed to parse profiler output.', stderr: error, exitCode }, { status: 500 }));
+        return;
+      }
+      if (profile.error && !profile.lines) {
+        resolve(NextResponse.json({ error: profile.error, stderr: error }, { status: 500 }));
+        return;
+      }
+      resolve(NextResponse.json({ ...profile, stderr: error }));
+    });
+
+    child.on('error', (err) => {
+      clearTimeout(timeout);
+      resolve(NextResponse.json({ error: `Process error: ${err.message}` }, { status: 500 }));
+    });
+  });
+}
@@ -0,0 +1,148 @@
+import sys
+import json
+import io
+import os
+import copy
+import time
+import traceback
+import multiprocessing
+from multiprocessing.connection import wait
+
+import py_trace
+
+# Batch tracing: run one code body against many inputs. The code is prepared
+# and compiled once in this process; each case runs in a forked child that
+# inherits the compiled code, so a stuck case can be killed on its own
+# timeout without stalling the rest of the batch.
+#
+# stdin:  {"code": str, "cases": [{"stdin"?: str, "args"?: list, "expected"?: any}],
+#          "functionName"?: str, "concurrency"?: int, "timeout"?: seconds, "trace"?: bool}
+# stdout: {"results": [{"index", "passed", "output", "returnValue", "error",
+#                       "timedOut", "timeMs", "trace"?}], "timeMs": total}
+
+MAX_CONCURRENCY = 8
+DEFAULT_TIMEOUT = 5.0
+
+
+def run_case(compiled_code, full_code, case, function_name, want_trace):
+    """Execute one case in the current (child) process and return its result dict"""
+    result = {'passed': None, 'output': '', 'returnValue': None, 'error': None, 'timedOut': False}
+    namespace = {'__name__': '__main__'}
+    sys.stdin = io.StringIO(case.get('stdin') or '')
+    session = py_trace.TraceSession()
+    session.reset(full_code)
+    start = time.perf_counter()
+    try:
+        if function_name:
+            # Module body sets up definitions; only the call under test is traced
+            session.exec_program(compiled_code, namespace)
+            func = namespace.get(function_name)
+            if not callable(func):
+                raise NameError(f"function '{function_name}' is not defined")
+            args = copy.deepcopy(case.get('args') or [])
+            if want_trace:
+                value = session.call(func, *args)
+            else:
+                with session.capturing():
+                    value = func(*args)
+            result['returnValue'] = py_trace.safe_serialize(value)
+        elif want_trace:
+            session.run(compiled_code, namespace)
+        else:
+            session.exec_program(compiled_code, namespace)
+    except Exception:
+        result['error'] = traceback.format_exc(limit=-3)
+    result['timeMs'] = round((time.perf_counter() - start) * 1000, 3)
+    result['output'] = session.output.getvalue()
+
+    if 'expected' in case and result['error'] is None:
+        if function_name:
+            result['passed'] = result['returnValue'] == case['expected']
+        else:
+            result['passed'] = result['output'].strip() == str(case['expected']).strip()
+    elif result['error'] is not None:
+        result['passed'] = False if 'expected' in case else None
+
+    if want_trace:
+        session.add_initial_step()
+        result['trace'] = list(session.steps)
+    return result
+
+
+def _child(conn, compiled_code, full_code, case, function_name, want_trace):
+    try:
+        result = run_case(compiled_code, full_code, case, function_name, want_trace)
+        conn.send_bytes(json.dumps(py_trace.sanitize_unicode(result), ensure_ascii=False).encode('utf-8'))
+    except Exception as e:
+        conn.send_bytes(json.dumps({'error': f'Error: {e}'}).encode('utf-8'))
+    finally:
+        conn.close()
+
+
+def run_batch(request):
+    code = request['code']
+    cases = request.get('cases') or []
+    function_name = request.get('functionName')
+    want_trace = bool(request.get('trace', True))
+    concurrency = max(1, min(int(request.get('concurrency') or os.cpu_count() or 1), MAX_CONCURRENCY))
+    timeout = float(request.get('timeout') or DEFAULT_TIMEOUT)
+
+    # Shared prelude: prepared and compiled once (kept in process memory), inherited by every forked child
+    full_code, compiled_code = py_trace.compile_program(code)
+
+    ctx = multiprocessing.get_context('fork')
+    results = [None] * len(cases)
+    pending = list(enumerate(cases))
+    running = {}  # conn -> (index, process, deadline)
+
+    def finish(conn, result):
+        index, process, _ = running.pop(conn)
+        process.join(0.1)
+        if process.is_alive():
+            process.kill()
+        conn.close()
+        result['index'] = index
+        results[index] = result
+
+    while pending or running:
+        while pending and len(running) < concurrency:
+            index, case = pending.pop(0)
+            parent_conn, child_conn = ctx.Pipe(duplex=False)
+            process = ctx.Process(target=_child, args=(child_conn, compiled_code, full_code, case,
+                                                       function_name, want_trace), daemon=True)
+            process.start()
+            child_conn.close()
+            running[parent_conn] = (index, process, time.monotonic() + timeout)
+
+        next_deadline = min(deadline for _, _, deadline in running.values())
+        for conn in wait(list(running), timeout=max(0.0, next_deadline - time.monotonic())):
+            try:
+                result = json.loads(conn.recv_bytes().decode('utf-8'))
+            except (EOFError, OSError):
+                result = {'error': 'Worker exited without a result.'}
+            finish(conn, result)
+
+        # Kill cases past their deadline (infinite loops) without touching the others
+        now = time.monotonic()
+        for conn in [c for c, (_, _, deadline) in running.items() if deadline <= now]:
+            index, process, _ = running[conn]
+            process.kill()
+            finish(conn, {'passed': False if 'expected' in cases[index] else None,
+                          'timedOut': True, 'error': f'Execution timed out after {timeout:g} seconds.',
+                          'output': '', 'timeMs': round(timeout * 1000, 3)})
+    return results
+
+
+def main():
+    try:
+        request = json.loads(sys.stdin.read())
+        start = time.perf_counter()
+        results = run_batch(request)
+        print(json.dumps({'results': results, 'timeMs': round((time.perf_counter() - start) * 1000, 3)},
+                         ensure_ascii=False))
+    except Exception as e:
+        print(json.dumps({'error': py_trace.sanitize_unicode(f'Error: {str(e)}')}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+
+# Incremental grid visuals. The first emission of a grid (and the first one
+# at least KEYFRAME_INTERVAL steps after the previous keyframe) carries full
+# `cells`/`cellStates`; the others carry only the cells and cell states that
+# changed since the previous emission of the same grid, which the frontend
+# replays (components/gridDiffs.ts). The interval counts steps, not
+# emissions, so a diff's keyframe is never more than KEYFRAME_INTERVAL steps
+# back: within the current or previous page of a paged trace.
+
+KEYFRAME_INTERVAL = 64
+PIECES = ('Q', 'K', 'N', 'B', 'R', 'P')
+SCALAR_TYPES = (int, float, str, bool, type(None))
+
+def list_cell_state(v):
+    """Cell state for a list-of-lists grid (chessboards, mazes, visited maps)"""
+    if isinstance(v, str):
+        if v in PIECES:
+            return {'state': 'piece', 'piece': v}
+        if v == 'X':
+            return {'state': 'blocked'}
+        return None
+    if v == 1:
+        return {'state': 'visited'}
+    return None
+
+
+def string_cell_state(v):
+    """Cell state for a board stored as a list of strings (N-Queens solutions)"""
+    if v in PIECES:
+        return {'state': 'piece', 'piece': v}
+    if v == 'X':
+        return {'state': 'blocked'}
+    if v == '1':
+        return {'state': 'visited'}
+    return None
+
+
+def _copy_row(row):
+    return row if isinstance(row, str) else list(row)
+
+
+def _copy_value(v):
+    if isinstance(v, SCALAR_TYPES):
+        return v
+    import copy
+    return copy.deepcopy(v)
+
+
+class GridEncoder:
+    """Per-trace grid state: the last emission of every grid, by visual name"""
+
+    def __init__(self):
+        # name -> {'id', 'rows', 'cols', 'prev', 'states', 'key_step', 'step'}
+        self._grids = {}
+
+    def reset(self):
+        self._grids.clear()
+
+    def encode(self, visual, source, rows, state_of, step_index):
+        """Fill a grid visual with a keyframe or a diff against the grid's previous emission.
+
+        `source` is the live grid object (identity decides whether a diff is
+        possible), `rows` its rows (lists or strings), `state_of` maps a cell
+        value to its state dict or None, and `step_index` is the index of the
+        step the visual belongs to.
+        """
+        name = visual['name']
+        nrows, ncols = visual['rows'], visual['cols']
+        prev = self._grids.get(name)
+        if (prev is None or prev['id'] != id(source) or prev['rows'] != nrows or
+                prev['cols'] != ncols or step_index - prev['key_step'] >= KEYFRAME_INTERVAL):
+            states = {}
+            for r, row in enumerate(rows):
+                for c, v in enumerate(row):
+                    state = state_of(v)
+                    if state:
+                        states[(r, c)] = state
+            self._grids[name] = {
+                'id': id(source), 'rows': nrows, 'cols': ncols,
+                'prev': [_copy_row(row) for row in rows], 'states': states,
+                'key_step': step_index, 'step': step_index,
+                'source': source,  # keep alive so id() stays unique
+            }
+            import copy
+            visual['cells'] = [list(row) if isinstance(row, str) else copy.deepcopy(row) for row in rows]
+            visual['cellStates'] = [dict({'row': r, 'col': c}, **s) for (r, c), s in states.items()]
+            return visual
+
+        cell_diffs = []
+        state_diffs = []
+        prev_rows, states = prev['prev'], prev['states']
+        for r, row in enumerate(rows):
+            old = prev_rows[r]
+            # Row equality runs in C; only rows that actually changed are walked
+            if row == old:
+                continue
+            for c, v in enumerate(row):
+                if v == old[c] and type(v) is type(old[c]):
+                    continue
+                cell_diffs.append([r, c, _copy_value(v)])
+                state = state_of(v)
+                if state != states.get((r, c)):
+                    state_diffs.append([r, c, state])
+                    if state:
+                        states[(r, c)] = state
+                    else:
+                        states.pop((r, c), None)
+            prev_rows[r] = _copy_row(row)
+        visual['delta'] = True
+        visual['prevOffset'] = step_index - prev['step']
+        prev['step'] = step_index
+        visual['cellDiffs'] = cell_diffs
+        visual['stateDiffs'] = state_diffs
+        return visual
@@ -0,0 +1,201 @@
+import sys
+import io
+import ast
+import copy
+import gc
+import json
+import time
+import types
+
+import py_trace
+
+# Live mode: a warm worker that keeps the last run of one program. The
+# program runs one top-level statement at a time; after statements that took
+# a while, the namespace is checkpointed (deep copy). On the next run the new
+# source's top-level statements are compared with the cached ones, the last
+# checkpoint before the first changed statement is restored, and only the
+# rest is executed and traced. The new steps are spliced onto the cached
+# prefix, so latency follows the size of the edit rather than the program.
+#
+# Protocol: one JSON request per stdin line, {"code": str, "timeout"?: seconds,
+# "reset"?: bool}; one JSON response per stdout line,
+# {"trace": [...], "live": {"statements", "resumedAt", "reusedSteps", "elapsedMs"}}.
+#
+# Checkpoints copy the namespace only: module-level state outside it (class
+# attributes, imported modules, random seeds) is not rolled back. Unlike
+# py_trace.main there is no untraced warm-up run, so the first steps only see
+# names defined so far.
+
+DEFAULT_TIMEOUT = 8.0
+# Only checkpoint once this much run time has passed since the previous checkpoint
+CHECKPOINT_MIN_SECONDS = 0.02
+MAX_CHECKPOINTS = 32
+# Total size of the checkpoints kept for one program (estimated, see namespace_bytes)
+MAX_CHECKPOINT_BYTES = 64 * 1024 * 1024
+
+# Shared by reference in checkpoints: can't (or needn't) be deep-copied
+ATOMIC_TYPES = (types.ModuleType, type, types.FunctionType, types.BuiltinFunctionType)
+
+
+def clone_namespace(namespace):
+    """Deep copy of a namespace (aliasing between names preserved), or None if it can't be copied"""
+    memo = {}
+    copied = {}
+    try:
+        for k, v in namespace.items():
+            if k == '__builtins__' or isinstance(v, ATOMIC_TYPES):
+                copied[k] = v
+            else:
+                copied[k] = copy.deepcopy(v, memo)
+    except Exception:
+        return None
+    return copied
+
+
+def namespace_bytes(namespace, limit):
+    """Estimated size of what a checkpoint of `namespace` would copy; stops counting past `limit`"""
+    stack = [v for k, v in namespace.items() if k != '__builtins__']
+    seen = set()
+    total = 0
+    while stack and total <= limit:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, ATOMIC_TYPES):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj, 0)
+        stack.extend(gc.get_referents(obj))
+    return total
+
+
+def program_units(code):
+    """[(key, compile thunk)] for the prelude and each top-level statement of `code`.
+
+    Keys include line numbers: cached steps carry them, so a statement that
+    moved is treated as changed.
+    """
+    prelude_source = py_trace.prelude_for(code)
+    padded = '\n' * (prelude_source.count('\n') + 1) + code
+    units = [(('<prelude>', prelude_source), lambda: py_trace.load_prelude_code(prelude_source))]
+    for node in ast.parse(padded, '<string>').body:
+        key = (node.lineno, node.end_lineno, ast.get_source_segment(padded, node))
+        module = ast.Module(body=[node], type_ignores=[])
+        units.append((key, lambda module=module: compile(module, '<string>', 'exec')))
+    return prelude_source + '\n' + code, units
+
+
+class LiveProgram:
+    """The cached last run: one record per executed unit, plus its trace steps"""
+
+    def __init__(self):
+        self.namespace = {'__name__': '__main__'}
+        # Per executed unit: {'key', 'checkpoint' (namespace copy or None), 'steps', 'output', 'bytes'}
+        self.records = []
+        self.steps = []
+
+    def resume_point(self, keys):
+        """Index of the first unit to execute and the record to restore from (or None)"""
+        changed = 0
+        while (changed < len(keys) and changed < len(self.records) and
+               self.records[changed]['key'] == keys[changed]):
+            changed += 1
+        for i in range(changed - 1, -1, -1):
+            if self.records[i]['checkpoint'] is not None:
+                return i + 1, self.records[i]
+        return 0, None
+
+    def run(self, code, timeout=DEFAULT_TIMEOUT):
+        started = time.perf_counter()
+        full_code, units = program_units(code)
+        keys = [key for key, _ in units]
+        start, restore = self.resume_point(keys)
+
+        session = py_trace.TraceSession()
+        session.reset(full_code)
+        self.namespace.clear()
+        if restore is None:
+            self.namespace['__name__'] = '__main__'
+        else:
+            self.namespace.update(clone_namespace(restore['checkpoint']))
+            session.steps.extend(self.steps[:restore['steps']])
+            session.output.write(restore['output'])
+        reused = len(session.steps)
+        del self.records[start:]
+
+        deadline = started + timeout
+        since_checkpoint = 0.0
+        checkpoints = sum(1 for record in self.records if record['checkpoint'] is not None)
+        checkpoint_bytes = sum(record['bytes'] for record in self.records)
+        error = None
+        for i in range(start, len(units)):
+            code_obj = units[i][1]()
+            # Hide the per-statement module call/return events a whole-module run wouldn't have
+            hidden = ()
+            if i > 0:
+                hidden += ('call',)
+            if i < len(units) - 1:
+                hidden += ('return',)
+            session.seam_events = {code_obj: hidden}
+            session.timeout = max(0.0, deadline - time.perf_counter())
+            unit_started = time.perf_counter()
+            try:
+                session.call(exec, code_obj, self.namespace, self.namespace)
+            except py_trace.TimeoutException:
+                error = f'Execution timed out after {timeout:g} seconds.'
+                break
+            except Exception as e:
+                error = f'Error: {e}'
+                break
+            since_checkpoint += time.perf_counter() - unit_started
+            record = {'key': keys[i], 'checkpoint': None, 'steps': len(session.steps), 'output': None, 'bytes': 0}
+            if since_checkpoint >= CHECKPOINT_MIN_SECONDS and checkpoints < MAX_CHECKPOINTS:
+                output = session.output.getvalue()
+                budget = MAX_CHECKPOINT_BYTES - checkpoint_bytes - len(output)
+                size = namespace_bytes(self.namespace, budget)
+                if size <= budget:
+                    record['checkpoint'] = clone_namespace(self.namespace)
+                if record['checkpoint'] is not None:
+                    record['output'] = output
+                    record['bytes'] = size + len(output)
+                    checkpoints += 1
+                    checkpoint_bytes += record['bytes']
+                    since_checkpoint = 0.0
+            self.records.append(record)
+
+        self.steps = list(session.steps)
+        if error is not None:
+            # Same shape as py_trace.main; statements before the failing one stay cached
+            trace = [{'error': error}]
+        else:
+            session.add_initial_step()
+            trace = list(session.steps)
+        return {
+            'trace': trace,
+            'live': {
+                'statements': len(units) - 1,
+                # Index of the first re-executed top-level statement (0 = from the top)
+                'resumedAt': max(0, start - 1),
+                'reusedSteps': reused,
+                'elapsedMs': round((time.perf_counter() - started) * 1000, 3),
+            },
+        }
+
+
+def main():
+    protocol_in, protocol_out = sys.stdin, sys.stdout
+    # User code must not read the request stream
+    sys.stdin = io.StringIO('')
+    program = LiveProgram()
+    for line in protocol_in:
+        try:
+            request = json.loads(line)
+            if request.get('reset'):
+                program = LiveProgram()
+            response = program.run(request['code'], float(request.get('timeout') or DEFAULT_TIMEOUT))
+        except Exception as e:
+            response = {'trace': [{'error': f'Error: {e}'}]}
+        protocol_out.write(json.dumps(py_trace.sanitize_unicode(response), ensure_ascii=False) + '\n')
+        protocol_out.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import sys
+import json
+import math
+import time
+import random
+import multiprocessing
+
+import py_trace
+
+# Profiling run mode: the same trace-event stream as py_trace, but each event
+# only bumps a per-line hit counter / per-function call counter (no variable
+# snapshots, no visuals). Optionally re-runs one function over a sweep of
+# generated input sizes in a process pool and fits the counts to a
+# complexity class.
+#
+# stdin:  {"code": str, "functionName"?: str, "input"?: "array" | "sorted" |
+#          "reversed" | "string" | "int", "sizes"?: [int], "timeout"?: seconds}
+# stdout: {"lines": {user line: hits}, "functions": {name: calls}, "totalLines",
+#          "output", "error"?, "complexity"?: {...see fit_complexity}}
+
+DEFAULT_SIZES = [8, 16, 32, 64, 128, 256, 512]
+MAX_SIZE = 4096
+MAX_WORKERS = 4
+DEFAULT_TIMEOUT = 5.0
+
+MODELS = [
+    ('O(1)', lambda n: 1.0),
+    ('O(log n)', lambda n: math.log2(n)),
+    ('O(n)', lambda n: float(n)),
+    ('O(n log n)', lambda n: n * math.log2(n)),
+    ('O(n²)', lambda n: float(n * n)),
+]
+
+
+class ProfileSession(py_trace.TraceSession):
+    """TraceSession that only counts line hits and function calls"""
+
+    def __init__(self, line_offset=0, **kwargs):
+        super().__init__(**kwargs)
+        # Lines of injected prelude before the user's code
+        self.line_offset = line_offset
+        self.line_hits = {}
+        self.calls = {}
+
+    def trace(self, frame, event, arg):
+        if frame.f_code.co_filename != '<string>':
+            return
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise py_trace.TimeoutException("Execution timed out")
+        if event == 'line':
+            lineno = frame.f_lineno - self.line_offset
+            if lineno > 0:
+                self.line_hits[lineno] = self.line_hits.get(lineno, 0) + 1
+        elif event == 'call':
+            name = frame.f_code.co_name
+            if name != '<module>' and frame.f_code.co_firstlineno > self.line_offset:
+                self.calls[name] = self.calls.get(name, 0) + 1
+        return self.trace
+
+    def total_lines(self):
+        return sum(self.line_hits.values())
+
+
+def line_offset(code):
+    """Number of prelude lines in front of the user's code (see py_trace.compile_program)"""
+    return py_trace.prelude_for(code).count('\n') + 1
+
+
+def profile_program(code, timeout=DEFAULT_TIMEOUT):
+    """Run the whole program once under a ProfileSession"""
+    full_code, code_objects = py_trace.compile_program(code)
+    session = ProfileSession(line_offset=line_offset(code), timeout=timeout)
+    session.reset(full_code)
+    result = {'error': None}
+    try:
+        session.run(code_objects, {'__name__': '__main__'})
+    except py_trace.TimeoutException:
+        result['error'] = f'Execution timed out after {timeout:g} seconds.'
+    except Exception as e:
+        result['error'] = f'Error: {e}'
+    result.update({
+        'lines': session.line_hits,
+        'functions': session.calls,
+        'totalLines': session.total_lines(),
+        'output': session.output.getvalue(),
+    })
+    return result
+
+
+def generate_input(kind, n):
+    """Deterministic input of size n for the sweep"""
+    rng = random.Random(n)
+    if kind == 'int':
+        return n
+    if kind == 'string':
+        return ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(n))
+    values = [rng.randint(-10 * n, 10 * n) for _ in range(n)]
+    if kind == 'sorted':
+        values.sort()
+    elif kind == 'reversed':
+        values.sort(reverse=True)
+    return values
+
+
+def _measure(job):
+    """Pool worker: line events executed by one call of the function at size n"""
+    code, function_name, kind, n, timeout = job
+    try:
+        full_code, code_objects = py_trace.compile_program(code)
+        namespace = {'__name__': '__main__'}
+        session = ProfileSession(line_offset=line_offset(code), timeout=timeout)
+        # Module body sets up definitions; only the call under test is counted
+        session.exec_program(code_objects, namespace, timeout=timeout)
+        func = namespace.get(function_name)
+        if not callable(func):
+            return n, None, f"function '{function_name}' is not defined"
+        session.call(func, generate_input(kind, n))
+        return n, session.total_lines(), None
+    except py_trace.TimeoutException:
+        return n, None, f'timed out after {timeout:g} seconds'
+    except Exception as e:
+        return n, None, f'Error: {e}'
+
+
+def fit_complexity(sizes, counts):
+    """Fit counts ≈ a + b·f(n) for each model; the best is the smallest residual.
+
+    Returns {'best', 'fits': [{'model', 'a', 'b', 'rss', 'r2'}], 'points': [[n, count]],
+    'curve': [[n, fitted]]}, or None with fewer than three points.
+    """
+    points = [(n, y) for n, y in zip(sizes, counts) if y is not None]
+    if len(points) < 3:
+        return None
+    ys = [y for _, y in points]
+    mean_y = sum(ys) / len(ys)
+    total = sum((y - mean_y) ** 2 for y in ys)
+    fits = []
+    for name, f in MODELS:
+        xs = [f(n) for n, _ in points]
+        mean_x = sum(xs) / len(xs)
+        sxx = sum((x - mean_x) ** 2 for x in xs)
+        if sxx == 0:
+            a, b = mean_y, 0.0
+        else:
+            b = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / sxx
+            a = mean_y - b * mean_x
+        if b < 0:
+            continue
+        rss = sum((y - (a + b * x)) ** 2 for x, y in zip(xs, ys))
+        fits.append({'model': name, 'a': a, 'b': b, 'rss': rss,
+                     'r2': 1 - rss / total if total else 1.0})
+
+    if max(ys) <= min(ys) * 1.1:
+        # Flat within 10%: constant regardless of how well the others fit the noise
+        best = fits[0]
+    else:
+        # O(1) is nested in every other model, so only compare the growing ones
+        growing = [fit for fit in fits if fit['model'] != 'O(1)'] or fits
+        best = min(growing, key=lambda fit: fit['rss'])
+    model = dict(MODELS)[best['model']]
+    return {
+        'best': best['model'],
+        'fits': fits,
+        'points': [[n, y] for n, y in points],
+        'curve': [[n, best['a'] + best['b'] * model(n)] for n, _ in points],
+    }
+
+
+def complexity_sweep(code, function_name, kind='array', sizes=None, timeout=DEFAULT_TIMEOUT):
+    """Count line events of `function_name` at each input size (in parallel) and fit them"""
+    sizes = sorted({max(1, min(int(n), MAX_SIZE)) for n in (sizes or DEFAULT_SIZES)})
+    jobs = [(code, function_name, kind, n, timeout) for n in sizes]
+    ctx = multiprocessing.get_context('fork')
+    with ctx.Pool(processes=min(len(jobs), MAX_WORKERS)) as pool:
+        measured = pool.map(_measure, jobs)
+    counts = [count for _, count, _ in measured]
+    result = fit_complexity(sizes, counts) or {'best': None, 'fits': [], 'points': [], 'curve': []}
+    result['input'] = kind
+    result['sizes'] = sizes
+    result['errors'] = {str(n): error for n, _, error in measured if error}
+    return result
+
+
+def main():
+    try:
+        request = json.loads(sys.stdin.read())
+        code = request['code']
+        timeout = float(request.get('timeout') or DEFAULT_TIMEOUT)
+        result = profile_program(code, timeout)
+        if request.get('functionName'):
+            result['complexity'] = complexity_sweep(code, request['functionName'], request.get('input') or 'array',
+                                                    request.get('sizes'), timeout)
+        print(json.dumps(py_trace.sanitize_unicode(result), ensure_ascii=False))
+    except Exception as e:
+        print(json.dumps({'error': py_trace.sanitize_unicode(f'Error: {str(e)}')}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import sys
+import json
+import copy
+import time
+import bisect
+import multiprocessing
+
+import py_trace
+
+# Race mode: trace several functions on the same input concurrently (one
+# forked worker each) and count comparisons, swaps and array writes per
+# algorithm. Writes and swaps come from diffing successive snapshots of the
+# lists the running frame's last line touched, held only while a running
+# frame binds them; comparisons from executed lines that compare list
+# elements (both from the static pre-pass). A shared timeline maps each playback frame
+# to a step of every trace so the frontend can play them in lockstep.
+#
+# stdin:  {"code": str, "functions": [str], "input": any, "align"?: "ops" | "steps",
+#          "timeout"?: seconds}
+# stdout: {"results": [{"function", "trace", "counts", "timeMs", "tracedMs", "error"}],
+#          "timeline": [[step index per function]], "align"}
+
+MAX_FUNCTIONS = 4
+MAX_FRAMES = 1000
+DEFAULT_TIMEOUT = 5.0
+
+
+class RaceSession(py_trace.TraceSession):
+    """TraceSession that also counts comparisons, swaps and writes, cumulatively per step"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.counts = {'comparisons': 0, 'swaps': 0, 'writes': 0}
+        # id(list) -> [list, snapshot at its last check, number of frames holding it]
+        self._lists = {}
+        # Running frame -> [line it last reported, {name: id(list) bound there}]
+        self._frames = {}
+
+    def trace(self, frame, event, arg):
+        if frame.f_code.co_filename != '<string>':
+            return
+        # Count on every event, also past the step budget, so the totals stay exact
+        self.count_operations(frame, event)
+        recorded = len(self.steps)
+        result = super().trace(frame, event, arg)
+        if len(self.steps) > recorded:
+            self.steps[-1]['counts'] = dict(self.counts)
+        return result
+
+    def count_operations(self, frame, event):
+        counts = self.counts
+        if event == 'line' and self.static_info is not None and frame.f_lineno in self.static_info['compare_lines']:
+            counts['comparisons'] += 1
+        state = self._frames.get(frame)
+        if state is None:
+            state = self._frames[frame] = [None, {}]
+        last_line, bound = state
+        # Only the lists the frame's last line could touch are diffed and re-snapshotted
+        names = None
+        if last_line is not None and self.static_info is not None:
+            names = self.static_info['lines'].get(last_line)
+        local_vars = frame.f_locals
+        if names is None:
+            names = set(local_vars) | set(bound)
+        for name in names:
+            v = local_vars[name] if name in local_vars else frame.f_globals.get(name)
+            if type(v) is not list:
+                if name in bound:
+                    self._release(bound.pop(name))
+                continue
+            entry = self._lists.get(id(v))
+            if entry is not None and entry[0] is v:
+                writes, swaps = diff_lists(entry[1], v)
+                counts['writes'] += writes
+                counts['swaps'] += swaps
+                entry[1] = list(v)
+            else:
+                entry = self._lists[id(v)] = [v, list(v), 0]
+            if bound.get(name) != id(v):
+                if name in bound:
+                    self._release(bound[name])
+                bound[name] = id(v)
+                entry[2] += 1
+        state[0] = frame.f_lineno
+        if event == 'return':
+            # Done with this frame (or suspended, for generators): let its lists go
+            for list_id in bound.values():
+                self._release(list_id)
+            del self._frames[frame]
+
+    def _release(self, list_id):
+        entry = self._lists[list_id]
+        entry[2] -= 1
+        if entry[2] == 0:
+            del self._lists[list_id]
+
+
+def diff_lists(old, new):
+    """(writes, swaps) that turn snapshot `old` into list `new`"""
+    common = min(len(old), len(new))
+    changed = [i for i in range(common) if old[i] is not new[i] and old[i] != new[i]]
+    writes = len(changed) + max(0, len(new) - len(old))
+    swaps = 0
+    # Pairs of slots that exchanged values count as one swap each (2 writes)
+    unmatched = set(changed)
+    for i in changed:
+        if i not in unmatched:
+            continue
+        for j in changed:
+            if j != i and j in unmatched and new[i] == old[j] and new[j] == old[i]:
+                unmatched.discard(i)
+                unmatched.discard(j)
+                swaps += 1
+                break
+    return writes, swaps
+
+
+def race_one(job):
+    """Pool worker: trace one function on its own copy of the input"""
+    code, function_name, value, timeout = job
+    result = {'function': function_name, 'timeMs': None, 'tracedMs': None, 'error': None}
+    session = RaceSession(timeout=timeout)
+    try:
+        full_code, code_objects = py_trace.compile_program(code)
+        namespace = {'__name__': '__main__'}
+        # Module body sets up definitions; only the call under test is traced
+        session.exec_program(code_objects, namespace, timeout=timeout)
+        func = namespace.get(function_name)
+        if not callable(func):
+            raise NameError(f"function '{function_name}' is not defined")
+        session.reset(full_code)
+        start = time.perf_counter()
+        session.call(func, copy.deepcopy(value))
+        result['tracedMs'] = round((time.perf_counter() - start) * 1000, 3)
+        # Untraced run for the wall time (under the same deadline: the input may not be deterministic)
+        cancel = py_trace.start_timeout(timeout)
+        try:
+            start = time.perf_counter()
+            with session.capturing():
+                func(copy.deepcopy(value))
+            result['timeMs'] = round((time.perf_counter() - start) * 1000, 3)
+        finally:
+            cancel()
+        session.add_initial_step()
+    except py_trace.TimeoutException:
+        result['error'] = f'Execution timed out after {timeout:g} seconds.'
+    except Exception as e:
+        result['error'] = f'Error: {e}'
+    result['counts'] = session.counts
+    result['trace'] = list(session.steps)
+    return result
+
+
+def build_timeline(traces, align):
+    """Playback frames -> step index per trace.
+
+    'steps' advances every trace one step per frame; 'ops' advances a shared
+    operation clock (comparisons + writes) so cheaper algorithms finish first.
+    """
+    keys = []
+    for trace in traces:
+        if align == 'steps':
+            keys.append(list(range(len(trace))))
+        else:
+            keys.append([sum((step.get('counts') or {}).get(k, 0) for k in ('comparisons', 'writes'))
+                         for step in trace])
+    ticks = sorted({key for trace_keys in keys for key in trace_keys})
+    if len(ticks) > MAX_FRAMES:
+        stride = (len(ticks) - 1) / (MAX_FRAMES - 1)
+        ticks = [ticks[round(i * stride)] for i in range(MAX_FRAMES)]
+    timeline = []
+    for tick in ticks:
+        frame = []
+        for trace_keys in keys:
+            # Last step at or before this tick (step keys never decrease)
+            frame.append(max(0, bisect.bisect_right(trace_keys, tick) - 1) if trace_keys else 0)
+        timeline.append(frame)
+    return timeline
+
+
+def run_race(request):
+    code = request['code']
+    functions = list(dict.fromkeys(request.get('functions') or []))[:MAX_FUNCTIONS]
+    if not functions:
+        raise ValueError('Provide at least one function name.')
+    align = 'steps' if request.get('align') == 'steps' else 'ops'
+    timeout = float(request.get('timeout') or DEFAULT_TIMEOUT)
+    jobs = [(code, name, request.get('input'), timeout) for name in functions]
+    ctx = multiprocessing.get_context('fork')
+    with ctx.Pool(processes=len(jobs)) as pool:
+        results = pool.map(race_one, jobs)
+    return {'results': results, 'timeline': build_timeline([r['trace'] for r in results], align), 'align': align}
+
+
+def main():
+    try:
+        request = json.loads(sys.stdin.read())
+        print(json.dumps(py_trace.sanitize_unicode(run_race(request)), ensure_ascii=False))
+    except Exception as e:
+        print(json.dumps({'error': py_trace.sanitize_unicode(f'Error: {str(e)}')}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
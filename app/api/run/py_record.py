@@ -0,0 +1,428 @@
+import ast
+import builtins
+import collections
+import copy
+import heapq
+import types
+import weakref
+
+# Opt-in mutation recording: the program's own list/dict literals and
+# constructor calls, deques and heapq calls go through thin proxies that log
+# every mutation, so the tracer gets exact operation labels and counters
+# instead of guessing from variable names.
+
+# Mutation events since the start of the run: {'id', 'op', 'index', 'value'}
+log = []
+# Per-container counters of live containers: id -> {'writes', 'swaps', 'comparisons'}
+counts = {}
+# Serializer for logged values (the tracer installs safe_serialize)
+serialize = repr
+
+SCALAR_TYPES = (int, float, str, bool, type(None))
+
+_next_id = [0]
+_snapshots = {}
+
+
+def _new_id(container):
+    """Id and zeroed counters for a new tracked container, dropped when it is collected"""
+    _next_id[0] += 1
+    rid = _next_id[0]
+    counts[rid] = {'writes': 0, 'swaps': 0, 'comparisons': 0}
+    weakref.finalize(container, _forget, rid)
+    return rid
+
+
+def _forget(rid):
+    counts.pop(rid, None)
+    _snapshots.pop(rid, None)
+
+
+def _record(container, op, index=None, value=None, values=None):
+    """Append a mutation event for `container` and bump its version"""
+    container._version += 1
+    counts[container._rid]['writes'] += 1
+    event = {'id': container._rid, 'op': op}
+    if index is not None:
+        event['index'] = index
+    if value is not None:
+        event['value'] = serialize(value)
+    if values is not None:
+        event['values'] = serialize(list(values))
+    log.append(event)
+    return event
+
+
+class TrackedList(list):
+    """list that records every mutation"""
+    __slots__ = ('_rid', '_version', '_last_set', '__weakref__')
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._rid = _new_id(self)
+        self._version = 0
+        self._last_set = None
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            super().__setitem__(index, value)
+            _record(self, 'setslice', values=self)
+            return
+        old = self[index]
+        super().__setitem__(index, value)
+        if index < 0:
+            index += len(self)
+        # Two back-to-back writes exchanging a pair of slots are a swap (a[i], a[j] = a[j], a[i])
+        last = self._last_set
+        if (last is not None and log and log[-1] is last[0] and last[1] != index and
+                last[2] is value and last[3] is old):
+            self._version += 1
+            counts[self._rid]['writes'] += 1
+            counts[self._rid]['swaps'] += 1
+            last[0]['op'] = 'swap'
+            last[0]['index'] = [last[1], index]
+            last[0].pop('value', None)
+            self._last_set = None
+            return
+        self._last_set = (_record(self, 'set', index, value), index, old, value)
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        _record(self, 'delete', None if isinstance(index, slice) else index, values=self)
+
+    def __iadd__(self, other):
+        start = len(self)
+        result = super().__iadd__(other)
+        _record(self, 'extend', start, values=self[start:])
+        return result
+
+    def __add__(self, other):
+        return TrackedList(list.__add__(self, other))
+
+    def __mul__(self, n):
+        return TrackedList(list.__mul__(self, n))
+
+    __rmul__ = __mul__
+
+    def __imul__(self, n):
+        result = super().__imul__(n)
+        _record(self, 'setslice', values=self)
+        return result
+
+    def copy(self):
+        return TrackedList(self)
+
+    def append(self, value):
+        super().append(value)
+        _record(self, 'append', len(self) - 1, value)
+
+    def extend(self, values):
+        start = len(self)
+        super().extend(values)
+        _record(self, 'extend', start, values=self[start:])
+
+    def insert(self, index, value):
+        super().insert(index, value)
+        _record(self, 'insert', min(max(index if index >= 0 else len(self) - 1 + index, 0), len(self) - 1), value)
+
+    def pop(self, index=-1):
+        value = super().pop(index)
+        _record(self, 'pop', index if index >= 0 else len(self) + 1 + index, value)
+        return value
+
+    def remove(self, value):
+        index = self.index(value)
+        super().remove(value)
+        _record(self, 'pop', index, value)
+
+    def clear(self):
+        super().clear()
+        _record(self, 'clear')
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        _record(self, 'sort', values=self)
+
+    def reverse(self):
+        super().reverse()
+        _record(self, 'reverse', values=self)
+
+
+class TrackedDict(dict):
+    """dict that records every mutation"""
+    __slots__ = ('_rid', '_version', '__weakref__')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._rid = _new_id(self)
+        self._version = 0
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        _record(self, 'setkey', str(key), value)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        _record(self, 'delkey', str(key))
+
+    def pop(self, key, *default):
+        had = key in self
+        value = super().pop(key, *default)
+        if had:
+            _record(self, 'delkey', str(key), value)
+        return value
+
+    def popitem(self):
+        key, value = super().popitem()
+        _record(self, 'delkey', str(key), value)
+        return key, value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return super().__getitem__(key)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def clear(self):
+        super().clear()
+        _record(self, 'clear')
+
+    def copy(self):
+        return TrackedDict(self)
+
+
+class TrackedDeque(collections.deque):
+    """collections.deque that records every mutation"""
+    __slots__ = ('_rid', '_version')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._rid = _new_id(self)
+        self._version = 0
+
+    def __repr__(self):
+        # Printed and serialized like the deque it stands in for
+        return repr(collections.deque(self, self.maxlen))
+
+    def append(self, value):
+        super().append(value)
+        _record(self, 'append', len(self) - 1, value)
+
+    def appendleft(self, value):
+        super().appendleft(value)
+        _record(self, 'insert', 0, value)
+
+    def pop(self):
+        value = super().pop()
+        _record(self, 'pop', len(self), value)
+        return value
+
+    def popleft(self):
+        value = super().popleft()
+        _record(self, 'pop', 0, value)
+        return value
+
+    def extend(self, values):
+        start = len(self)
+        super().extend(values)
+        _record(self, 'extend', start, values=list(self)[start:])
+
+    def extendleft(self, values):
+        super().extendleft(values)
+        _record(self, 'setslice', values=self)
+
+    def rotate(self, n=1):
+        super().rotate(n)
+        _record(self, 'setslice', values=self)
+
+    def clear(self):
+        super().clear()
+        _record(self, 'clear')
+
+    def insert(self, index, value):
+        super().insert(index, value)
+        _record(self, 'insert', min(max(index if index >= 0 else len(self) - 1 + index, 0), len(self) - 1), value)
+
+    def remove(self, value):
+        index = self.index(value)
+        super().remove(value)
+        _record(self, 'pop', index, value)
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        _record(self, 'set', index if index >= 0 else len(self) + index, value)
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        _record(self, 'delete', index if index >= 0 else len(self) + 1 + index, values=self)
+
+    def __iadd__(self, other):
+        start = len(self)
+        result = super().__iadd__(other)
+        _record(self, 'extend', start, values=list(self)[start:])
+        return result
+
+    def __imul__(self, n):
+        result = super().__imul__(n)
+        _record(self, 'setslice', values=self)
+        return result
+
+
+def _tracked_heap_function(func, op):
+    """Wrap a heapq function: sift moves are invisible, so log the resulting heap"""
+    def wrapper(heap, *args, **kwargs):
+        result = func(heap, *args, **kwargs)
+        if isinstance(heap, TrackedList):
+            _record(heap, op, value=result if op == 'heappop' else (args[0] if args else None), values=heap)
+        return result
+    wrapper.__name__ = func.__name__
+    return wrapper
+
+
+def _make_modules():
+    tracked_heapq = types.ModuleType('heapq')
+    tracked_heapq.__dict__.update(heapq.__dict__)
+    for name, op in (('heappush', 'heappush'), ('heappop', 'heappop'), ('heapify', 'heapify'),
+                     ('heapreplace', 'heappop'), ('heappushpop', 'heappush')):
+        setattr(tracked_heapq, name, _tracked_heap_function(getattr(heapq, name), op))
+    tracked_collections = types.ModuleType('collections')
+    tracked_collections.__dict__.update(collections.__dict__)
+    tracked_collections.deque = TrackedDeque
+    return {'heapq': tracked_heapq, 'collections': tracked_collections}
+
+
+_modules = _make_modules()
+
+
+def _tracked_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level == 0 and name in _modules:
+        return _modules[name]
+    return builtins.__import__(name, globals, locals, fromlist, level)
+
+
+class _WrapLiterals(ast.NodeTransformer):
+    """Route list/dict displays, comprehensions and list()/dict() calls through the tracked types.
+
+    The builtins themselves stay untouched: lists the runtime creates
+    (str.split, sorted, **kwargs, slices) are plain lists, as without recording.
+    """
+
+    def __init__(self, rebound):
+        # Constructor names the program rebinds: calls to those aren't the builtin
+        self.rebound = rebound
+
+    def _wrap(self, node, func):
+        self.generic_visit(node)
+        if isinstance(getattr(node, 'ctx', None), (ast.Store, ast.Del)):
+            return node
+        call = ast.Call(func=ast.Name(id=func, ctx=ast.Load()), args=[node], keywords=[])
+        return ast.copy_location(call, node)
+
+    def visit_List(self, node):
+        return self._wrap(node, '__tracked_list__')
+
+    def visit_ListComp(self, node):
+        return self._wrap(node, '__tracked_list__')
+
+    def visit_Dict(self, node):
+        return self._wrap(node, '__tracked_dict__')
+
+    def visit_DictComp(self, node):
+        return self._wrap(node, '__tracked_dict__')
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        func = node.func
+        if isinstance(func, ast.Name) and func.id in TRACKED_CONSTRUCTORS and func.id not in self.rebound:
+            node.func = ast.copy_location(ast.Name(id=TRACKED_CONSTRUCTORS[func.id], ctx=ast.Load()), func)
+        return node
+
+
+# Explicit constructor calls rewritten by _WrapLiterals
+TRACKED_CONSTRUCTORS = {'list': '__tracked_list__', 'dict': '__tracked_dict__'}
+
+
+def _rebound_names(tree):
+    """Names the program binds itself (assignments, defs, arguments, imports)"""
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+            names.add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.arg):
+            names.add(node.arg)
+        elif isinstance(node, ast.alias):
+            names.add(node.asname or node.name.split('.')[0])
+    return names
+
+
+def compile_tracked(code):
+    """Compile `code` with list/dict literals and constructor calls rewritten to tracked containers"""
+    tree = ast.parse(code)
+    tree = _WrapLiterals(_rebound_names(tree)).visit(tree)
+    ast.fix_missing_locations(tree)
+    return compile(tree, '<string>', 'exec')
+
+
+def install(namespace):
+    """Provide the tracked constructors and the deque/heapq-swapping import inside `namespace`"""
+    tracked_builtins = dict(builtins.__dict__)
+    tracked_builtins.update({
+        '__import__': _tracked_import,
+        '__tracked_list__': TrackedList,
+        '__tracked_dict__': TrackedDict,
+    })
+    namespace['__builtins__'] = tracked_builtins
+
+
+def reset():
+    """Forget events and zero counters (containers from an earlier run keep their ids)"""
+    del log[:]
+    for c in counts.values():
+        c['writes'] = c['swaps'] = c['comparisons'] = 0
+    _snapshots.clear()
+
+
+def is_tracked(obj):
+    return isinstance(obj, (TrackedList, TrackedDict, TrackedDeque))
+
+
+def snapshot(obj):
+    """Copy of a tracked container's values, reused while its version is unchanged.
+
+    Containers holding other containers can change without their own version
+    moving, so those are always deep-copied.
+    """
+    cached = _snapshots.get(obj._rid)
+    if cached is not None and cached[0] == obj._version:
+        return cached[1]
+    values = list(obj)
+    if all(isinstance(v, SCALAR_TYPES) for v in values):
+        _snapshots[obj._rid] = (obj._version, values)
+        return values
+    return copy.deepcopy(values)
+
+
+def count_comparisons(names, frame):
+    """Count one comparison for each tracked container the current line compares elements of"""
+    for name in names:
+        obj = frame.f_locals.get(name, frame.f_globals.get(name))
+        if is_tracked(obj):
+            counts[obj._rid]['comparisons'] += 1
+
+
+def last_event(obj, events):
+    """Most recent mutation of `obj` among `events`"""
+    rid = obj._rid
+    for event in reversed(events):
+        if event['id'] == rid:
+            return event
+    return None
@@ -0,0 +1,243 @@
+import ast
+
+# Function / method names that behave like container operations
+OPERATION_NAMES = {
+    'push': 'push', 'pop': 'pop', 'peek': 'peek', 'top': 'peek',
+    'enqueue': 'enqueue', 'offer': 'enqueue',
+    'dequeue': 'dequeue', 'poll': 'dequeue',
+}
+
+# Method calls that reveal the operation a function body performs
+BODY_OPERATIONS = {
+    'append': 'push', 'appendleft': 'push', 'heappush': 'push',
+    'pop': 'pop', 'heappop': 'pop',
+    'popleft': 'dequeue',
+}
+
+# Builtins whose use means we can't know statically what a line touches
+DYNAMIC_CALLS = {'exec', 'eval', 'globals', 'locals', 'vars', 'setattr', 'delattr'}
+
+
+def _base_name(node):
+    """Return the root variable name of an attribute/subscript chain (a.b[0].c -> a)"""
+    while isinstance(node, (ast.Attribute, ast.Subscript, ast.Starred)):
+        node = node.value
+    if isinstance(node, ast.Name):
+        return node.id
+    return None
+
+
+def _statement_lines(node):
+    """Line numbers a statement can be reported on (first line only for compound statements)"""
+    start = getattr(node, 'lineno', None)
+    if start is None:
+        return []
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.If, ast.For,
+                         ast.AsyncFor, ast.While, ast.With, ast.AsyncWith, ast.Try)):
+        return [start]
+    end = getattr(node, 'end_lineno', None) or start
+    return list(range(start, end + 1))
+
+
+def _header_nodes(node):
+    """Expressions evaluated on the first line of a compound statement"""
+    if isinstance(node, (ast.If, ast.While)):
+        return [node.test]
+    if isinstance(node, (ast.For, ast.AsyncFor)):
+        return [node.target, node.iter]
+    if isinstance(node, (ast.With, ast.AsyncWith)):
+        return list(node.items)
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return list(node.decorator_list)
+    if isinstance(node, ast.Try):
+        return []
+    return [node]
+
+
+def _names_in(nodes):
+    """Collect every variable name read or written by the given nodes.
+
+    Returns None when the nodes do something we can't follow statically
+    (exec/eval, global/nonlocal rebinding), meaning "refresh everything".
+    """
+    names = set()
+    for root in nodes:
+        for sub in ast.walk(root):
+            if isinstance(sub, ast.Name):
+                names.add(sub.id)
+            elif isinstance(sub, (ast.Attribute, ast.Subscript)):
+                base = _base_name(sub)
+                if base:
+                    names.add(base)
+            elif isinstance(sub, (ast.Global, ast.Nonlocal)):
+                return None
+            elif isinstance(sub, ast.Call) and isinstance(sub.func, ast.Name) and sub.func.id in DYNAMIC_CALLS:
+                return None
+            elif isinstance(sub, ast.arg):
+                names.add(sub.arg)
+            elif isinstance(sub, ast.ExceptHandler) and sub.name:
+                names.add(sub.name)
+    return names
+
+
+def _called_name(call):
+    """Name of the function or method a call invokes (x.append(...) -> 'append'), or None"""
+    if isinstance(call.func, ast.Attribute):
+        return call.func.attr
+    if isinstance(call.func, ast.Name):
+        return call.func.id
+    return None
+
+
+def _self_attribute(node):
+    """Attribute name of a `self.<name>` expression, or None"""
+    if (isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and
+            node.value.id == 'self'):
+        return node.attr
+    return None
+
+
+def _container_attribute(cls):
+    """The one list/deque attribute a class wraps (self.items = []), or None.
+
+    Classes holding several containers (graphs, trees, LRU caches) return None:
+    their append/pop calls don't make a method a push/pop.
+    """
+    attrs = set()
+    for sub in ast.walk(cls):
+        if not isinstance(sub, ast.Assign):
+            continue
+        value = sub.value
+        is_container = (isinstance(value, (ast.List, ast.ListComp)) or
+                        (isinstance(value, ast.Call) and _called_name(value) in ('list', 'deque')))
+        for target in sub.targets:
+            name = _self_attribute(target)
+            if name is not None:
+                if is_container:
+                    attrs.add(name)
+                else:
+                    attrs.discard(name)
+    return attrs.pop() if len(attrs) == 1 else None
+
+
+def _function_operation(func, container=None):
+    """Classify a function as push/pop/peek/enqueue/dequeue-like, or None.
+
+    `container` is the single container attribute of the enclosing class (see
+    _container_attribute); without one only the function's name counts.
+    """
+    kind = OPERATION_NAMES.get(func.name.lower())
+    if kind:
+        return kind
+    # Only short methods wrapping a call on the container (def add(self, x): self.items.append(x))
+    args = func.args.args
+    if container is None or not args or args[0].arg != 'self' or len(func.body) > 3:
+        return None
+    for sub in ast.walk(func):
+        if isinstance(sub, ast.Call):
+            called = _called_name(sub)
+            if called not in BODY_OPERATIONS:
+                continue
+            # self.items.append(x) or heappush(self.items, x)
+            if isinstance(sub.func, ast.Attribute):
+                receiver = sub.func.value
+            else:
+                receiver = sub.args[0] if sub.args else None
+            if _self_attribute(receiver) == container:
+                return BODY_OPERATIONS[called]
+    return None
+
+
+def _qualified_functions(tree):
+    """[(qualified name, function node, enclosing class or None)], qualified as in co_qualname"""
+    found = []
+
+    def visit(node, prefix, cls):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                qualname = prefix + child.name
+                found.append((qualname, child, cls))
+                visit(child, qualname + '.<locals>.', None)
+            elif isinstance(child, ast.ClassDef):
+                visit(child, prefix + child.name + '.', child)
+            else:
+                visit(child, prefix, cls)
+
+    visit(tree, '', None)
+    return found
+
+
+def _operation_argument(func):
+    """Name of the argument carrying the pushed/enqueued value (first non-self argument)"""
+    args = [a.arg for a in func.args.args]
+    if args and args[0] in ('self', 'cls'):
+        args = args[1:]
+    return args[0] if args else None
+
+
+def analyze_code(code):
+    """Statically analyse user code before tracing.
+
+    Returns a dict with:
+      'lines':      {lineno: set of names the line can read or write, or None if unknown}
+      'functions':  {qualified function name: operation kind ('push', 'pop', ...)}
+      'op_args':    {qualified function name: argument name holding the operation value}
+      'compare_lines': {lineno: names whose elements the line compares}
+      'index_names': names used inside subscripts (grid pointer candidates)
+    If the code does not parse, returns None and the tracer falls back to
+    re-serializing everything on every step.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+
+    lines = {}
+    functions = {}
+    op_args = {}
+    compare_lines = {}
+    index_names = set()
+
+    def mark(lineno, names):
+        if names is None or lines.get(lineno, set()) is None:
+            lines[lineno] = None
+        else:
+            lines.setdefault(lineno, set()).update(names)
+
+    # Keyed on qualified names (Stack.pop, Graph.pop, pop): same-named functions don't collide
+    containers = {}
+    for qualname, func, cls in _qualified_functions(tree):
+        if cls is not None and cls not in containers:
+            containers[cls] = _container_attribute(cls)
+        kind = _function_operation(func, containers.get(cls))
+        if kind:
+            functions[qualname] = kind
+            arg = _operation_argument(func)
+            if arg:
+                op_args[qualname] = arg
+
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            # The 'call' event reports the def line; every argument is new there
+            mark(node.lineno, {a.arg for a in node.args.args + node.args.kwonlyargs})
+        if isinstance(node, ast.stmt):
+            names = _names_in(_header_nodes(node))
+            for lineno in _statement_lines(node):
+                mark(lineno, names)
+        elif isinstance(node, ast.Compare):
+            # Element comparisons (arr[j] > arr[j + 1]) for the operation counters
+            compared = {_base_name(sub) for sub in ast.walk(node) if isinstance(sub, ast.Subscript)}
+            compared.discard(None)
+            if compared:
+                compare_lines.setdefault(node.lineno, set()).update(compared)
+        elif isinstance(node, ast.Subscript):
+            # Variables used as indices (grid[r][c]) are the grid pointer candidates
+            index_names.update(sub.id for sub in ast.walk(node.slice) if isinstance(sub, ast.Name))
+        elif isinstance(node, ast.ExceptHandler):
+            names = _names_in([node.type] if node.type else [])
+            if names is not None and node.name:
+                names.add(node.name)
+            mark(node.lineno, names)
+
+    return {'lines': lines, 'functions': functions, 'op_args': op_args, 'compare_lines': compare_lines,
+            'index_names': index_names}
@@ -0,0 +1,180 @@
+import os
+import json
+
+# Bounded-memory step buffer for TraceSession. Every step is accounted by its
+# encoded (JSON) size. While the in-memory steps stay under MEMORY_BUDGET they
+# are kept as dicts; past it, the oldest ones are encoded and appended to an
+# anonymous temp file (one JSON document per line) and read back through mmap
+# on access or when the trace is written out. Past MAX_TRACE_BYTES in total,
+# the log stops accepting steps and ends with a `truncated` marker step.
+#
+# The most recent step always stays in memory: callers may still amend it
+# right after appending (e.g. py_race adds operation counts).
+
+MEMORY_BUDGET = int(os.environ.get('DSA_TRACE_MEMORY_BUDGET', 32 * 1024 * 1024))
+MAX_TRACE_BYTES = int(os.environ.get('DSA_TRACE_MAX_BYTES', 256 * 1024 * 1024))
+
+
+def encode_step(step):
+    """Compact UTF-8 JSON for one step (surrogates replaced, as in py_trace.sanitize_unicode)"""
+    return json.dumps(step, ensure_ascii=False, separators=(',', ':')).encode('utf-8', 'replace')
+
+
+class StepLog:
+    """List-like step buffer with a memory budget, spilling older steps to disk"""
+
+    def __init__(self, memory_budget=MEMORY_BUDGET, max_bytes=MAX_TRACE_BYTES):
+        self.memory_budget = memory_budget
+        self.max_bytes = max_bytes
+        # Steps inserted in front of the log (the initial-state step); small, kept in memory
+        self._prefix = []
+        # Spilled steps: byte offsets of each record in the file, plus the end offset
+        self._file = None
+        self._map = None
+        self._offsets = [0]
+        # In-memory steps after the spilled ones, with their encoded sizes
+        # (the newest step is measured when the next one arrives)
+        self._memory = []
+        self._sizes = []
+        self.memory_bytes = 0
+        self.total_bytes = 0
+        self.truncated = False
+
+    @property
+    def spilled(self):
+        return len(self._offsets) - 1
+
+    def __len__(self):
+        return len(self._prefix) + self.spilled + len(self._memory)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        yield from self._prefix
+        for i in range(self.spilled):
+            yield self._read(i)
+        yield from self._memory
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        n = len(self)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError('step index out of range')
+        if index < len(self._prefix):
+            return self._prefix[index]
+        index -= len(self._prefix)
+        if index < self.spilled:
+            return self._read(index)
+        return self._memory[index - self.spilled]
+
+    def step_bytes(self, index):
+        """Encoded size of step `index` (per-step memory accounting)"""
+        n = len(self)
+        if index < 0:
+            index += n
+        if index < len(self._prefix):
+            return len(encode_step(self._prefix[index]))
+        index -= len(self._prefix)
+        if index < self.spilled:
+            return self._offsets[index + 1] - self._offsets[index] - 1
+        index -= self.spilled
+        size = self._sizes[index]
+        return size if size is not None else len(encode_step(self._memory[index]))
+
+    def append(self, step):
+        if self.truncated:
+            return
+        if self._memory:
+            self._account(len(self._memory) - 1)
+        if self.total_bytes > self.max_bytes:
+            self.truncated = True
+            self._memory.append({
+                'truncated': True,
+                'error': f'Trace truncated after {len(self)} steps: the step log reached its '
+                         f'{self.max_bytes / (1024 * 1024):.3g} MB limit.',
+            })
+            self._sizes.append(None)
+            return
+        self._memory.append(step)
+        self._sizes.append(None)
+        if self.memory_bytes > self.memory_budget:
+            self._spill()
+
+    def extend(self, steps):
+        for step in steps:
+            self.append(step)
+
+    def insert(self, index, step):
+        """Only inserting at the front is supported (initial-state steps)"""
+        if index != 0:
+            raise IndexError('StepLog only supports insert(0, step)')
+        self._prefix.insert(0, step)
+
+    def _account(self, i):
+        if self._sizes[i] is None:
+            size = len(encode_step(self._memory[i]))
+            self._sizes[i] = size
+            self.memory_bytes += size
+            self.total_bytes += size
+
+    def _spill(self):
+        """Move every in-memory step but the newest to the spill file"""
+        import tempfile
+        if self._file is None:
+            # Unlinked on creation: nothing is left behind if the tracer is killed
+            self._file = tempfile.TemporaryFile(prefix='dsa-steps-')
+        keep = self._memory[-1:]
+        records = [encode_step(step) + b'\n' for step in self._memory[:-1]]
+        self._file.seek(0, os.SEEK_END)
+        self._file.write(b''.join(records))
+        end = self._offsets[-1]
+        for record in records:
+            end += len(record)
+            self._offsets.append(end)
+        self._memory = keep
+        self._sizes = self._sizes[-1:]
+        self.memory_bytes = 0
+
+    def _spilled_view(self):
+        """mmap of the spill file, re-mapped after it grew"""
+        import mmap
+        if self._map is None or len(self._map) < self._offsets[-1]:
+            if self._map is not None:
+                self._map.close()
+            self._file.flush()
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def _read(self, i):
+        view = self._spilled_view()
+        return json.loads(view[self._offsets[i]:self._offsets[i + 1] - 1])
+
+    def write_json(self, out):
+        """Write the whole log as one JSON array to text stream `out`; spilled records are copied as-is"""
+        out.write('[')
+        first = True
+        for step in self._prefix:
+            out.write(('' if first else ',') + encode_step(step).decode('utf-8'))
+            first = False
+        if self.spilled:
+            view = self._spilled_view()
+            for i in range(self.spilled):
+                record = view[self._offsets[i]:self._offsets[i + 1] - 1]
+                out.write(('' if first else ',') + record.decode('utf-8'))
+                first = False
+        for step in self._memory:
+            out.write(('' if first else ',') + encode_step(step).decode('utf-8'))
+            first = False
+        out.write(']\n')
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -1,42 +1,107 @@
+import time
+_started = time.perf_counter()
+
 import sys
 import json
 import io
-import traceback
-import inspect
-import copy
-import threading
 import re
 import collections
+import array
+import _thread
+from py_static import analyze_code
+import py_grid
+from py_steplog import StepLog
+_imported = time.perf_counter()
+
+# Imported on first use to keep startup short: copy, base64, traceback,
+# threading, signal, and py_record (only when recording mutations)
 
-# Global variable for storing trace steps
-steps = []
+# Default step budget per trace
 MAX_STEPS = 1000
 
+# Per-thread running TraceSession (print routing, see SessionStdout)
+_active = _thread._local()
+# py_record keeps one process-wide mutation log, so recording sessions take turns
+RECORD_LOCK = _thread.allocate_lock()
+
+# Precompiled regexes for prepare_code / run_user_code
+TYPING_HINT_RE = {t: re.compile(r'\b' + t + r'\[') for t in ['List', 'Dict', 'Tuple', 'Set', 'Optional']}
+SORT_CALL_RE = re.compile(r'(?<!def )(bubble_sort|quick_sort|merge_sort|insertion_sort|selection_sort)\((\w+)\)')
+NAME_ERROR_RE = re.compile(r"NameError: name '([^']+)' is not defined")
+
+# Compiled preludes by source, per process. Deliberately not cached on disk: a
+# shared cache directory is writable by the traced code, which could plant
+# bytecode for the next run; compiling the prelude takes under a millisecond.
+_prelude_code = {}
+
+SCALAR_TYPES = (int, float, str, bool, complex, bytes, type(None))
+# memoryview formats shipped as raw little-endian bytes (see buffer_payload)
+BUFFER_FORMATS = set('bBhHiIlLqQfd?')
+HIDDEN_NAMES = {'copy', 'List', 'Dict', 'Set', 'Tuple', 'Optional', 'ListNode', 'TreeNode', 'Node',
+                'traverse', 'print_list', 'create_linked_list', 'list_to_array', 'print_tree'}
+
 # Timeout exception
 class TimeoutException(Exception):
     pass
 
-def timeout_handler():
+def timeout_handler(*args):
     raise TimeoutException("Execution timed out")
 
-def safe_serialize(obj):
-    """Safely serialize an object for JSON output"""
+def buffer_view(obj):
+    """memoryview over a 1-D/2-D numeric buffer (NumPy array, array.array, bytearray), or None"""
+    if not (isinstance(obj, (bytearray, memoryview, array.array)) or hasattr(type(obj), '__array_interface__')):
+        return None
+    try:
+        view = memoryview(obj)
+    except (TypeError, ValueError):
+        return None
+    if view.ndim not in (1, 2) or sys.byteorder != 'little' or view.format.lstrip('@=<') not in BUFFER_FORMATS:
+        return None
+    return view
+
+def buffer_payload(view):
+    """Typed binary payload for a buffer: one memcpy + base64, no per-element Python objects"""
+    import base64
+    return {
+        '__buffer__': True,
+        'format': view.format.lstrip('@=<'),
+        'itemsize': view.itemsize,
+        'shape': list(view.shape),
+        'data': base64.b64encode(view.tobytes()).decode('ascii')
+    }
+
+def safe_serialize(obj, ids=None):
+    """Safely serialize an object for JSON output.
+
+    If `ids` is given, the id of every container/object visited is added to it
+    so the tracer knows which cached snapshots a later mutation invalidates.
+    """
     try:
         if isinstance(obj, (int, float, str, bool, type(None))):
             return obj
-        elif isinstance(obj, (list, tuple)):
-            return [safe_serialize(item) for item in obj]
+        if ids is not None:
+            ids.add(id(obj))
+        if isinstance(obj, (list, tuple)):
+            return [safe_serialize(item, ids) for item in obj]
         elif isinstance(obj, dict):
-            return {str(k): safe_serialize(v) for k, v in obj.items()}
+            return {str(k): safe_serialize(v, ids) for k, v in obj.items()}
+        elif buffer_view(obj) is not None:
+            return buffer_payload(buffer_view(obj))
+        elif hasattr(type(obj), '__array_interface__') and hasattr(obj, 'tolist'):
+            # NumPy arrays we can't ship as raw bytes (object dtype, 3-D, big-endian)
+            return safe_serialize(obj.tolist(), ids)
         elif hasattr(obj, '__dict__'):
-            # For objects, try to serialize their attributes
+            # For objects, try to serialize their attributes. Class attributes show
+            # through, so the object is stale whenever its class changes too
+            if ids is not None:
+                ids.add(id(type(obj)))
             attrs = {}
             for attr in dir(obj):
                 if not attr.startswith('__'):
                     try:
                         value = getattr(obj, attr)
                         if not callable(value):
-                            attrs[attr] = safe_serialize(value)
+                            attrs[attr] = safe_serialize(value, ids)
                     except:
                         pass
             return attrs
@@ -66,17 +131,18 @@ def detect_pointers(local_vars, array_length):
                     pointers[idx].append(var_name + ' (1-based)')
     return pointers
 
-def detect_stack_operations(local_vars, step):
+def detect_stack_operations(local_vars, step, session):
     """Detect stack operations and special features"""
+    import copy
     stack_data = {}
     
     # Detect stack arrays - including class attributes and deep scan for .stack in all objects
     stack_arrays = {}
     
-    # Direct stack variables
+    # Direct stack variables (any list, if the code defines push/pop/peek-like functions)
+    has_stack_ops = any(kind in ('push', 'pop', 'peek') for kind in session.static_operations().values())
     for k, v in local_vars.items():
-        if isinstance(v, list) and (k.lower().find('stack') != -1 or 
-                                   any(op in str(local_vars).lower() for op in ['push', 'pop', 'peek'])):
+        if isinstance(v, list) and (k.lower().find('stack') != -1 or has_stack_ops):
             stack_arrays[k] = v
     
     # Stack variables in class instances (deep scan for .stack attribute)
@@ -151,15 +217,14 @@ def detect_stack_operations(local_vars, step):
     
     return stack_data
 
-def detect_visuals(local_vars, step):
+# Mutation-log ops shown as stack operations
+STACK_OPS = {'append': 'push', 'pop': 'pop'}
+
+def detect_visuals(local_vars, step, session):
     try:
         visuals = []
-        # Get current function name from call stack if available
-        current_function = None
-        if 'call_stack' in step and step['call_stack']:
-            current_function = step['call_stack'][-1]['function']
-            if current_function == '<module>' and len(step['call_stack']) > 1:
-                current_function = step['call_stack'][-2]['function']
+        # Operation of the function being traced, from the static pre-pass
+        current_operation = session.current_operation
 
         # Helper: find all lists, with their names and parent objects
         def find_all_lists(obj, prefix='', seen=None, parent_name=None):
@@ -213,7 +278,7 @@ def detect_visuals(local_vars, step):
             list_id = id(lst)
             is_stack = (
                 'stack' in name.lower() or
-                (current_function is not None and current_function.lower() in ['push', 'pop', 'peek'])
+                current_operation in ('push', 'pop', 'peek')
             )
             # Prefer stack name if available
             if list_id not in id_to_info:
@@ -236,11 +301,15 @@ def detect_visuals(local_vars, step):
 
         # Only one visual per unique list, with best name and type
         for info in id_to_info.values():
-            arr_snapshot = copy.deepcopy(info['lst'])
+            arr_snapshot = session.snapshot_values(info['lst'])
             if info['is_stack']:
                 visual = {'type': 'stack', 'values': arr_snapshot, 'name': info['name']}
+                if step.get('operation') in ('push', 'pop', 'peek'):
+                    visual['operation'] = step['operation']
+                    visual['operationValue'] = step.get('operationValue')
             else:
                 visual = {'type': 'array', 'values': arr_snapshot, 'name': info['name']}
+            session.add_mutation_info(visual, info['lst'], step)
             pointers = detect_pointers(local_vars, len(arr_snapshot))
             if pointers:
                 visual['pointers'] = pointers
@@ -251,13 +320,36 @@ def detect_visuals(local_vars, step):
             if not (isinstance(lst, list) or isinstance(lst, collections.deque)):
                 continue
             if 'queue' in name.lower():
-                arr_snapshot = copy.deepcopy(list(lst))
+                arr_snapshot = session.snapshot_values(lst)
                 visual = {'type': 'queue', 'values': arr_snapshot, 'name': name}
+                session.add_mutation_info(visual, lst, step)
                 pointers = detect_pointers(local_vars, len(arr_snapshot))
                 if pointers:
                     visual['pointers'] = pointers
                 visuals.append(visual)
 
+        # Buffer-backed arrays (NumPy, array.array, bytearray): 1-D as arrays, 2-D as grids
+        for var_name, var_value in local_vars.items():
+            view = buffer_view(var_value)
+            if view is None or len(view) == 0:
+                continue
+            if view.ndim == 1:
+                visual = {'type': 'array', 'values': buffer_payload(view), 'name': var_name}
+                pointers = detect_pointers(local_vars, view.shape[0])
+                if pointers:
+                    visual['pointers'] = pointers
+            else:
+                # cellStates are derived client-side from the decoded cells
+                visual = {
+                    'type': 'grid',
+                    'rows': view.shape[0],
+                    'cols': view.shape[1],
+                    'cells': buffer_payload(view),
+                    'cellStates': [],
+                    'name': var_name
+                }
+            visuals.append(visual)
+
         # Linked List detection (unchanged)
         for var_name, var_value in local_vars.items():
             if hasattr(var_value, 'next') and hasattr(var_value, 'val'):
@@ -360,6 +452,8 @@ def detect_visuals(local_vars, step):
                     visuals.append(visual)
 
         # Grid/Chessboard detection (2D lists, chessboards, Sudoku, etc.)
+        # Cells/cellStates are filled in by py_grid once we know which visuals survive
+        pending_grids = []
         for var_name, var_value in local_vars.items():
             # Detect a 2D list (list of lists of uniform length, not strings)
             if (
@@ -370,20 +464,6 @@ def detect_visuals(local_vars, step):
             ):
                 rows = len(var_value)
                 cols = len(var_value[0])
-                cells = copy.deepcopy(var_value)
-                cellStates = []
-                for r in range(rows):
-                    for c in range(cols):
-                        v = var_value[r][c]
-                        if isinstance(v, str):
-                            if v in ['Q', 'K', 'N', 'B', 'R', 'P']:
-                                cellStates.append({'row': r, 'col': c, 'state': 'piece', 'piece': v})
-                            elif v == 'X':
-                                cellStates.append({'row': r, 'col': c, 'state': 'blocked'})
-                            elif v == '.':
-                                continue
-                        elif v == 1:
-                            cellStates.append({'row': r, 'col': c, 'state': 'visited'})
                 # Pointers for grid: look for variables that are (row, col) tuples or lists
                 pointers = {}
                 for k, v in local_vars.items():
@@ -400,7 +480,8 @@ def detect_visuals(local_vars, step):
                     if isinstance(r, int) and isinstance(c, int) and 0 <= r < rows and 0 <= c < cols:
                         pointers['row,col'] = [r, c]
                 # Also add single-index pointers for 1D row/col pointers
-                for k, v in local_vars.items():
+                for k in session.grid_pointer_candidates(local_vars):
+                    v = local_vars[k]
                     if isinstance(v, int):
                         if 0 <= v < rows:
                             pointers[k + '_row'] = [v, 0]
@@ -409,7 +490,8 @@ def detect_visuals(local_vars, step):
                 paths = []
                 for k, v in local_vars.items():
                     if (
-                        isinstance(v, list) and
+                        isinstance(v, list) and v and
+                        isinstance(v[0], (tuple, list)) and
                         all(isinstance(x, (tuple, list)) and len(x) == 2 for x in v)
                     ):
                         if all(0 <= x[0] < rows and 0 <= x[1] < cols for x in v):
@@ -418,13 +500,12 @@ def detect_visuals(local_vars, step):
                     'type': 'grid',
                     'rows': rows,
                     'cols': cols,
-                    'cells': cells,
-                    'cellStates': cellStates,
                     'pointers': pointers,
                     'paths': paths,
                     'name': var_name
                 }
                 visuals.append(visual)
+                pending_grids.append((visual, var_value, var_value, py_grid.list_cell_state))
             # Special case: N-Queens/board solutions as list of strings
             elif (
                 isinstance(var_value, list) and
@@ -433,29 +514,14 @@ def detect_visuals(local_vars, step):
                 len(set(len(row) for row in var_value)) == 1 and
                 all(len(row) == len(var_value) for row in var_value)
             ):
-                # Convert to 2D list of chars
-                rows = len(var_value)
-                cols = len(var_value[0])
-                cells = [list(row) for row in var_value]
-                cellStates = []
-                for r in range(rows):
-                    for c in range(cols):
-                        v = cells[r][c]
-                        if v in ['Q', 'K', 'N', 'B', 'R', 'P']:
-                            cellStates.append({'row': r, 'col': c, 'state': 'piece', 'piece': v})
-                        elif v == 'X':
-                            cellStates.append({'row': r, 'col': c, 'state': 'blocked'})
-                        elif v == '1':
-                            cellStates.append({'row': r, 'col': c, 'state': 'visited'})
                 visual = {
                     'type': 'grid',
-                    'rows': rows,
-                    'cols': cols,
-                    'cells': cells,
-                    'cellStates': cellStates,
+                    'rows': len(var_value),
+                    'cols': len(var_value[0]),
                     'name': var_name
                 }
                 visuals.append(visual)
+                pending_grids.append((visual, var_value, var_value, py_grid.string_cell_state))
 
         # Only one visual type per step: prefer queue > stack > array
         has_queue = any(v.get('type') == 'queue' for v in visuals)
@@ -496,6 +562,12 @@ def detect_visuals(local_vars, step):
             }
             visuals.append(visual)
 
+        # Keyframe or changed-cell diff for each grid that is actually shown
+        # (the step is appended right after detection, at index len(steps))
+        for visual, source, rows, state_of in pending_grids:
+            if any(v is visual for v in visuals):
+                session.grids.encode(visual, source, rows, state_of, len(session.steps))
+
         if visuals:
             step['visuals'] = visuals
             step['visual'] = visuals[0]  # For backward compatibility
@@ -503,200 +575,444 @@ def detect_visuals(local_vars, step):
         step['debug_error'] = str(e)
         step['debug_vars'] = list(local_vars.keys())
 
-def trace_lines(frame, event, arg):
-    global steps
-    # Only trace lines in the user's code (filename == '<string>')
-    if frame.f_code.co_filename != '<string>':
-        return
-    if len(steps) > MAX_STEPS:
-        return
-    exclude_vars = {'copy'}
-    # Use the global stdout_capture for output
-    output = None
-    try:
-        output = stdout_capture.getvalue()[-1000:]
-    except Exception:
-        output = ''
-    
-    # Get all variables from all frames in the call stack, including globals
-    all_vars = {}
+def is_user_var(k, v):
+    """Filter out dunders, modules and the injected utility functions and classes"""
+    return (not k.startswith('__') and k not in HIDDEN_NAMES and
+            not str(type(v)).startswith("<class 'module'"))
+
+def frame_args(frame):
+    """Named arguments of a frame (what inspect.getargvalues reports, without importing inspect)"""
+    code = frame.f_code
+    names = code.co_varnames[:code.co_argcount + code.co_kwonlyargcount]
+    local_vars = frame.f_locals
+    return {name: local_vars[name] for name in names if name in local_vars}
+
+def code_qualname(code):
+    """Qualified function name (Stack.push), as keyed by the static pre-pass"""
+    return getattr(code, 'co_qualname', code.co_name)
+
+def build_call_stack(frame):
+    call_stack = []
     f = frame
     while f:
-        if f.f_code.co_filename == '<string>':
-            # Include both locals and globals
-            for scope in (f.f_locals, f.f_globals):
-                for k, v in scope.items():
-                    if (not k.startswith('__') and k not in exclude_vars and 
-                        not str(type(v)).startswith("<class 'module'") and
-                        k not in ['List', 'Dict', 'Set', 'Tuple', 'Optional', 'ListNode', 'TreeNode', 'Node',
-                                 'traverse', 'print_list', 'create_linked_list', 'list_to_array', 'print_tree']):
-                        all_vars[k] = safe_serialize(v)
+        call_stack.append({
+            'function': f.f_code.co_name,
+            'filename': f.f_code.co_filename,
+            'line_number': f.f_lineno
+        })
         f = f.f_back
-    
-    if event == 'call':
+    return call_stack[::-1]
+
+class SessionStdout(io.TextIOBase):
+    """sys.stdout stand-in that sends each thread's writes to its running TraceSession"""
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+
+    def _target(self):
+        session = getattr(_active, 'session', None)
+        return session.output if session is not None else self.fallback
+
+    def writable(self):
+        return True
+
+    def write(self, s):
+        return self._target().write(s)
+
+    def flush(self):
+        self._target().flush()
+
+def install_session_stdout():
+    """Route print() per thread; idempotent, other threads keep the original stdout"""
+    if not isinstance(sys.stdout, SessionStdout):
+        sys.stdout = SessionStdout(sys.stdout)
+
+class TraceSession:
+    """One trace: owns its step buffer, captured output, step budget and options.
+
+    Sessions are independent, so a warm worker can run several at once on
+    different threads: sys.settrace only affects the calling thread, and
+    print() output is routed to the session running on the current thread.
+    With record_mutations, sessions share py_record's process-wide log and
+    so run one at a time.
+    """
+
+    def __init__(self, max_steps=MAX_STEPS, record_mutations=False, timeout=None):
+        self.max_steps = max_steps
+        self.record_mutations = record_mutations
+        if record_mutations:
+            import py_record
+            # Logged values are serialized like variables
+            py_record.serialize = safe_serialize
+        # Seconds of traced execution before TimeoutException (None = no limit)
+        self.timeout = timeout
+        self.deadline = None
+        # Steps, bounded in memory (older ones spill to disk, see py_steplog)
+        self.steps = StepLog()
+        self.output = io.StringIO()
+        # Static analysis of the traced code (see py_static.analyze_code)
+        self.static_info = None
+        # Operation kind of the function the current event is in (see function_operation)
+        self.current_operation = None
+        # Serialized variables carried forward between steps: name -> (object, serialized, reachable ids)
+        self.var_cache = {}
+        # Names touched by the line executed since the previous trace event (None = unknown, refresh all)
+        self.pending_names = None
+        self.mutations_emitted = 0
+        self.grids = py_grid.GridEncoder()
+        # Module-level events between separately compiled parts of one program,
+        # hidden from the trace: code object -> events (see run)
+        self.seam_events = {}
+        self.first_step_at = None
+
+    def reset(self, full_code):
+        """Fresh per-run state: static pre-pass, caches, step buffer, output"""
+        self.steps.close()
+        self.steps = StepLog()
+        self.output = io.StringIO()
+        # Static pre-pass: which names each line can touch, which functions push/pop
+        self.static_info = analyze_code(full_code)
+        self.var_cache = {}
+        self.pending_names = None
+        self.grids.reset()
+        self.mutations_emitted = 0
+
+    def capturing(self):
+        """Context manager routing this thread's print() into self.output"""
+        return _Capturing(self)
+
+    def exec_program(self, code_objects, namespace, timeout=None):
+        """Run the compiled program untraced, with output captured.
+
+        With `timeout`, TimeoutException is raised after that many seconds
+        (SIGALRM, so only effective on the main thread).
+        """
+        cancel = start_timeout(timeout) if timeout else None
         try:
-            lineno = frame.f_lineno
-            function_name = frame.f_code.co_name
-            
-            # Filter out injected utility functions and classes
-            local_vars = {}
-            for k, v in frame.f_locals.items():
-                if (not k.startswith('__') and k not in exclude_vars and 
-                    not str(type(v)).startswith("<class 'module'") and
-                    k not in ['List', 'Dict', 'Set', 'Tuple', 'Optional', 'ListNode', 'TreeNode', 'Node',
-                             'traverse', 'print_list', 'create_linked_list', 'list_to_array', 'print_tree']):
-                    local_vars[k] = safe_serialize(v)
-            
-            function_args = {}
-            try:
-                args, _, _, values = inspect.getargvalues(frame)
-                function_args = {arg: safe_serialize(values[arg]) for arg in args if arg not in exclude_vars}
-            except Exception:
-                pass
-            call_stack = []
-            f = frame
-            while f:
-                call_stack.append({
-                    'function': f.f_code.co_name,
-                    'filename': f.f_code.co_filename,
-                    'line_number': f.f_lineno
-                })
-                f = f.f_back
-            call_stack = call_stack[::-1]
-            
-            # Detect operation based on function name
-            operation = None
-            operation_value = None
-            if function_name == 'push' and 'value' in function_args:
-                operation = 'push'
-                operation_value = function_args['value']
-            elif function_name == 'pop':
-                operation = 'pop'
-            elif function_name == 'peek':
-                operation = 'peek'
-            
-            step = {
-                'line': lineno,
-                'variables': all_vars,  # Use all variables from call stack and globals
-                'function_args': function_args,
-                'output': output,
-                'call_stack': call_stack,
-                'current_line': lineno,
-                'note': f'function entry: {function_name}',
-                'operation': operation,
-                'operationValue': operation_value
-            }
-            detect_visuals(frame.f_locals, step)  # <--- FIX: use live locals
-            scalars = {k: v for k, v in all_vars.items() if isinstance(v, (int, float, str, bool)) and k not in exclude_vars}
-            if scalars:
-                step['scalars'] = scalars
-            steps.append(step)
-        except Exception as e:
-            steps.append({'error': sanitize_unicode(f'Error at function entry (line {frame.f_lineno}): {str(e)}')})
-    
-    if event == 'line':
+            with self.capturing():
+                exec_program(code_objects, namespace)
+        finally:
+            if cancel:
+                cancel()
+
+    def run(self, code_objects, namespace):
+        """Run the compiled program (see compile_program) under this session's tracer"""
+        # Hide the module return/call pair between the parts from the tracer
+        self.seam_events = {code_objects[0]: ('return',), code_objects[-1]: ('call',)}
+        return self._traced(exec_program, code_objects, namespace)
+
+    def call(self, func, *args):
+        """Call `func` under this session's tracer and return its result"""
+        return self._traced(func, *args)
+
+    def _traced(self, func, *args):
+        lock = RECORD_LOCK if self.record_mutations else None
+        if lock is not None:
+            lock.acquire()
+            import py_record
+            py_record.reset()
+            self.mutations_emitted = 0
+        if self.timeout is not None:
+            self.deadline = time.perf_counter() + self.timeout
         try:
-            lineno = frame.f_lineno
-            
-            # Filter out injected utility functions and classes
-            local_vars = {}
-            for k, v in frame.f_locals.items():
-                if (not k.startswith('__') and k not in exclude_vars and 
-                    not str(type(v)).startswith("<class 'module'") and
-                    k not in ['List', 'Dict', 'Set', 'Tuple', 'Optional', 'ListNode', 'TreeNode', 'Node',
-                             'traverse', 'print_list', 'create_linked_list', 'list_to_array', 'print_tree']):
-                    local_vars[k] = safe_serialize(v)
-            
-            function_args = {}
-            try:
-                args, _, _, values = inspect.getargvalues(frame)
-                function_args = {arg: safe_serialize(values[arg]) for arg in args if arg not in exclude_vars}
-            except Exception:
-                pass
-            call_stack = []
-            f = frame
-            while f:
-                call_stack.append({
-                    'function': f.f_code.co_name,
-                    'filename': f.f_code.co_filename,
-                    'line_number': f.f_lineno
-                })
-                f = f.f_back
-            call_stack = call_stack[::-1]
-            
-            # Detect operation based on current line content
-            operation = None
-            operation_value = None
-            current_function = frame.f_code.co_name
-            if current_function == 'push' and 'value' in local_vars:
-                operation = 'push'
-                operation_value = local_vars.get('value')
-            elif current_function == 'pop':
-                operation = 'pop'
-            elif current_function == 'peek':
-                operation = 'peek'
-            
-            step = {
-                'line': lineno,
-                'variables': all_vars,  # Use all variables from call stack and globals
-                'function_args': function_args,
-                'output': output,
-                'call_stack': call_stack,
-                'current_line': lineno,
-                'operation': operation,
-                'operationValue': operation_value
-            }
-            detect_visuals(frame.f_locals, step)  # <--- FIX: use live locals
-            scalars = {k: v for k, v in all_vars.items() if isinstance(v, (int, float, str, bool)) and k not in exclude_vars}
-            if scalars:
-                step['scalars'] = scalars
-            steps.append(step)
-        except Exception as e:
-            steps.append({'error': sanitize_unicode(f'Error at line {frame.f_lineno}: {str(e)}')})
-    
-    if event == 'return':
+            with self.capturing():
+                sys.settrace(self.trace)
+                try:
+                    return func(*args)
+                finally:
+                    sys.settrace(None)
+        finally:
+            self.deadline = None
+            if lock is not None:
+                lock.release()
+
+    def snapshot_values(self, lst):
+        """Copy of a list/deque for a visual; tracked containers reuse their last snapshot"""
+        if self.record_mutations:
+            import py_record
+            if py_record.is_tracked(lst):
+                return py_record.snapshot(lst)
+        import copy
+        return copy.deepcopy(list(lst))
+
+    def add_mutation_info(self, visual, lst, step):
+        """Label a visual with the exact operation and counters from the mutation log"""
+        if not self.record_mutations:
+            return
+        import py_record
+        if not py_record.is_tracked(lst):
+            return
+        visual['counts'] = dict(py_record.counts[lst._rid])
+        event = py_record.last_event(lst, step.get('mutations', []))
+        if event is None:
+            return
+        if visual['type'] == 'stack':
+            if event['op'] in STACK_OPS:
+                visual['operation'] = STACK_OPS[event['op']]
+                visual['operationValue'] = event.get('value')
+        else:
+            visual['operation'] = event['op']
+            visual['operationValue'] = event.get('value')
+        if 'index' in event:
+            visual['operationIndex'] = event['index']
+
+    def attach_mutations(self, frame, event, step):
+        """Move mutation events logged since the previous step onto this step"""
+        if not self.record_mutations:
+            return
+        import py_record
+        if event == 'line' and self.static_info is not None:
+            names = self.static_info['compare_lines'].get(frame.f_lineno)
+            if names:
+                py_record.count_comparisons(names, frame)
+        step['mutations'] = py_record.log[self.mutations_emitted:]
+        self.mutations_emitted = len(py_record.log)
+
+    def grid_pointer_candidates(self, local_vars):
+        """Names worth showing as grid row/col pointers: those the code uses as subscripts"""
+        if self.static_info is None:
+            return list(local_vars)
+        return [k for k in self.static_info['index_names'] if k in local_vars]
+
+    def static_operations(self):
+        """Qualified function name -> operation kind ('push', 'pop', ...) from the static pre-pass"""
+        if self.static_info is None:
+            return {'push': 'push', 'pop': 'pop', 'peek': 'peek'}
+        return self.static_info['functions']
+
+    def function_operation(self, code):
+        """Operation kind of the function running `code`, or None"""
+        if self.static_info is None:
+            return self.static_operations().get(code.co_name)
+        return self.static_info['functions'].get(code_qualname(code))
+
+    def line_names(self, frame):
+        """Names the frame's current line can read or write (None = unknown)"""
+        if self.static_info is None:
+            return None
+        return self.static_info['lines'].get(frame.f_lineno)
+
+    def collect_vars(self, frame):
+        """Serialize all variables visible from the call stack, including globals.
+
+        Only names touched since the previous event (per the static pre-pass), names
+        that were rebound, and objects reachable from a touched container are
+        re-serialized; everything else is carried forward from `self.var_cache`.
+        """
+        live = {}
+        f = frame
+        while f:
+            if f.f_code.co_filename == '<string>':
+                for scope in (f.f_locals, f.f_globals):
+                    for k, v in scope.items():
+                        if is_user_var(k, v):
+                            live[k] = v
+            f = f.f_back
+
+        dirty = self.pending_names
+        dirty_ids = set()
+        if dirty is not None:
+            # Re-serialize touched containers first; any other name sharing an
+            # object with them (aliases, linked nodes, self.attr) is stale too
+            for k in dirty:
+                v = live.get(k)
+                if k in live and not isinstance(v, SCALAR_TYPES):
+                    ids = set()
+                    self.var_cache[k] = (v, safe_serialize(v, ids), ids)
+                    dirty_ids |= ids
+
+        all_vars = {}
+        for k, v in live.items():
+            if dirty is not None and k in dirty and k in self.var_cache and self.var_cache[k][0] is v:
+                all_vars[k] = self.var_cache[k][1]
+                continue
+            entry = self.var_cache.get(k)
+            if (dirty is None or entry is None or entry[0] is not v or
+                    (dirty_ids and not entry[2].isdisjoint(dirty_ids))):
+                ids = set()
+                entry = (v, safe_serialize(v, ids), ids)
+                self.var_cache[k] = entry
+            all_vars[k] = entry[1]
+        return all_vars
+
+    def mark_pending(self, frame, event):
+        """Remember which names the code about to run can touch, for the next event"""
+        names = self.line_names(frame)
+        if names is not None and event == 'return' and frame.f_back is not None:
+            # The caller's line resumes after the return and may mutate its operands
+            caller = frame.f_back
+            if caller.f_code.co_filename == '<string>':
+                caller_names = self.line_names(caller)
+                names = None if caller_names is None else names | caller_names
+            else:
+                names = set(names)
+        self.pending_names = names
+
+    def detect_operation(self, frame, function_args):
+        """Operation (push/pop/...) performed by the current function, from the static table"""
+        kind = self.function_operation(frame.f_code)
+        if kind is None:
+            return None, None
+        operation_value = None
+        if kind in ('push', 'enqueue'):
+            arg_name = self.static_info['op_args'].get(code_qualname(frame.f_code)) if self.static_info else 'value'
+            if arg_name in function_args:
+                operation_value = function_args[arg_name]
+        return kind, operation_value
+
+    def trace(self, frame, event, arg):
+        """sys.settrace callback: record one step per call/line/return in the user's code"""
+        # Only trace lines in the user's code (filename == '<string>')
+        if frame.f_code.co_filename != '<string>':
+            return
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise TimeoutException("Execution timed out")
+        if len(self.steps) > self.max_steps or self.steps.truncated:
+            # Out of budget: keep the tracer attached only to enforce the deadline
+            return self.trace if self.deadline is not None else None
+        if event not in ('call', 'line', 'return') or event in self.seam_events.get(frame.f_code, ()):
+            return self.trace
+        if self.first_step_at is None:
+            self.first_step_at = time.perf_counter()
+        exclude_vars = {'copy'}
+        # Output printed so far by this session
+        output = None
         try:
-            lineno = frame.f_lineno
-            function_name = frame.f_code.co_name
-            
-            # Filter out injected utility functions and classes
-            local_vars = {}
-            for k, v in frame.f_locals.items():
-                if (not k.startswith('__') and k not in exclude_vars and 
-                    not str(type(v)).startswith("<class 'module'") and
-                    k not in ['List', 'Dict', 'Set', 'Tuple', 'Optional', 'ListNode', 'TreeNode', 'Node',
-                             'traverse', 'print_list', 'create_linked_list', 'list_to_array', 'print_tree']):
-                    local_vars[k] = safe_serialize(v)
-            
-            call_stack = []
-            f = frame
-            while f:
-                call_stack.append({
-                    'function': f.f_code.co_name,
-                    'filename': f.f_code.co_filename,
-                    'line_number': f.f_lineno
-                })
-                f = f.f_back
-            call_stack = call_stack[::-1]
-            
-            step = {
-                'line': lineno,
-                'variables': all_vars,  # Use all variables from call stack and globals
-                'output': output,
-                'call_stack': call_stack,
-                'current_line': lineno,
-                'note': f'function return: {function_name}',
-                'return_value': safe_serialize(arg)
+            output = self.output.getvalue()[-1000:]
+        except Exception:
+            output = ''
+
+        self.current_operation = self.function_operation(frame.f_code)
+        # Get all variables from all frames in the call stack, including globals
+        all_vars = self.collect_vars(frame)
+        self.mark_pending(frame, event)
+
+        if event == 'call':
+            try:
+                lineno = frame.f_lineno
+                function_name = frame.f_code.co_name
+
+                function_args = {}
+                try:
+                    function_args = {arg: safe_serialize(value) for arg, value in frame_args(frame).items() if arg not in exclude_vars}
+                except Exception:
+                    pass
+                call_stack = build_call_stack(frame)
+
+                # Detect operation from the static function table
+                operation, operation_value = self.detect_operation(frame, function_args)
+
+                step = {
+                    'line': lineno,
+                    'variables': all_vars,  # Use all variables from call stack and globals
+                    'function_args': function_args,
+                    'output': output,
+                    'call_stack': call_stack,
+                    'current_line': lineno,
+                    'note': f'function entry: {function_name}',
+                    'operation': operation,
+                    'operationValue': operation_value
+                }
+                self.attach_mutations(frame, event, step)
+                detect_visuals(frame.f_locals, step, self)  # <--- FIX: use live locals
+                scalars = {k: v for k, v in all_vars.items() if isinstance(v, (int, float, str, bool)) and k not in exclude_vars}
+                if scalars:
+                    step['scalars'] = scalars
+                self.steps.append(step)
+            except Exception as e:
+                self.steps.append({'error': sanitize_unicode(f'Error at function entry (line {frame.f_lineno}): {str(e)}')})
+
+        if event == 'line':
+            try:
+                lineno = frame.f_lineno
+
+                function_args = {}
+                try:
+                    function_args = {arg: safe_serialize(value) for arg, value in frame_args(frame).items() if arg not in exclude_vars}
+                except Exception:
+                    pass
+                call_stack = build_call_stack(frame)
+
+                # Detect operation from the static function table
+                operation, operation_value = self.detect_operation(frame, function_args)
+
+                step = {
+                    'line': lineno,
+                    'variables': all_vars,  # Use all variables from call stack and globals
+                    'function_args': function_args,
+                    'output': output,
+                    'call_stack': call_stack,
+                    'current_line': lineno,
+                    'operation': operation,
+                    'operationValue': operation_value
+                }
+                self.attach_mutations(frame, event, step)
+                detect_visuals(frame.f_locals, step, self)  # <--- FIX: use live locals
+                scalars = {k: v for k, v in all_vars.items() if isinstance(v, (int, float, str, bool)) and k not in exclude_vars}
+                if scalars:
+                    step['scalars'] = scalars
+                self.steps.append(step)
+            except Exception as e:
+                self.steps.append({'error': sanitize_unicode(f'Error at line {frame.f_lineno}: {str(e)}')})
+
+        if event == 'return':
+            try:
+                lineno = frame.f_lineno
+                function_name = frame.f_code.co_name
+
+                call_stack = build_call_stack(frame)
+
+                step = {
+                    'line': lineno,
+                    'variables': all_vars,  # Use all variables from call stack and globals
+                    'output': output,
+                    'call_stack': call_stack,
+                    'current_line': lineno,
+                    'note': f'function return: {function_name}',
+                    'return_value': safe_serialize(arg)
+                }
+                self.attach_mutations(frame, event, step)
+                detect_visuals(frame.f_locals, step, self)  # <--- FIX: use live locals
+                scalars = {k: v for k, v in all_vars.items() if isinstance(v, (int, float, str, bool)) and k not in exclude_vars}
+                if scalars:
+                    step['scalars'] = scalars
+                self.steps.append(step)
+            except Exception as e:
+                self.steps.append({'error': sanitize_unicode(f'Error at function return (line {frame.f_lineno}): {str(e)}')})
+
+        return self.trace
+
+    def add_initial_step(self):
+        """Add initial step showing original state"""
+        steps = self.steps
+        if steps and steps[0].get('visuals'):
+            initial_step = {
+                'line': 0,
+                'variables': {},
+                'output': '',
+                'call_stack': [],
+                'current_line': 0,
+                'note': 'initial state',
+                'visuals': steps[0]['visuals']
             }
-            detect_visuals(frame.f_locals, step)  # <--- FIX: use live locals
-            scalars = {k: v for k, v in all_vars.items() if isinstance(v, (int, float, str, bool)) and k not in exclude_vars}
-            if scalars:
-                step['scalars'] = scalars
-            steps.append(step)
-        except Exception as e:
-            steps.append({'error': sanitize_unicode(f'Error at function return (line {frame.f_lineno}): {str(e)}')})
-    
-    return trace_lines
+            steps.insert(0, initial_step)
+
+class _Capturing:
+    """Make `session` the print() target of the current thread for a with-block"""
+
+    def __init__(self, session):
+        self.session = session
+        self.previous = None
+
+    def __enter__(self):
+        install_session_stdout()
+        self.previous = getattr(_active, 'session', None)
+        _active.session = self.session
+        return self.session.output
+
+    def __exit__(self, *exc):
+        _active.session = self.previous
+        return False
 
 def prepare_code(user_code):
     import sys  # Import sys at the top of the function
@@ -798,7 +1114,7 @@ target = 6'''
     else:
         # For non-linked list code, just add typing imports if needed
         typing_types = ['List', 'Dict', 'Tuple', 'Set', 'Optional']
-        typing_needed = [t for t in typing_types if re.search(r'\b' + t + r'\[', user_code) and f'from typing import {t}' not in user_code]
+        typing_needed = [t for t in typing_types if TYPING_HINT_RE[t].search(user_code) and f'from typing import {t}' not in user_code]
         if typing_needed:
             typing_imports = 'from typing import ' + ', '.join(typing_needed) + '\n'
             modified_code = typing_imports + user_code
@@ -808,10 +1124,10 @@ target = 6'''
     return modified_code
 
 def run_user_code(user_code):
-    global steps
-    steps = []
-    original_stdout = sys.stdout
-    sys.stdout = io.StringIO()
+    import threading
+    import traceback
+    session = TraceSession()
+    steps = session.steps
     error = None
     result = None
     def target():
@@ -844,19 +1160,16 @@ def run_user_code(user_code):
             if initial_arrays:
                 if 'import copy' not in modified_code:
                     modified_code = 'import copy\n' + modified_code
-                for arr_name in initial_arrays.keys():
-                    pattern = rf'(?<!def )bubble_sort\({arr_name}\)'
-                    modified_code = re.sub(pattern, f'bubble_sort({arr_name}.copy())', modified_code)
-                    for fname in ['quick_sort', 'merge_sort', 'insertion_sort', 'selection_sort']:
-                        pattern = rf'(?<!def ){fname}\({arr_name}\)'
-                        modified_code = re.sub(pattern, f'{fname}({arr_name}.copy())', modified_code)
-            sys.settrace(trace_lines)
+                modified_code = SORT_CALL_RE.sub(
+                    lambda m: f'{m.group(1)}({m.group(2)}.copy())' if m.group(2) in initial_arrays else m.group(0),
+                    modified_code)
+            session.static_info = analyze_code(modified_code)
             try:
-                exec(modified_code, exec_globals, exec_globals)
+                session.call(exec, modified_code, exec_globals, exec_globals)
             except NameError as ne:
                 # On NameError, re-prepare the code (in case the user's code changed globals)
                 modified_code = prepare_code(user_code)
-                exec(modified_code, exec_globals, exec_globals)
+                session.call(exec, modified_code, exec_globals, exec_globals)
             if initial_arrays:
                 arr_name, arr_values = next(iter(initial_arrays.items()))
                 initial_step = {
@@ -876,13 +1189,10 @@ def run_user_code(user_code):
                 error = "Error: Variable 'head' is not defined. Make sure to create your linked list first.\n\nExample:\nhead = ListNode(1, ListNode(2, ListNode(3)))\n\n" + error
             elif "NameError: name" in str(e):
                 # Extract the undefined variable name
-                match = re.search(r"NameError: name '([^']+)' is not defined", str(e))
+                match = NAME_ERROR_RE.search(str(e))
                 if match:
                     var_name = match.group(1)
                     error = f"Error: Variable '{var_name}' is not defined. Make sure to define it before using it.\n\n" + error
-        finally:
-            sys.settrace(None)
-            sys.stdout = original_stdout
     thread = threading.Thread(target=target)
     thread.start()
     thread.join(timeout=10)  # 10 second timeout
@@ -890,7 +1200,7 @@ def run_user_code(user_code):
         error = sanitize_unicode('Execution timed out.')
     if error:
         steps.append({'error': sanitize_unicode(error)})
-    return steps
+    return list(steps)
 
 def sanitize_unicode(obj):
     if isinstance(obj, str):
@@ -902,23 +1212,8 @@ def sanitize_unicode(obj):
         return {k: sanitize_unicode(v) for k, v in obj.items()}
     return obj
 
-def main():
-    global stdout_capture
-    try:
-        # Set up timeout
-        timer = threading.Timer(8.0, timeout_handler)
-        timer.start()
-        
-        # Capture stdout
-        old_stdout = sys.stdout
-        stdout_capture = io.StringIO()
-        sys.stdout = stdout_capture
-        
-        # Read code from stdin
-        code = sys.stdin.read()
-        
-        # Inject common imports and utilities
-        code_to_inject = """
+# Common imports, data structure classes and utilities injected before user code
+PRELUDE = """
 # Common imports
 from typing import List, Dict, Set, Tuple, Optional
 import copy
@@ -977,71 +1272,129 @@ def print_tree(root, level=0):
 
 # Test data (only if no user test cases detected)
 """
-        
-        # Check if user has test cases
-        has_test_cases = any(keyword in code.lower() for keyword in [
-            'print(', 'head =', 'root =', 'arr =', 'test', 'example', 'sample'
-        ])
-        
-        if not has_test_cases:
-            code_to_inject += """
+
+# Test data injected when the user code has no test cases of its own
+PRELUDE_TEST_DATA = """
 # Common test data
 head = create_linked_list([1, 2, 3, 4, 5])
 root = TreeNode(1, TreeNode(2), TreeNode(3))
 arr = [64, 34, 25, 12, 22, 11, 90]
 """
+
+def prelude_for(code):
+    """The prelude source for `code` (with default test data if it has no test cases)"""
+    # Check if user has test cases
+    has_test_cases = any(keyword in code.lower() for keyword in [
+        'print(', 'head =', 'root =', 'arr =', 'test', 'example', 'sample'
+    ])
+    if not has_test_cases:
+        return PRELUDE + PRELUDE_TEST_DATA
+    return PRELUDE
+
+def build_full_code(code):
+    """Prepend the prelude (and default test data if the code has no test cases)"""
+    # Combine injected code with user code
+    return prelude_for(code) + "\n" + code
+
+def load_prelude_code(prelude_source):
+    """Compiled prelude, compiled once per process for each prelude source"""
+    code_obj = _prelude_code.get(prelude_source)
+    if code_obj is None:
+        code_obj = _prelude_code[prelude_source] = compile(prelude_source, '<string>', 'exec')
+    return code_obj
+
+def compile_program(code, tracked=False):
+    """Compile prelude and user code separately; the prelude is compiled once per process.
+
+    The user code is padded with blank lines so its line numbers match the
+    concatenated source the static pre-pass analyses. Returns
+    (full_code, code objects to exec in order).
+    """
+    prelude_source = prelude_for(code)
+    full_code = prelude_source + "\n" + code
+    padded = '\n' * (prelude_source.count('\n') + 1) + code
+    if tracked:
+        import py_record
+        user_code = py_record.compile_tracked(padded)
+    else:
+        user_code = compile(padded, '<string>', 'exec')
+    return full_code, (load_prelude_code(prelude_source), user_code)
+
+def exec_program(code_objects, namespace):
+    """Run the compiled parts in order, as if they were one module"""
+    for code_obj in code_objects:
+        exec(code_obj, namespace, namespace)
+
+def start_timeout(seconds):
+    """Raise TimeoutException in the main thread after `seconds`; returns a cancel callable"""
+    try:
+        import signal
+        signal.signal(signal.SIGALRM, timeout_handler)
+        signal.setitimer(signal.ITIMER_REAL, seconds)
+        return lambda: signal.setitimer(signal.ITIMER_REAL, 0)
+    except (ImportError, AttributeError, ValueError):
+        # No SIGALRM (Windows) or not on the main thread
+        import threading
+        timer = threading.Timer(seconds, timeout_handler)
+        timer.start()
+        return timer.cancel
+
+def write_timing(session):
+    """--timing: startup / first-step / total wall time in ms on stderr"""
+    now = time.perf_counter()
+    first_step_at = session.first_step_at if session is not None else None
+    timing = {
+        'import_ms': round((_imported - _started) * 1000, 3),
+        'first_step_ms': round((first_step_at - _started) * 1000, 3) if first_step_at else None,
+        'total_ms': round((now - _started) * 1000, 3),
+    }
+    sys.stderr.write(json.dumps(timing) + '\n')
+
+def main():
+    record_mutations = '--record-mutations' in sys.argv[1:]
+    report_timing = '--timing' in sys.argv[1:]
+    session = None
+    try:
+        # Set up timeout
+        cancel_timeout = start_timeout(8.0)
         
-        # Combine injected code with user code
-        full_code = code_to_inject + "\n" + code
+        # Read code from stdin
+        code = sys.stdin.read()
         
         # Create a new namespace for execution
         namespace = {}
         namespace['__name__'] = '__main__'  # Ensure main block runs
         
-        # Execute the code
-        exec(full_code, namespace, namespace)
+        # Opt-in: route list/dict/deque/heapq through recording proxies
+        if record_mutations:
+            import py_record
+            py_record.install(namespace)
         
-        # Stop timeout timer
-        timer.cancel()
+        # Prelude comes precompiled from the cache; only the user code is compiled
+        full_code, code_objects = compile_program(code, tracked=record_mutations)
+        session = TraceSession(record_mutations=record_mutations)
         
-        # Get the final output
-        output = stdout_capture.getvalue()
-        sys.stdout = old_stdout
-        
-        # Set up tracing
-        sys.settrace(trace_lines)
+        # Execute the code (output captured by the session)
+        session.exec_program(code_objects, namespace)
         
         # Execute again with tracing
-        stdout_capture = io.StringIO()  # Clear output for tracing run
-        sys.stdout = stdout_capture
-        exec(full_code, namespace, namespace)
-        sys.stdout = old_stdout
+        session.reset(full_code)
+        session.run(code_objects, namespace)
         
-        # Stop tracing
-        sys.settrace(None)
+        # Stop timeout timer
+        cancel_timeout()
         
-        # Add initial step showing original state
-        if steps and steps[0].get('visuals'):
-            initial_step = {
-                'line': 0,
-                'variables': {},
-                'output': '',
-                'call_stack': [],
-                'current_line': 0,
-                'note': 'initial state',
-                'visuals': steps[0]['visuals']
-            }
-            steps.insert(0, initial_step)
+        session.add_initial_step()
         
-        # Output the trace as JSON
-        print(json.dumps(sanitize_unicode(steps), indent=2, ensure_ascii=False))
+        # Output the trace as JSON (spilled steps are copied straight from the step log)
+        session.steps.write_json(sys.stdout)
         
     except TimeoutException:
-        sys.stdout = old_stdout
         print(json.dumps([{'error': sanitize_unicode('Execution timed out after 8 seconds.')}], indent=2, ensure_ascii=False))
     except Exception as e:
-        sys.stdout = old_stdout
         print(json.dumps([{'error': sanitize_unicode(f'Error: {str(e)}')}], indent=2, ensure_ascii=False))
+    if report_timing:
+        write_timing(session)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
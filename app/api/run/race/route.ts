@@ -0,0 +1,88 @@
+import { NextRequest, NextResponse } from 'next/server';
+import path from 'path';
+import fs from 'fs';
+import { spawnGroup, killGroup } from '../processGroup';
+
+const MAX_FUNCTIONS = 4;
+const MAX_INPUT_CHARS = 10000;
+const RACE_TIMEOUT_MS = 5000;
+
+// Race mode: trace several functions on one input in parallel workers
+// (py_race.py) and return their traces, operation counts and a shared
+// timeline for lockstep playback.
+export async function POST(req: NextRequest): Promise<NextResponse> {
+  const { language, code, functions, input, align } = await req.json();
+
+  if (language !== 'python') {
+    return NextResponse.json({ error: 'Race mode is only supported for Python.' }, { status: 400 });
+  }
+  if (!Array.isArray(functions) || functions.length === 0 || functions.length > MAX_FUNCTIONS) {
+    return NextResponse.json({ error: `Pick between 1 and ${MAX_FUNCTIONS} functions.` }, { status: 400 });
+  }
+  if (JSON.stringify(input ?? null).length > MAX_INPUT_CHARS) {
+    return NextResponse.json({ error: 'Input is too large for race mode.' }, { status: 400 });
+  }
+
+  const raceScript = path.resolve(process.cwd(), 'app', 'api', 'run', 'py_race.py');
+  if (!fs.existsSync(raceScript)) {
+    return NextResponse.json({ error: `Race script not found: ${raceScript}` }, { status: 500 });
+  }
+
+  return new Promise<NextResponse>((resolve) => {
+    const child = spawnGroup(raceScript);
+
+    let result = '';
+    let error = '';
+    let timedOut = false;
+
+    // Racers run in parallel, so the whole race gets one per-racer timeout plus slack
+    const timeout = setTimeout(() => {
+      timedOut = true;
+      killGroup(child);
+    }, RACE_TIMEOUT_MS + 5000);
+
+    child.stdin.write(JSON.stringify({
+      code,
+      functions,
+      input: input ?? null,
+      align: align === 'steps' ? 'steps' : 'ops',
+      timeout: RACE_TIMEOUT_MS / 1000,
+    }));
+    child.stdin.end();
+
+    child.stdout.on('data', data => {
+      result += data.toString();
+    });
+
+    child.stderr.on('data', data => {
+      error += data.toString();
+    });
+
+    child.on('close', (exitCode) => {
+      clearTimeout(timeout);
+
+      if (timedOut) {
+        resolve(NextResponse.json({ error: 'Race timed out.' }, { status: 500 }));
+        return;
+      }
+
+      let race: any;
+      try {
+        race = JSON.parse(result);
+      } catch (e) {
+        resolve(NextResponse.json({ error: error || 'Failed to parse race output.', stderr: error, exitCode }, { status: 500 }));
+        return;
+      }
+      if (race.error) {
+        resolve(NextResponse.json({ error: race.error, stderr: error }, { status: 500 }));
+        return;
+      }
+      resolve(NextResponse.json({ ...race, stderr: error }));
+    });
+
+    child.on('error', (err) => {
+      clearTimeout(timeout);
+      resolve(NextResponse.json({ error: `Process error: ${err.message}` }, { status: 500 }));
+    });
+  });
+}
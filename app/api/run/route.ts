@@ -2,11 +2,50 @@ import { NextRequest, NextResponse } from 'next/server';
 import { spawn } from 'child_process';
 import path from 'path';
 import fs from 'fs';
+import { DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, saveTrace } from './traceStore';
+import { isLiveSession, runLive } from './liveWorkers';
+import { pistonClient } from './pistonClient';
+
+// JSON response for a finished trace, paged through the trace store if asked
+async function traceResponse(trace: any[], stderr: string, options: any, extra: Record<string, any> = {}): Promise<NextResponse> {
+  const output = trace[trace.length - 1]?.output || '';
+  const traceError = trace.find(s => s.error)?.error;
+  
+  // Paged: keep the trace server-side and send only the first page
+  if (options?.paged && trace.length > 0) {
+    const pageSize = Math.max(1, Math.min(Number(options.pageSize) || DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE));
+    const traceId = await saveTrace(trace);
+    return NextResponse.json({ 
+      traceId, 
+      totalSteps: trace.length, 
+      pageSize, 
+      trace: trace.slice(0, pageSize), 
+      output, 
+      error: traceError, 
+      stderr, 
+      ...extra 
+    });
+  }
+  
+  return NextResponse.json({ 
+    trace, 
+    output, 
+    error: traceError, 
+    stderr, 
+    ...extra 
+  });
+}
 
 export async function POST(req: NextRequest): Promise<NextResponse> {
-  const { language, code } = await req.json();
+  const { language, code, options } = await req.json();
   
   try {
+    // Live mode: a warm per-session worker re-runs only what changed since its last run
+    if (language === 'python' && options?.live && isLiveSession(options.sessionId)) {
+      const { trace, live, stderr } = await runLive(options.sessionId, code);
+      return traceResponse(trace, stderr, options, { live });
+    }
+
     // Use tracer for Python and JavaScript
     if (language === 'python' || language === 'javascript') {
       const tracerScript = language === 'python'
@@ -20,6 +59,10 @@ export async function POST(req: NextRequest): Promise<NextResponse> {
       
       const command = language === 'python' ? 'python3' : 'node'; // ✅ safer than hardcoding Windows path
       const args = [tracerScript];
+      // Opt-in: record container mutations through proxies for exact operation labels
+      if (language === 'python' && options?.recordMutations) {
+        args.push('--record-mutations');
+      }
       
       return new Promise<NextResponse>((resolve) => {   // ✅ type Promise explicitly
         const child = spawn(command, args, { 
@@ -46,7 +89,7 @@ export async function POST(req: NextRequest): Promise<NextResponse> {
           error += data.toString(); 
         });
         
-        child.on('close', (exitCode) => {
+        child.on('close', async (exitCode) => {
           clearTimeout(timeout);
           
           if (timedOut) {
@@ -71,12 +114,7 @@ export async function POST(req: NextRequest): Promise<NextResponse> {
             trace = [{ error: 'Failed to parse trace output.' }];
           }
           
-          resolve(NextResponse.json({ 
-            trace, 
-            output: trace[trace.length - 1]?.output || '', 
-            error: trace.find(s => s.error)?.error, 
-            stderr: error 
-          }));
+          resolve(await traceResponse(trace, error, options));
         });
         
         child.on('error', (err) => {
@@ -111,19 +149,17 @@ export async function POST(req: NextRequest): Promise<NextResponse> {
     };
     const pistonLang = langMap[language] || language;
 
-    const response = await fetch('https://emkc.org/api/v2/piston/execute', {
-      method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({
-        language: pistonLang,
-        source: code,
-      }),
+    const { data, metrics } = await pistonClient().execute({
+      language: pistonLang,
+      source: code,
+      stdin: typeof options?.stdin === 'string' ? options.stdin : '',
     });
-
-    const data = await response.json();
     return NextResponse.json({ 
-      output: data.output || data.message || data.stderr || data.stdout || 'No output', 
-      ...data 
+      output: data.run?.output || data.output || data.message || data.stderr || data.stdout || 'No output', 
+      ...data,
+      execution: metrics,
+    }, {
+      headers: { 'Server-Timing': `piston;desc="${metrics.source}";dur=${metrics.latencyMs}` },
     });
 
   } catch (error: any) {
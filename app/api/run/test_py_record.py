@@ -0,0 +1,85 @@
+import io
+import contextlib
+
+import py_record
+import py_trace
+
+# A program must behave the same with mutation recording on as without it.
+
+PROGRAMS = {
+    'runtime_lists': '''
+words = "b a c".split()
+print(type(words) is list, isinstance(words, list), sorted(words))
+def f(*args, **kwargs):
+    return isinstance(args, tuple), isinstance(kwargs, dict), type(kwargs) is dict
+print(f(1, x=2))
+a = [3, 1, 2]
+print(isinstance(a[1:], list), a[::-1], list(reversed(a)), dict(zip('ab', a)))
+''',
+    'in_place_operators': '''
+a = [1, 2]
+a *= 2
+a += [5]
+b = {'x': 1}
+b |= {'y': 2}
+print(a, b)
+''',
+    'deque': '''
+from collections import deque
+q = deque([1, 2, 3])
+q.insert(1, 9)
+q.remove(2)
+del q[0]
+q += [7]
+q *= 2
+print(q, list(q))
+''',
+    'rebound_constructor': '''
+def list(*items):
+    return 'shadowed', items
+print(list(1, 2))
+''',
+    'heap': '''
+import heapq
+h = []
+for v in [5, 1, 4]:
+    heapq.heappush(h, v)
+print([heapq.heappop(h) for _ in range(3)])
+''',
+}
+
+
+def run(code, record):
+    namespace = {'__name__': '__main__'}
+    if record:
+        py_record.install(namespace)
+    _, code_objects = py_trace.compile_program(code, tracked=record)
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        py_trace.exec_program(code_objects, namespace)
+    return out.getvalue(), namespace
+
+
+def test_recorded_programs_behave_the_same():
+    for name, code in PROGRAMS.items():
+        assert run(code, True)[0] == run(code, False)[0], name
+
+
+def test_in_place_and_deque_mutations_are_logged():
+    py_record.reset()
+    _, namespace = run(PROGRAMS['in_place_operators'], True)
+    ops = [e['op'] for e in py_record.log if e['id'] == namespace['a']._rid]
+    assert ops == ['setslice', 'extend']
+
+    py_record.reset()
+    _, namespace = run(PROGRAMS['deque'], True)
+    q = namespace['q']
+    ops = [e['op'] for e in py_record.log if e['id'] == q._rid]
+    assert ops == ['insert', 'pop', 'delete', 'extend', 'setslice']
+    assert py_record.snapshot(q) == list(q)
+
+
+def test_deque_serializes_like_a_deque():
+    _, recorded = run(PROGRAMS['deque'], True)
+    _, plain = run(PROGRAMS['deque'], False)
+    assert py_trace.safe_serialize(recorded['q']) == py_trace.safe_serialize(plain['q'])
@@ -0,0 +1,14 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { DEFAULT_PAGE_SIZE, loadSteps } from '../../traceStore';
+
+// Step ranges of a trace stored by /api/run (options.paged): GET ?start=0&count=128
+export async function GET(req: NextRequest, { params }: { params: { id: string } }): Promise<NextResponse> {
+  const start = Number(req.nextUrl.searchParams.get('start')) || 0;
+  const count = Number(req.nextUrl.searchParams.get('count')) || DEFAULT_PAGE_SIZE;
+
+  const page = await loadSteps(params.id, start, count);
+  if (!page) {
+    return NextResponse.json({ error: 'Trace not found or expired.' }, { status: 404 });
+  }
+  return NextResponse.json(page);
+}
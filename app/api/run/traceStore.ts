@@ -0,0 +1,109 @@
+import fs from 'fs';
+import path from 'path';
+import crypto from 'crypto';
+
+// Server-side trace store: /api/run can keep a finished trace here and hand the
+// client only its id plus the first page; /api/run/trace/[id] then serves step
+// ranges. Recent traces live in an in-memory LRU bounded by their total JSON
+// size. With DSA_TRACE_CACHE set, every trace is also written to a private
+// directory there (mode 0700) so it survives eviction and dev-server reloads
+// until it expires. The disk tier is opt-in: traced programs run on this host,
+// so a shared temp directory would let them read or tamper with other users'
+// traces.
+
+const MAX_MEMORY_BYTES = Number(process.env.DSA_TRACE_STORE_BYTES) || 128 * 1024 * 1024;
+const TRACE_TTL_MS = 60 * 60 * 1000; // 1 hour
+const SWEEP_INTERVAL_MS = 5 * 60 * 1000;
+const STORE_DIR = process.env.DSA_TRACE_CACHE ? path.join(process.env.DSA_TRACE_CACHE, 'traces') : '';
+const ID_PATTERN = /^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$/;
+
+export const DEFAULT_PAGE_SIZE = 128;
+export const MAX_PAGE_SIZE = 1000;
+
+// Map iteration order is insertion order, so the first key is the least recently used
+const memory = new Map<string, { steps: any[]; bytes: number }>();
+let memoryBytes = 0;
+let lastSweep = 0;
+
+function tracePath(id: string) {
+  return path.join(STORE_DIR, `${id}.json`);
+}
+
+function forget(id: string) {
+  const entry = memory.get(id);
+  if (entry) {
+    memoryBytes -= entry.bytes;
+    memory.delete(id);
+  }
+}
+
+// The newest trace is always kept, even on its own over the budget
+function remember(id: string, steps: any[], bytes: number) {
+  forget(id);
+  memory.set(id, { steps, bytes });
+  memoryBytes += bytes;
+  while (memoryBytes > MAX_MEMORY_BYTES && memory.size > 1) {
+    forget(memory.keys().next().value);
+  }
+}
+
+async function sweepExpired() {
+  const now = Date.now();
+  if (!STORE_DIR) return;
+  if (now - lastSweep < SWEEP_INTERVAL_MS) return;
+  lastSweep = now;
+  try {
+    for (const name of await fs.promises.readdir(STORE_DIR)) {
+      const file = path.join(STORE_DIR, name);
+      const stat = await fs.promises.stat(file);
+      if (now - stat.mtimeMs > TRACE_TTL_MS) {
+        forget(path.basename(name, '.json'));
+        await fs.promises.unlink(file);
+      }
+    }
+  } catch {
+    // Best effort: a missing directory or a concurrently removed file is fine
+  }
+}
+
+export async function saveTrace(steps: any[]): Promise<string> {
+  const id = crypto.randomUUID();
+  const json = JSON.stringify(steps);
+  remember(id, steps, json.length);
+  if (STORE_DIR) {
+    try {
+      await fs.promises.mkdir(STORE_DIR, { recursive: true, mode: 0o700 });
+      await fs.promises.writeFile(tracePath(id), json, { mode: 0o600 });
+    } catch {
+      // Disk tier unavailable: the trace is still served from memory until evicted
+    }
+    sweepExpired();
+  }
+  return id;
+}
+
+export async function loadTrace(id: string): Promise<any[] | null> {
+  if (!ID_PATTERN.test(id)) return null;
+  const cached = memory.get(id);
+  if (cached) {
+    remember(id, cached.steps, cached.bytes);
+    return cached.steps;
+  }
+  if (!STORE_DIR) return null;
+  try {
+    const json = await fs.promises.readFile(tracePath(id), 'utf8');
+    const steps = JSON.parse(json);
+    remember(id, steps, json.length);
+    return steps;
+  } catch {
+    return null;
+  }
+}
+
+export async function loadSteps(id: string, start: number, count: number) {
+  const steps = await loadTrace(id);
+  if (!steps) return null;
+  const from = Math.max(0, Math.min(start, steps.length));
+  const size = Math.max(1, Math.min(count, MAX_PAGE_SIZE));
+  return { start: from, steps: steps.slice(from, from + size), totalSteps: steps.length };
+}
@@ -1,11 +1,14 @@
 'use client';
 
-import { useState } from 'react';
+import { useRef, useState } from 'react';
 import Sidebar from '../components/Sidebar';
 import Editor from '../components/Editor';
 import OutputPanel from '../components/OutputPanel';
 import VisualizerPanel from '../components/VisualizerPanel';
+import ProfilePanel, { Profile } from '../components/ProfilePanel';
+import RacePanel, { Race } from '../components/RacePanel';
 import axios from 'axios';
+import { createPagedTrace, TRACE_PAGE_SIZE } from '../components/tracePages';
 import { useEffect } from 'react';
 
 const LANGUAGES = [
@@ -58,28 +61,101 @@ export default function Home() {
   const [output, setOutput] = useState('');
   const [aiOutput, setAiOutput] = useState('');
   const [trace, setTrace] = useState<any[]>([]);
+  const [traceId, setTraceId] = useState<string | undefined>(undefined);
   const [language, setLanguage] = useState<string>('python');
   const [code, setCode] = useState(DEFAULT_CODE[language]);
   const [aiType, setAiType] = useState<string | null>(null);
   const [aiLoading, setAiLoading] = useState(false);
   const [runLoading, setRunLoading] = useState(false);
+  const [recordMutations, setRecordMutations] = useState(false);
+  const [live, setLive] = useState(false);
+  const [liveStatus, setLiveStatus] = useState('');
+  // Identifies this tab's warm live worker on the server
+  const sessionId = useRef<string>('');
+  // The run in flight: a newer run aborts it, so a slow older response can't overwrite a newer one
+  const runRequest = useRef<AbortController | null>(null);
+  const [profile, setProfile] = useState<Profile | null>(null);
+  const [profileLoading, setProfileLoading] = useState(false);
+  const [race, setRace] = useState<Race | null>(null);
+  const [raceLoading, setRaceLoading] = useState(false);
   const [aiError, setAiError] = useState('');
   const [sideTab, setSideTab] = useState<'visualizer' | 'ai'>('visualizer');
-  const [leftTab, setLeftTab] = useState<'code' | 'visualizer'>('code');
+  const [leftTab, setLeftTab] = useState<'code' | 'visualizer' | 'profile' | 'race'>('code');
 
   const runAndTrace = async () => {
+    const liveRun = live && language === 'python';
+    if (liveRun && !sessionId.current) sessionId.current = crypto.randomUUID();
+    runRequest.current?.abort();
+    const controller = new AbortController();
+    runRequest.current = controller;
     setRunLoading(true);
-    setOutput('');
-    setTrace([]);
+    // Live re-runs keep the previous result on screen until the new one arrives
+    if (!liveRun) {
+      setOutput('');
+      setTrace([]);
+      setTraceId(undefined);
+    }
     try {
-      const res = await axios.post('/api/run', { language, code });
-      setOutput(res.data.trace?.[res.data.trace.length - 1]?.output || '');
-      setTrace(res.data.trace || []);
+      const res = await axios.post('/api/run', {
+        language,
+        code,
+        options: liveRun
+          ? { live: true, sessionId: sessionId.current, paged: true, pageSize: TRACE_PAGE_SIZE }
+          : { recordMutations, paged: true, pageSize: TRACE_PAGE_SIZE },
+      }, { signal: controller.signal });
+      if (controller.signal.aborted) return;
+      const info = res.data.live;
+      setLiveStatus(info ? `re-ran from statement ${info.resumedAt + 1}/${info.statements} in ${Math.round(info.elapsedMs)} ms` : '');
+      if (res.data.traceId) {
+        // Paged: only the first page came back; VisualizerPanel fetches the rest by id
+        setOutput(res.data.output || '');
+        setTraceId(res.data.traceId);
+        setTrace(createPagedTrace(res.data.trace || [], res.data.totalSteps));
+      } else {
+        setOutput(res.data.trace?.[res.data.trace.length - 1]?.output || '');
+        setTraceId(undefined);
+        setTrace(res.data.trace || []);
+      }
     } catch (err: any) {
+      if (controller.signal.aborted) return;
       setOutput('Error: ' + (err.response?.data?.error || err.message));
       setTrace([]);
     } finally {
-      setRunLoading(false);
+      if (runRequest.current === controller) {
+        runRequest.current = null;
+        setRunLoading(false);
+      }
+    }
+  };
+
+  // Live mode: re-run shortly after typing stops
+  useEffect(() => {
+    if (!live || language !== 'python') return;
+    const timer = setTimeout(runAndTrace, 600);
+    return () => clearTimeout(timer);
+  }, [code, live, language]);
+
+  const runProfile = async (sweep?: { functionName: string; input: string }) => {
+    setProfileLoading(true);
+    try {
+      const res = await axios.post('/api/run/profile', { language, code, ...sweep });
+      setProfile(res.data);
+    } catch (err: any) {
+      setProfile({ lines: {}, functions: {}, totalLines: 0, error: 'Error: ' + (err.response?.data?.error || err.message) });
+    } finally {
+      setProfileLoading(false);
+    }
+  };
+
+  const runRace = async (request: { functions: string[]; input: any; align: string }) => {
+    setRaceLoading(true);
+    try {
+      const res = await axios.post('/api/run/race', { language, code, ...request });
+      setRace(res.data);
+    } catch (err: any) {
+      setRace({ results: [], timeline: [], align: 'ops', error: 'Error: ' + (err.response?.data?.error || err.message) });
+    } finally {
+      setRaceLoading(false);
     }
   };
 
@@ -89,10 +165,38 @@ export default function Home() {
     setAiError('');
     setAiType(type);
     try {
-      const res = await axios.post('/api/ai', { type, code });
-      setAiOutput(res.data.result || '');
+      // The answer streams in as NDJSON lines: {"text"} chunks, then {"done"} or {"error"}
+      const res = await fetch('/api/ai', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ type, code }),
+      });
+      if (!res.ok || !res.body) {
+        const data = await res.json().catch(() => ({}));
+        throw new Error(data.error || `Request failed with status ${res.status}`);
+      }
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffered = '';
+      let text = '';
+      while (true) {
+        const { done, value } = await reader.read();
+        buffered += decoder.decode(value, { stream: !done });
+        const lines = buffered.split('\n');
+        buffered = done ? '' : lines.pop()!;
+        for (const line of lines) {
+          if (!line.trim()) continue;
+          const message = JSON.parse(line);
+          if (message.error) throw new Error(message.error);
+          if (message.text) {
+            text += message.text;
+            setAiOutput(text);
+          }
+        }
+        if (done) break;
+      }
     } catch (err: any) {
-      setAiError('Error: ' + (err.response?.data?.error || err.message));
+      setAiError('Error: ' + err.message);
       setAiOutput('');
     } finally {
       setAiLoading(false);
@@ -103,6 +207,9 @@ export default function Home() {
   const handleSetLanguage = (lang: string) => {
     setLanguage(lang);
     setCode(DEFAULT_CODE[lang] || '');
+    setProfile(null);
+    setRace(null);
+    if (lang !== 'python' && (leftTab === 'profile' || leftTab === 'race')) setLeftTab('code');
   };
 
   return (
@@ -126,6 +233,22 @@ export default function Home() {
             >
               Visualizer
             </button>
+            {language === 'python' && (
+              <button
+                className={`px-6 py-2 rounded-t-lg font-bold text-lg transition-all ml-2 ${leftTab === 'profile' ? 'bg-gray-900 text-blue-400 border-b-2 border-blue-500' : 'bg-gray-800 text-gray-400'}`}
+                onClick={() => setLeftTab('profile')}
+              >
+                Profile
+              </button>
+            )}
+            {language === 'python' && (
+              <button
+                className={`px-6 py-2 rounded-t-lg font-bold text-lg transition-all ml-2 ${leftTab === 'race' ? 'bg-gray-900 text-blue-400 border-b-2 border-blue-500' : 'bg-gray-800 text-gray-400'}`}
+                onClick={() => setLeftTab('race')}
+              >
+                Race
+              </button>
+            )}
           </div>
           <div className="flex-1 bg-gray-900 rounded-xl shadow-lg p-4">
             {leftTab === 'code' ? (
@@ -139,9 +262,19 @@ export default function Home() {
                 setLoading={setRunLoading}
                 onRun={runAndTrace}
                 languages={LANGUAGES}
+                recordMutations={recordMutations}
+                setRecordMutations={setRecordMutations}
+                lineHeat={language === 'python' ? profile?.lines : undefined}
+                live={live}
+                setLive={setLive}
+                liveStatus={liveStatus}
               />
+            ) : leftTab === 'profile' ? (
+              <ProfilePanel profile={profile} loading={profileLoading} onProfile={runProfile} />
+            ) : leftTab === 'race' ? (
+              <RacePanel code={code} race={race} loading={raceLoading} onRace={runRace} />
             ) : (
-              <VisualizerPanel trace={trace} code={code} />
+              <VisualizerPanel trace={trace} code={code} traceId={traceId} />
             )}
           </div>
         </div>
@@ -1,27 +1,45 @@
 import React from 'react';
 
-type Props = { values: any[]; pointers?: Record<number, string[]> };
+type Counts = { writes: number; swaps: number; comparisons: number };
 
-export default function ArrayVisualizer({ values, pointers = {} }: Props) {
+type Props = {
+  values: any[];
+  pointers?: Record<number, string[]>;
+  operation?: string;
+  operationIndex?: number | number[];
+  counts?: Counts;
+};
+
+export default function ArrayVisualizer({ values, pointers = {}, operation, operationIndex, counts }: Props) {
+  // Cells touched by the recorded operation (a swap touches two)
+  const touched = new Set(operationIndex === undefined ? [] : ([] as number[]).concat(operationIndex));
   return (
-    <div className="flex items-center space-x-2">
-      {values.map((v, i) => (
-        <div key={i} className="flex flex-col items-center">
-          {/* Pointer labels */}
-          {pointers[i] && (
-            <div className="flex space-x-1 mb-1">
-              {pointers[i].map((name, j) => (
-                <span key={j} className="bg-yellow-400 text-black text-xs font-bold px-2 py-0.5 rounded shadow">
-                  {name}
-                </span>
-              ))}
+    <div className="flex flex-col">
+      <div className="flex items-center space-x-2">
+        {values.map((v, i) => (
+          <div key={i} className="flex flex-col items-center">
+            {/* Pointer labels */}
+            {pointers[i] && (
+              <div className="flex space-x-1 mb-1">
+                {pointers[i].map((name, j) => (
+                  <span key={j} className="bg-yellow-400 text-black text-xs font-bold px-2 py-0.5 rounded shadow">
+                    {name}
+                  </span>
+                ))}
+              </div>
+            )}
+            <div className={`w-12 h-12 ${touched.has(i) ? 'bg-gradient-to-br from-orange-500 to-orange-700' : 'bg-gradient-to-br from-green-700 to-green-900'} text-white flex items-center justify-center rounded shadow-lg text-lg border-2 border-white hover:scale-105 transition-transform`} title={v}>
+              {v}
             </div>
-          )}
-          <div className="w-12 h-12 bg-gradient-to-br from-green-700 to-green-900 text-white flex items-center justify-center rounded shadow-lg text-lg border-2 border-white hover:scale-105 transition-transform" title={v}>
-            {v}
           </div>
+        ))}
+      </div>
+      {(operation || counts) && (
+        <div className="text-xs text-gray-300 mt-1">
+          {operation && <span className="font-bold text-orange-300 mr-2">{operation.toUpperCase()}</span>}
+          {counts && <span>comparisons {counts.comparisons} · swaps {counts.swaps} · writes {counts.writes}</span>}
         </div>
-      ))}
+      )}
     </div>
   );
-} 
\ No newline at end of file
+} 
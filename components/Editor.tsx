@@ -1,5 +1,6 @@
-import { useRef } from 'react';
+import { useEffect, useRef } from 'react';
 import MonacoEditor from '@monaco-editor/react';
+import { heatLevel } from './ProfilePanel';
 
 
 type LanguageOption = { value: string; label: string };
@@ -13,10 +14,37 @@ type EditorProps = {
   setLoading: (loading: boolean) => void;
   onRun: () => void;
   languages: LanguageOption[];
+  recordMutations?: boolean;
+  setRecordMutations?: (record: boolean) => void;
+  lineHeat?: Record<string, number>; // Profile: line number -> hits, shown in the gutter
+  live?: boolean;
+  setLive?: (live: boolean) => void;
+  liveStatus?: string;
 };
 
-export default function Editor({ code, setCode, setOutput, language, setLanguage, loading, setLoading, onRun, languages }: EditorProps) {
-  const editorRef = useRef(null);
+export default function Editor({ code, setCode, setOutput, language, setLanguage, loading, setLoading, onRun, languages, recordMutations, setRecordMutations, lineHeat, live, setLive, liveStatus }: EditorProps) {
+  const editorRef = useRef<any>(null);
+  const heatDecorations = useRef<string[]>([]);
+
+  // Line heat map from the last profile, as colored gutter markers
+  const applyHeat = () => {
+    if (!editorRef.current) return;
+    const entries = Object.entries(lineHeat || {});
+    const maxHits = Math.max(0, ...entries.map(([, hits]) => hits));
+    heatDecorations.current = editorRef.current.deltaDecorations(
+      heatDecorations.current,
+      entries.map(([line, hits]) => ({
+        range: { startLineNumber: Number(line), endLineNumber: Number(line), startColumn: 1, endColumn: 1 },
+        options: {
+          isWholeLine: true,
+          linesDecorationsClassName: `heat-gutter heat-${heatLevel(hits, maxHits)}`,
+          hoverMessage: { value: `${hits} hits` },
+        },
+      }))
+    );
+  };
+
+  useEffect(applyHeat, [lineHeat]);
 
   const handleLanguageChange = (e: React.ChangeEvent<HTMLSelectElement>) => {
     const lang = e.target.value;
@@ -31,6 +59,19 @@ export default function Editor({ code, setCode, setOutput, language, setLanguage
             <option key={lang.value} value={lang.value}>{lang.label}</option>
           ))}
         </select>
+        {language === 'python' && setRecordMutations && (
+          <label className="flex items-center gap-1 text-xs text-gray-300" title="Track list/dict/deque/heapq operations exactly (swaps, writes, comparisons)">
+            <input type="checkbox" checked={!!recordMutations} onChange={e => setRecordMutations(e.target.checked)} />
+            Record mutations
+          </label>
+        )}
+        {language === 'python' && setLive && (
+          <label className="flex items-center gap-1 text-xs text-gray-300" title="Re-run automatically while typing, re-executing only the statements from the edit onwards">
+            <input type="checkbox" checked={!!live} onChange={e => setLive(e.target.checked)} />
+            Live
+          </label>
+        )}
+        {live && liveStatus && <span className="text-xs text-gray-400">{liveStatus}</span>}
         <button className="btn-primary ml-auto" onClick={onRun} disabled={loading}>
           {loading ? 'Running...' : 'Run'}
         </button>
@@ -42,6 +83,10 @@ export default function Editor({ code, setCode, setOutput, language, setLanguage
         onChange={v => setCode(v || '')}
         theme="vs-dark"
         options={{ fontSize: 16, minimap: { enabled: false } }}
+        onMount={editor => {
+          editorRef.current = editor;
+          applyHeat();
+        }}
       />
     </div>
   );
@@ -12,6 +12,7 @@ type Props = {
   cols: number;
   cells: any[][];
   cellStates?: CellState[];
+  changedCells?: [number, number][]; // Cells written since the previous step
   pointers?: Record<string, [number, number]>;
   paths?: Array<Array<[number, number]>>;
   name?: string;
@@ -36,11 +37,7 @@ const pieceIcons: Record<string, string> = {
   P: '♟',
 };
 
-function getCellState(cellStates: CellState[] | undefined, r: number, c: number): CellState | undefined {
-  return cellStates?.find(cs => cs.row === r && cs.col === c);
-}
-
-export default function GridVisualizer({ rows, cols, cells, cellStates = [], pointers = {}, paths = [], name }: Props) {
+export default function GridVisualizer({ rows, cols, cells, cellStates = [], changedCells = [], pointers = {}, paths = [], name }: Props) {
   const cellSize = Math.min(400 / Math.max(rows, cols), 60);
   const gridWidth = cols * cellSize;
   const gridHeight = rows * cellSize;
@@ -56,6 +53,10 @@ export default function GridVisualizer({ rows, cols, cells, cellStates = [], poi
   // Build a set for path cells
   const pathCells = new Set(paths.flat().map(([r, c]) => `${r},${c}`));
 
+  // Index cell states and changed cells once instead of searching per cell
+  const stateMap = new Map(cellStates.map(cs => [`${cs.row},${cs.col}`, cs]));
+  const changed = new Set(changedCells.map(([r, c]) => `${r},${c}`));
+
   return (
     <div className="flex flex-col items-center max-h-[90vh] overflow-auto">
       <svg width={gridWidth + 2} height={gridHeight + 2} style={{ background: '#18181b', borderRadius: 12, boxShadow: '0 2px 8px #0008' }}>
@@ -87,7 +88,7 @@ export default function GridVisualizer({ rows, cols, cells, cellStates = [], poi
         {/* Cells */}
         {Array.from({ length: rows }).map((_, r) =>
           Array.from({ length: cols }).map((_, c) => {
-            const state = getCellState(cellStates, r, c);
+            const state = stateMap.get(`${r},${c}`);
             const isPath = pathCells.has(`${r},${c}`);
             let fill = (r + c) % 2 === 0 ? '#27272a' : '#18181b';
             if (state && stateColors[state.state]) fill = stateColors[state.state];
@@ -103,8 +104,8 @@ export default function GridVisualizer({ rows, cols, cells, cellStates = [], poi
                   width={cellSize}
                   height={cellSize}
                   fill={fill}
-                  stroke="#52525b"
-                  strokeWidth={1.5}
+                  stroke={changed.has(`${r},${c}`) ? '#f97316' : '#52525b'}
+                  strokeWidth={changed.has(`${r},${c}`) ? 3 : 1.5}
                   rx={8}
                 />
                 {/* Only show numbers 1-9 */}
@@ -60,7 +60,7 @@ export default function OutputPanel({ output, aiLoading, aiError, aiType }: Outp
   const friendlyError = getFriendlyError(aiError);
   return (
     <div className="bg-gray-900 rounded-lg p-4 shadow-inner min-h-[120px] max-h-96 overflow-auto border border-gray-700">
-      {aiLoading ? (
+      {aiLoading && !output ? (
         <div className="text-blue-400 animate-pulse">AI is thinking...</div>
       ) : aiError ? (
         <div className="text-red-400">{friendlyError ? friendlyError : aiError}</div>
@@ -0,0 +1,170 @@
+import { useEffect, useState } from 'react';
+
+export type Profile = {
+  lines: Record<string, number>;
+  functions: Record<string, number>;
+  totalLines: number;
+  output?: string;
+  error?: string | null;
+  complexity?: {
+    best: string | null;
+    fits: { model: string; a: number; b: number; rss: number; r2: number }[];
+    points: [number, number][];
+    curve: [number, number][];
+    input: string;
+    sizes: number[];
+    errors: Record<string, string>;
+  };
+};
+
+type ProfilePanelProps = {
+  profile: Profile | null;
+  loading: boolean;
+  onProfile: (sweep?: { functionName: string; input: string }) => void;
+};
+
+const INPUT_KINDS = [
+  { value: 'array', label: 'Random array' },
+  { value: 'sorted', label: 'Sorted array' },
+  { value: 'reversed', label: 'Reversed array' },
+  { value: 'string', label: 'String' },
+  { value: 'int', label: 'Integer n' },
+];
+
+// Heat color for a hit count relative to the hottest line (shared with the Editor gutter)
+export function heatLevel(hits: number, maxHits: number): number {
+  if (!hits || !maxHits) return 0;
+  return Math.max(1, Math.ceil((Math.log(hits + 1) / Math.log(maxHits + 1)) * 5));
+}
+
+const HEAT_COLORS = ['transparent', '#1e3a8a', '#2563eb', '#f59e0b', '#ea580c', '#dc2626'];
+
+function ComplexityChart({ points, curve, best }: { points: [number, number][]; curve: [number, number][]; best: string | null }) {
+  const width = 360;
+  const height = 200;
+  const pad = 36;
+  const maxN = Math.max(...points.map(([n]) => n), 1);
+  const maxY = Math.max(...points.map(([, y]) => y), ...curve.map(([, y]) => y), 1);
+  const x = (n: number) => pad + (n / maxN) * (width - 2 * pad);
+  const y = (v: number) => height - pad - (v / maxY) * (height - 2 * pad);
+  return (
+    <svg width={width} height={height} className="bg-gray-800 rounded">
+      <line x1={pad} y1={height - pad} x2={width - pad} y2={height - pad} stroke="#6b7280" />
+      <line x1={pad} y1={pad} x2={pad} y2={height - pad} stroke="#6b7280" />
+      <text x={width / 2} y={height - 8} fill="#9ca3af" fontSize={11} textAnchor="middle">input size n (max {maxN})</text>
+      <text x={10} y={pad - 12} fill="#9ca3af" fontSize={11}>line events (max {maxY.toFixed(0)})</text>
+      <polyline
+        fill="none"
+        stroke="#f59e0b"
+        strokeWidth={2}
+        points={curve.map(([n, v]) => `${x(n)},${y(v)}`).join(' ')}
+      />
+      {points.map(([n, v]) => (
+        <circle key={n} cx={x(n)} cy={y(v)} r={4} fill="#60a5fa">
+          <title>{`n=${n}: ${v} line events`}</title>
+        </circle>
+      ))}
+      {best && <text x={width - pad} y={pad} fill="#f59e0b" fontSize={14} fontWeight="bold" textAnchor="end">{best}</text>}
+    </svg>
+  );
+}
+
+export default function ProfilePanel({ profile, loading, onProfile }: ProfilePanelProps) {
+  const functionNames = Object.keys(profile?.functions || {});
+  const [functionName, setFunctionName] = useState('');
+  const [input, setInput] = useState('array');
+
+  useEffect(() => {
+    if (!functionNames.includes(functionName)) setFunctionName(functionNames[0] || '');
+  }, [profile]);
+
+  if (!profile) {
+    return (
+      <div className="flex flex-col items-center justify-center h-64 gap-3 text-gray-400">
+        <div>Profile the program to see where it spends its time.</div>
+        <button className="btn-primary" onClick={() => onProfile()} disabled={loading}>
+          {loading ? 'Profiling...' : 'Profile'}
+        </button>
+      </div>
+    );
+  }
+
+  const hotLines = Object.entries(profile.lines)
+    .map(([line, hits]) => [Number(line), hits] as [number, number])
+    .sort((a, b) => b[1] - a[1])
+    .slice(0, 10);
+  const maxHits = hotLines[0]?.[1] || 0;
+  const complexity = profile.complexity;
+
+  return (
+    <div className="flex flex-col gap-4 text-sm text-gray-200 overflow-auto">
+      {profile.error && <div className="text-red-400">{profile.error}</div>}
+      <div className="flex items-center gap-2">
+        <span className="font-bold text-blue-300">{profile.totalLines}</span> line events
+        <button className="btn-primary ml-auto" onClick={() => onProfile()} disabled={loading}>
+          {loading ? 'Profiling...' : 'Re-profile'}
+        </button>
+      </div>
+
+      <div>
+        <h3 className="font-bold text-blue-300 mb-1">Hottest lines</h3>
+        {hotLines.map(([line, hits]) => (
+          <div key={line} className="flex items-center gap-2 font-mono text-xs">
+            <span className="w-12 text-right text-gray-400">L{line}</span>
+            <div className="flex-1 bg-gray-800 rounded h-3">
+              <div className="h-3 rounded" style={{ width: `${(hits / maxHits) * 100}%`, background: HEAT_COLORS[heatLevel(hits, maxHits)] }} />
+            </div>
+            <span className="w-16 text-right">{hits}</span>
+          </div>
+        ))}
+      </div>
+
+      {functionNames.length > 0 && (
+        <div>
+          <h3 className="font-bold text-blue-300 mb-1">Function calls</h3>
+          {Object.entries(profile.functions).sort((a, b) => b[1] - a[1]).map(([name, calls]) => (
+            <div key={name} className="flex justify-between font-mono text-xs">
+              <span className="text-green-300">{name}</span>
+              <span>{calls}</span>
+            </div>
+          ))}
+        </div>
+      )}
+
+      {functionNames.length > 0 && (
+        <div className="flex flex-col gap-2">
+          <h3 className="font-bold text-blue-300">Empirical complexity</h3>
+          <div className="flex items-center gap-2">
+            <select value={functionName} onChange={e => setFunctionName(e.target.value)} className="border rounded px-2 py-1 bg-gray-800 text-white">
+              {functionNames.map(name => <option key={name} value={name}>{name}</option>)}
+            </select>
+            <select value={input} onChange={e => setInput(e.target.value)} className="border rounded px-2 py-1 bg-gray-800 text-white">
+              {INPUT_KINDS.map(kind => <option key={kind.value} value={kind.value}>{kind.label}</option>)}
+            </select>
+            <button className="btn-primary" onClick={() => onProfile({ functionName, input })} disabled={loading || !functionName}>
+              Fit
+            </button>
+          </div>
+          {complexity && (
+            <>
+              {complexity.points.length > 0 && (
+                <ComplexityChart points={complexity.points} curve={complexity.curve} best={complexity.best} />
+              )}
+              <div className="font-mono text-xs">
+                {complexity.fits.map(fit => (
+                  <div key={fit.model} className={`flex justify-between ${fit.model === complexity.best ? 'text-yellow-300 font-bold' : ''}`}>
+                    <span>{fit.model}</span>
+                    <span>R² {fit.r2.toFixed(4)}</span>
+                  </div>
+                ))}
+              </div>
+              {Object.entries(complexity.errors).map(([n, err]) => (
+                <div key={n} className="text-red-400 text-xs">n={n}: {err}</div>
+              ))}
+            </>
+          )}
+        </div>
+      )}
+    </div>
+  );
+}
@@ -0,0 +1,169 @@
+import { useEffect, useState } from 'react';
+import VisualizerPanel from './VisualizerPanel';
+
+type RaceResult = {
+  function: string;
+  trace: any[];
+  counts: { comparisons: number; swaps: number; writes: number } | null;
+  timeMs: number | null;
+  tracedMs: number | null;
+  error: string | null;
+};
+
+export type Race = {
+  results: RaceResult[];
+  timeline: number[][];
+  align: 'ops' | 'steps';
+  error?: string;
+};
+
+type RacePanelProps = {
+  code: string;
+  race: Race | null;
+  loading: boolean;
+  onRace: (request: { functions: string[]; input: any; align: string }) => void;
+};
+
+const MAX_FUNCTIONS = 4;
+
+// Top-level function names in the editor, for picking the racers
+function definedFunctions(code: string): string[] {
+  return Array.from(code.matchAll(/^def\s+(\w+)\s*\(/gm), m => m[1]);
+}
+
+export default function RacePanel({ code, race, loading, onRace }: RacePanelProps) {
+  const available = definedFunctions(code);
+  const [selected, setSelected] = useState<string[]>([]);
+  const [input, setInput] = useState('[5, 2, 9, 1, 7, 3, 8, 6]');
+  const [align, setAlign] = useState('ops');
+  const [inputError, setInputError] = useState('');
+  const [frame, setFrame] = useState(0);
+  const [playing, setPlaying] = useState(false);
+  const frames = race?.timeline.length || 0;
+
+  // Default to the first few functions in the editor
+  useEffect(() => {
+    setSelected(sel => {
+      const kept = sel.filter(name => available.includes(name));
+      return kept.length ? kept : available.slice(0, MAX_FUNCTIONS);
+    });
+  }, [code]);
+
+  useEffect(() => {
+    setFrame(0);
+    setPlaying(false);
+  }, [race]);
+
+  // Lockstep playback: one timeline frame per tick for every racer
+  useEffect(() => {
+    if (!playing || frames < 2) return;
+    const interval = setInterval(() => {
+      setFrame(f => {
+        if (f < frames - 1) return f + 1;
+        setPlaying(false);
+        return f;
+      });
+    }, 350);
+    return () => clearInterval(interval);
+  }, [playing, frames]);
+
+  const toggle = (name: string) => {
+    setSelected(sel => sel.includes(name)
+      ? sel.filter(n => n !== name)
+      : sel.length < MAX_FUNCTIONS ? [...sel, name] : sel);
+  };
+
+  const start = () => {
+    try {
+      const value = JSON.parse(input);
+      setInputError('');
+      onRace({ functions: selected, input: value, align });
+    } catch (e) {
+      setInputError('Input must be valid JSON (e.g. [3, 1, 2]).');
+    }
+  };
+
+  return (
+    <div className="flex flex-col gap-4 text-sm text-gray-200">
+      <div className="flex flex-wrap items-center gap-3">
+        {available.map(name => (
+          <label key={name} className="flex items-center gap-1 font-mono text-xs">
+            <input type="checkbox" checked={selected.includes(name)} onChange={() => toggle(name)} />
+            {name}
+          </label>
+        ))}
+        {available.length === 0 && <span className="text-gray-400">Define some functions to race.</span>}
+      </div>
+      <div className="flex items-center gap-2">
+        <input
+          value={input}
+          onChange={e => setInput(e.target.value)}
+          className="flex-1 border rounded px-2 py-1 bg-gray-800 text-white font-mono text-xs"
+          title="Argument passed to every function (JSON)"
+        />
+        <select value={align} onChange={e => setAlign(e.target.value)} className="border rounded px-2 py-1 bg-gray-800 text-white" title="How traces are aligned">
+          <option value="ops">Align by operations</option>
+          <option value="steps">Align by steps</option>
+        </select>
+        <button className="btn-primary" onClick={start} disabled={loading || selected.length === 0}>
+          {loading ? 'Racing...' : 'Race'}
+        </button>
+      </div>
+      {inputError && <div className="text-red-400">{inputError}</div>}
+      {race?.error && <div className="text-red-400">{race.error}</div>}
+
+      {race && race.results && (
+        <>
+          <table className="text-xs font-mono">
+            <thead>
+              <tr className="text-blue-300 text-left">
+                <th>Function</th><th>Comparisons</th><th>Swaps</th><th>Writes</th><th>Steps</th><th>Time (ms)</th>
+              </tr>
+            </thead>
+            <tbody>
+              {race.results.map(r => (
+                <tr key={r.function}>
+                  <td className="text-green-300">{r.function}</td>
+                  <td>{r.counts?.comparisons ?? '-'}</td>
+                  <td>{r.counts?.swaps ?? '-'}</td>
+                  <td>{r.counts?.writes ?? '-'}</td>
+                  <td>{r.trace.length}</td>
+                  <td>{r.error ? <span className="text-red-400">{r.error}</span> : r.timeMs}</td>
+                </tr>
+              ))}
+            </tbody>
+          </table>
+
+          {frames > 0 && (
+            <div className="flex items-center gap-2">
+              <button className="btn-primary px-3 py-1 rounded-full" onClick={() => setPlaying(p => !p)}>
+                {playing ? '⏸' : '▶️'}
+              </button>
+              <input
+                type="range"
+                min={0}
+                max={frames - 1}
+                value={frame}
+                onChange={e => setFrame(Number(e.target.value))}
+                className="flex-1"
+              />
+              <span className="text-xs">Frame {frame + 1} / {frames}</span>
+            </div>
+          )}
+
+          <div className="grid grid-cols-1 xl:grid-cols-2 gap-4">
+            {race.results.map((r, k) => {
+              if (!r.trace.length) return null;
+              const stepIdx = race.timeline[frame]?.[k] ?? 0;
+              const counts = r.trace[stepIdx]?.counts;
+              const title = counts
+                ? `${r.function} · ${counts.comparisons} cmp · ${counts.swaps} swaps · ${counts.writes} writes`
+                : r.function;
+              return <VisualizerPanel key={r.function} trace={r.trace} code={code} stepIndex={stepIdx} title={title} />;
+            })}
+          </div>
+        </>
+      )}
+    </div>
+  );
+}
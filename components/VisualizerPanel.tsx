@@ -12,6 +12,13 @@ import GeneralTreeVisualizer from './GeneralTreeVisualizer';
 import GridVisualizer from './GridVisualizer';
 import { FaInfoCircle, FaChevronRight, FaChevronDown } from 'react-icons/fa';
 import { useStepperStore } from './stepperStore';
+import { decodeBuffer, decodeVisual, isBufferPayload } from './bufferPayload';
+import { resolveGridVisual } from './gridDiffs';
+import { fetchTracePage, fillPage, pagesToLoad, TRACE_PAGE_SIZE } from './tracePages';
+import { PLAYBACK_SPEEDS, usePlayback } from './playback';
+
+// Prefetch cap while playing fast (pages of TRACE_PAGE_SIZE steps)
+const MAX_PAGES_AHEAD = 8;
 
 type Step = {
   line: number;
@@ -39,10 +46,16 @@ type Step = {
 type VisualizerPanelProps = {
   trace: Step[];
   code: string;
+  traceId?: string; // Paged trace: steps not yet in `trace` are fetched by id
+  stepIndex?: number; // Controlled step (race mode lockstep): hides playback controls
+  title?: string;
 };
 
 function JsonTree({ data, path = '', expanded = false, highlight = false }) {
   const [isOpen, setIsOpen] = useState(expanded);
+  if (isBufferPayload(data)) {
+    return <span className={highlight ? 'bg-yellow-900 text-yellow-200 px-1 rounded' : ''}>{JSON.stringify(decodeBuffer(data))}</span>;
+  }
   if (data === null || typeof data !== 'object') {
     return <span className={highlight ? 'bg-yellow-900 text-yellow-200 px-1 rounded' : ''}>{JSON.stringify(data)}</span>;
   }
@@ -69,40 +82,59 @@ function JsonTree({ data, path = '', expanded = false, highlight = false }) {
   );
 }
 
-export default function VisualizerPanel({ trace, code }: VisualizerPanelProps) {
-  const { stepIdx, setStepIdx, autoPlay, setAutoPlay } = useStepperStore();
-  const [playInterval, setPlayInterval] = useState<NodeJS.Timeout | null>(null);
+export default function VisualizerPanel({ trace, code, traceId, stepIndex, title }: VisualizerPanelProps) {
+  const stepper = useStepperStore();
+  const controlled = stepIndex !== undefined;
+  const stepIdx = controlled ? stepIndex : stepper.stepIdx;
+  const { setStepIdx, autoPlay, setAutoPlay, speed, setSpeed } = stepper;
+  const [, setLoadedPages] = useState(0);
+  const [pageError, setPageError] = useState('');
+  const loadingPages = useRef(new Set<string>());
   const step = trace?.[stepIdx] || {};
   const editorRef = useRef<any>(null);
+  const lineDecorations = useRef<string[]>([]);
+  const playing = autoPlay && !controlled;
+
+  // Paged trace: fetch the pages around the current step as it moves
+  useEffect(() => {
+    if (!traceId) return;
+    // Playing: stay about a second of playback ahead
+    const ahead = playing ? Math.min(MAX_PAGES_AHEAD, Math.ceil(speed / TRACE_PAGE_SIZE) + 1) : 1;
+    for (const page of pagesToLoad(trace, stepIdx, TRACE_PAGE_SIZE, ahead)) {
+      const key = `${traceId}:${page}`;
+      if (loadingPages.current.has(key)) continue;
+      loadingPages.current.add(key);
+      fetchTracePage(traceId, page)
+        .then(steps => {
+          fillPage(trace, page, steps);
+          setLoadedPages(n => n + 1);
+        })
+        .catch(err => setPageError(err.message))
+        .finally(() => loadingPages.current.delete(key));
+    }
+  }, [traceId, trace, stepIdx, playing, speed]);
 
   // Clamp stepIdx to valid range on trace change
   useEffect(() => {
-    if (trace.length > 0 && (stepIdx < 0 || stepIdx >= trace.length)) {
+    if (!controlled && trace.length > 0 && (stepIdx < 0 || stepIdx >= trace.length)) {
       setStepIdx(0);
     }
   }, [trace.length]);
 
-  // Auto-play effect
-  useEffect(() => {
-    if (autoPlay && trace.length > 1) {
-      if (playInterval) clearInterval(playInterval);
-      const interval = setInterval(() => {
-        setStepIdx((idx) => {
-          if (idx < trace.length - 1) return idx + 1;
-          setAutoPlay(false);
-          return idx;
-        });
-      }, 350);
-      setPlayInterval(interval);
-      return () => clearInterval(interval);
-    } else if (playInterval) {
-      clearInterval(playInterval);
-      setPlayInterval(null);
-    }
-  }, [autoPlay, trace.length]);
+  // Auto-play: frame-synced, skipping steps the display can't keep up with
+  const stats = usePlayback({
+    playing,
+    speed,
+    totalSteps: trace.length,
+    stepIdx,
+    setStepIdx,
+    onEnd: () => setAutoPlay(false),
+    isReady: traceId ? (i) => i in trace : undefined,
+  });
 
   // Keyboard navigation
   useEffect(() => {
+    if (controlled) return;
     const handleKeyPress = (e: KeyboardEvent) => {
       if (e.key === 'ArrowLeft' || e.key === 'a') {
         setStepIdx((i) => Math.max(0, i - 1));
@@ -120,11 +152,11 @@ export default function VisualizerPanel({ trace, code }: VisualizerPanelProps) {
     return () => window.removeEventListener('keydown', handleKeyPress);
   }, [trace.length]);
 
-  // Highlight current line in Monaco
+  // Highlight current line in Monaco (replacing the previous step's highlight)
   useEffect(() => {
     if (editorRef.current && step.line) {
-      editorRef.current.deltaDecorations(
-        [],
+      lineDecorations.current = editorRef.current.deltaDecorations(
+        lineDecorations.current,
         [
           {
             range: {
@@ -162,6 +194,12 @@ export default function VisualizerPanel({ trace, code }: VisualizerPanelProps) {
 
   return (
     <div className="w-full md:max-w-3xl bg-gray-900 border-l p-6 min-h-[500px] flex flex-col rounded-xl shadow-lg font-sans mx-auto">
+      {controlled ? (
+      <div className="flex justify-between text-xs text-gray-300 mb-4">
+        <span className="font-bold text-blue-300 text-sm">{title}</span>
+        <span>Step {stepIdx + 1} / {trace.length} · Line {step.line || 0}</span>
+      </div>
+      ) : (
       <div className="flex items-center gap-2 mb-4">
         <button 
           className="btn-primary px-3 py-1 rounded-full text-sm font-bold shadow transition hover:bg-blue-700 disabled:opacity-50 disabled:cursor-not-allowed" 
@@ -210,9 +248,28 @@ export default function VisualizerPanel({ trace, code }: VisualizerPanelProps) {
           />
           <div className="flex justify-between text-xs text-gray-300 mt-1">
             <span>Step {typeof stepIdx === 'number' ? stepIdx + 1 : 1} / {trace.length}</span>
-            <span className="text-gray-400">Line {step.line || 0}</span>
+            {pageError ? (
+              <span className="text-red-400">{pageError}</span>
+            ) : traceId && !(stepIdx in trace) ? (
+              <span className="text-gray-400">Loading steps…</span>
+            ) : (
+              <span className="text-gray-400">Line {step.line || 0}</span>
+            )}
           </div>
+          {playing && stats.fps > 0 && (
+            <div className="text-xs text-gray-500 mt-0.5" title="Playback: display frame rate, frames missed, steps skipped to keep up, and render time per step">
+              {stats.fps} fps · {stats.droppedFrames} dropped · {stats.skippedSteps} skipped · {stats.renderMs} ms/render
+            </div>
+          )}
         </div>
+        <select
+          value={speed}
+          onChange={(e) => setSpeed(Number(e.target.value))}
+          className="border rounded px-1 py-1 bg-gray-800 text-white text-xs"
+          title="Playback speed (steps per second)"
+        >
+          {PLAYBACK_SPEEDS.map(s => <option key={s} value={s}>{s}/s</option>)}
+        </select>
         <div className="ml-2 group relative">
           <FaInfoCircle className="text-blue-300 cursor-pointer" />
           <div className="absolute left-1/2 -translate-x-1/2 mt-2 w-72 bg-gray-800 text-white text-xs rounded-lg shadow-lg p-3 z-10 opacity-0 group-hover:opacity-100 transition-opacity pointer-events-none">
@@ -221,10 +278,12 @@ export default function VisualizerPanel({ trace, code }: VisualizerPanelProps) {
             • <b>Arrow Keys:</b> ← → or A/D to step<br/>
             • <b>Home/End:</b> Jump to first/last step<br/>
             • <b>Play/Pause:</b> Spacebar or ▶️/⏸ button<br/>
+            • <b>Speed:</b> Steps per second; fast playback skips steps it can't draw in time<br/>
             • <b>Line:</b> Shows current code line
           </div>
         </div>
       </div>
+      )}
       <MonacoEditor
         height="120px"
         className="rounded-lg shadow"
@@ -235,7 +294,8 @@ export default function VisualizerPanel({ trace, code }: VisualizerPanelProps) {
       />
       {Array.isArray(step.visuals) && step.visuals.length > 0 && (
         <div className="my-4 flex flex-wrap gap-4 max-h-[60vh] overflow-auto items-start">
-          {step.visuals.map((visual, idx) => {
+          {step.visuals.map((rawVisual, idx) => {
+            const visual = resolveGridVisual(trace, stepIdx, decodeVisual(rawVisual));
             if (visual.type === 'linked-list') {
               return (
                 <div key={idx} className="min-w-[200px] max-w-[400px] max-h-[400px] overflow-auto">
@@ -247,7 +307,13 @@ export default function VisualizerPanel({ trace, code }: VisualizerPanelProps) {
             if (visual.type === 'array') {
               return (
                 <div key={idx} className="min-w-[200px] max-w-[400px] max-h-[400px] overflow-auto">
-                  <ArrayVisualizer values={visual.values} pointers={visual.pointers} />
+                  <ArrayVisualizer
+                    values={visual.values}
+                    pointers={visual.pointers}
+                    operation={visual.operation}
+                    operationIndex={visual.operationIndex}
+                    counts={visual.counts}
+                  />
                   <div className="text-xs text-blue-200 mt-1">{visual.name || 'Array'}</div>
                 </div>
               );
@@ -333,6 +399,7 @@ export default function VisualizerPanel({ trace, code }: VisualizerPanelProps) {
                     cols={visual.cols}
                     cells={visual.cells}
                     cellStates={visual.cellStates}
+                    changedCells={visual.changedCells}
                     pointers={visual.pointers}
                     paths={visual.paths}
                     name={visual.name}
@@ -0,0 +1,55 @@
+// Decoding for the typed binary payloads py_trace.py emits for NumPy arrays,
+// array.array and bytearray (see buffer_payload in py_trace.py).
+
+export type BufferPayload = {
+  __buffer__: true;
+  format: string;
+  itemsize: number;
+  shape: number[];
+  data: string; // base64 of the raw little-endian buffer
+};
+
+export function isBufferPayload(value: any): value is BufferPayload {
+  return !!value && typeof value === 'object' && value.__buffer__ === true && typeof value.data === 'string';
+}
+
+function typedView(buffer: ArrayBuffer, format: string, itemsize: number): ArrayLike<number | bigint | boolean> {
+  if (format === 'f') return new Float32Array(buffer);
+  if (format === 'd') return new Float64Array(buffer);
+  if (format === '?') return Array.from(new Uint8Array(buffer), b => b !== 0);
+  const unsigned = format === format.toUpperCase();
+  switch (itemsize) {
+    case 1: return unsigned ? new Uint8Array(buffer) : new Int8Array(buffer);
+    case 2: return unsigned ? new Uint16Array(buffer) : new Int16Array(buffer);
+    case 4: return unsigned ? new Uint32Array(buffer) : new Int32Array(buffer);
+    default: return unsigned ? new BigUint64Array(buffer) : new BigInt64Array(buffer);
+  }
+}
+
+// Flat values for 1-D payloads, rows of values for 2-D payloads
+export function decodeBuffer(payload: BufferPayload): any[] {
+  const binary = atob(payload.data);
+  const bytes = new Uint8Array(binary.length);
+  for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
+  const flat = Array.from(typedView(bytes.buffer, payload.format, payload.itemsize), v =>
+    typeof v === 'bigint' ? Number(v) : v
+  );
+  if (payload.shape.length !== 2) return flat;
+  const [rows, cols] = payload.shape;
+  return Array.from({ length: rows }, (_, r) => flat.slice(r * cols, (r + 1) * cols));
+}
+
+// Replace buffer payloads in a visual with plain values the visualizers understand
+export function decodeVisual(visual: any): any {
+  if (isBufferPayload(visual?.values)) {
+    return { ...visual, values: decodeBuffer(visual.values) };
+  }
+  if (visual?.type === 'grid' && isBufferPayload(visual.cells)) {
+    const cells = decodeBuffer(visual.cells) as any[][];
+    const cellStates = visual.cellStates?.length
+      ? visual.cellStates
+      : cells.flatMap((row, r) => row.map((v, c) => (v === 1 ? { row: r, col: c, state: 'visited' } : null))).filter(Boolean);
+    return { ...visual, cells, cellStates };
+  }
+  return visual;
+}
@@ -0,0 +1,99 @@
+// Grid visuals are emitted as a keyframe (full cells/cellStates) followed by
+// diffs that only list changed cells and state transitions (see
+// app/api/run/py_grid.py). This rebuilds the full grid for a step by
+// replaying diffs forward from the nearest keyframe or already-resolved step.
+// Each diff's `prevOffset` points at the grid's previous emission, so a seek
+// costs at most one keyframe interval of diffs however far it jumps.
+
+type ResolvedGrid = {
+  cells: any[][];
+  stateMap: Map<string, any>;
+  visual: any;
+};
+
+const resolvedByTrace = new WeakMap<any[], Map<string, ResolvedGrid>>();
+
+function findGrid(step: any, name: string) {
+  return step?.visuals?.find((v: any) => v.type === 'grid' && v.name === name);
+}
+
+function applyDiff(base: ResolvedGrid, diff: any): ResolvedGrid {
+  // Copy-on-write: only rows with changed cells are cloned
+  const cells = base.cells.slice();
+  const copied = new Set<number>();
+  for (const [r, c, value] of diff.cellDiffs || []) {
+    if (!copied.has(r)) {
+      cells[r] = cells[r].slice();
+      copied.add(r);
+    }
+    cells[r][c] = value;
+  }
+  let stateMap = base.stateMap;
+  if (diff.stateDiffs?.length) {
+    stateMap = new Map(base.stateMap);
+    for (const [r, c, state] of diff.stateDiffs) {
+      if (state) stateMap.set(`${r},${c}`, { row: r, col: c, ...state });
+      else stateMap.delete(`${r},${c}`);
+    }
+  }
+  return { cells, stateMap, visual: diff };
+}
+
+export function resolveGridVisual(trace: any[], stepIdx: number, visual: any): any {
+  if (!visual?.delta) return visual;
+  let resolved = resolvedByTrace.get(trace);
+  if (!resolved) {
+    resolved = new Map();
+    resolvedByTrace.set(trace, resolved);
+  }
+  const key = (i: number) => `${i}:${visual.name}`;
+  const hit = resolved.get(key(stepIdx));
+
+  if (!hit) {
+    // Walk back to a keyframe (or a step we already rebuilt), collecting diffs
+    const chain: { idx: number; diff: any }[] = [];
+    let base: ResolvedGrid | null = null;
+    for (let i = stepIdx; i >= 0; ) {
+      // Step not fetched yet (paged trace): can't replay past it
+      if (!(i in trace)) break;
+      const v = i === stepIdx ? visual : findGrid(trace[i], visual.name);
+      if (!v) {
+        i--;
+        continue;
+      }
+      const cached = i !== stepIdx ? resolved.get(key(i)) : undefined;
+      if (cached) {
+        base = cached;
+        break;
+      }
+      if (!v.delta) {
+        base = {
+          cells: v.cells,
+          stateMap: new Map((v.cellStates || []).map((cs: any) => [`${cs.row},${cs.col}`, cs])),
+          visual: v,
+        };
+        resolved.set(key(i), base);
+        break;
+      }
+      chain.push({ idx: i, diff: v });
+      // Jump straight to the previous emission (older traces: scan back)
+      i -= v.prevOffset || 1;
+    }
+    if (!base) {
+      // Keyframe not in this trace (e.g. truncated) or not loaded yet; show an empty grid rather than crash
+      return { ...visual, cells: Array.from({ length: visual.rows }, () => Array(visual.cols).fill(null)), cellStates: [] };
+    }
+    for (let j = chain.length - 1; j >= 0; j--) {
+      base = applyDiff(base, chain[j].diff);
+      resolved.set(key(chain[j].idx), base);
+    }
+  }
+
+  const grid = resolved.get(key(stepIdx))!;
+  return {
+    ...visual,
+    cells: grid.cells,
+    cellStates: Array.from(grid.stateMap.values()),
+    changedCells: (visual.cellDiffs || []).map(([r, c]: [number, number]) => [r, c]),
+  };
+}
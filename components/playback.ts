@@ -0,0 +1,127 @@
+import { useEffect, useLayoutEffect, useRef, useState } from 'react';
+
+// Autoplay driven by requestAnimationFrame. Playback position advances with
+// wall time (speed steps per second), and at most one step is committed per
+// display frame: at high speeds, or when rendering a step takes longer than a
+// frame, the intermediate steps are skipped rather than queued. Seeking is
+// just setting the step index; the visuals resolve any step directly (see
+// gridDiffs.ts).
+
+export const PLAYBACK_SPEEDS = [1, 3, 10, 30, 100, 300, 1000, 3000];
+
+// Longest frame gap counted as playback time (e.g. after a background tab)
+const MAX_FRAME_GAP_MS = 250;
+const STATS_INTERVAL_MS = 500;
+
+export type PlaybackStats = {
+  fps: number;
+  droppedFrames: number; // Display frames missed since playback started
+  skippedSteps: number; // Steps passed over without being rendered
+  renderMs: number; // Smoothed time from committing a step to its render finishing
+};
+
+const EMPTY_STATS: PlaybackStats = { fps: 0, droppedFrames: 0, skippedSteps: 0, renderMs: 0 };
+
+type PlaybackOptions = {
+  playing: boolean;
+  speed: number;
+  totalSteps: number;
+  stepIdx: number;
+  setStepIdx: (idx: number) => void;
+  onEnd: () => void;
+  // Paged traces: playback waits at steps that aren't loaded yet
+  isReady?: (idx: number) => boolean;
+};
+
+export function usePlayback({ playing, speed, totalSteps, stepIdx, setStepIdx, onEnd, isReady }: PlaybackOptions): PlaybackStats {
+  const [stats, setStats] = useState<PlaybackStats>(EMPTY_STATS);
+  const current = useRef(stepIdx);
+  const committedAt = useRef<number | null>(null);
+  const renderMs = useRef(0);
+  const callbacks = useRef({ setStepIdx, onEnd, isReady });
+  callbacks.current = { setStepIdx, onEnd, isReady };
+
+  // Runs after the step's render is committed: measure how long it took
+  useLayoutEffect(() => {
+    current.current = stepIdx;
+    if (committedAt.current !== null) {
+      const ms = performance.now() - committedAt.current;
+      renderMs.current = renderMs.current ? renderMs.current * 0.8 + ms * 0.2 : ms;
+      committedAt.current = null;
+    }
+  }, [stepIdx]);
+
+  useEffect(() => {
+    if (!playing || totalSteps < 2) return;
+    let frame = 0;
+    let last = performance.now();
+    let position = current.current;
+    let committed = current.current;
+    // Display frame interval, estimated from the shortest gap seen
+    let frameMs = 1000 / 60;
+    let frames = 0;
+    let droppedFrames = 0;
+    let skippedSteps = 0;
+    let windowStart = last;
+    let windowFrames = 0;
+    renderMs.current = 0;
+    setStats(EMPTY_STATS);
+
+    const tick = (now: number) => {
+      const gap = now - last;
+      last = now;
+      if (frames > 0) {
+        frameMs = Math.max(4, Math.min(frameMs, gap));
+        droppedFrames += Math.max(0, Math.round(gap / frameMs) - 1);
+      }
+      frames++;
+      windowFrames++;
+
+      // The user moved the slider (or stepped) while playing: continue from there
+      if (current.current !== committed) {
+        committed = current.current;
+        position = committed;
+      }
+      position = Math.min(position + (Math.min(gap, MAX_FRAME_GAP_MS) * speed) / 1000, totalSteps - 1);
+      const ready = callbacks.current.isReady;
+      if (ready && !ready(Math.floor(position))) {
+        // Wait for the page holding the position; play on through what is loaded
+        let loaded = Math.floor(position);
+        while (loaded > committed && !ready(loaded)) loaded--;
+        position = loaded;
+      }
+      // A commit that never rendered (e.g. the panel unmounted mid-frame) must not stall playback
+      if (committedAt.current !== null && now - committedAt.current > MAX_FRAME_GAP_MS) committedAt.current = null;
+      // Commit at most one step per frame, and none while the previous one is still rendering
+      const target = Math.floor(position);
+      if (committedAt.current === null && target !== committed) {
+        skippedSteps += Math.max(0, target - committed - 1);
+        committedAt.current = performance.now();
+        committed = target;
+        current.current = target;
+        callbacks.current.setStepIdx(target);
+      }
+
+      if (now - windowStart >= STATS_INTERVAL_MS) {
+        setStats({
+          fps: Math.round((windowFrames * 1000) / (now - windowStart)),
+          droppedFrames,
+          skippedSteps,
+          renderMs: Math.round(renderMs.current * 10) / 10,
+        });
+        windowStart = now;
+        windowFrames = 0;
+      }
+
+      if (committed >= totalSteps - 1) {
+        callbacks.current.onEnd();
+        return;
+      }
+      frame = requestAnimationFrame(tick);
+    };
+    frame = requestAnimationFrame(tick);
+    return () => cancelAnimationFrame(frame);
+  }, [playing, speed, totalSteps]);
+
+  return stats;
+}
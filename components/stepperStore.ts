@@ -5,6 +5,8 @@ interface StepperState {
   setStepIdx: (idx: number | ((prev: number) => number)) => void;
   autoPlay: boolean;
   setAutoPlay: (autoPlay: boolean | ((prev: boolean) => boolean)) => void;
+  speed: number; // Autoplay speed in steps per second
+  setSpeed: (speed: number) => void;
 }
 
 export const useStepperStore = create<StepperState>((set) => ({
@@ -18,4 +20,6 @@ export const useStepperStore = create<StepperState>((set) => ({
     set((state) => ({
       autoPlay: typeof autoPlay === 'function' ? autoPlay(state.autoPlay) : autoPlay,
     })),
+  speed: 3,
+  setSpeed: (speed) => set({ speed: Math.max(0.1, speed) }),
 })); 
\ No newline at end of file
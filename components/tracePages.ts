@@ -0,0 +1,47 @@
+// Paged traces: /api/run (options.paged) returns a trace id, the total step
+// count and the first page. The client holds a sparse array of totalSteps
+// entries and fills pages in as the stepper moves (see VisualizerPanel).
+
+// At least the grid keyframe interval (py_grid.KEYFRAME_INTERVAL, in steps):
+// a grid diff's keyframe is then always on the current page or the one before
+export const TRACE_PAGE_SIZE = 128;
+
+export function createPagedTrace(firstPage: any[], totalSteps: number): any[] {
+  const trace = new Array(Math.max(totalSteps, firstPage.length));
+  firstPage.forEach((step, i) => {
+    trace[i] = step;
+  });
+  return trace;
+}
+
+function pageLoaded(trace: any[], page: number, pageSize: number) {
+  return trace[page * pageSize] !== undefined;
+}
+
+// Pages to fetch for stepIdx: its own, the previous one (grid diffs replay from
+// an earlier keyframe, variable highlights compare with the previous step) and
+// the next `ahead` ones, prefetched for stepping / autoplay
+export function pagesToLoad(trace: any[], stepIdx: number, pageSize = TRACE_PAGE_SIZE, ahead = 1): number[] {
+  const current = Math.floor(stepIdx / pageSize);
+  const lastPage = Math.floor((trace.length - 1) / pageSize);
+  const pages = [current, current - 1];
+  for (let k = 1; k <= ahead; k++) pages.push(current + k);
+  return pages.filter(
+    page => page >= 0 && page <= lastPage && !pageLoaded(trace, page, pageSize)
+  );
+}
+
+export async function fetchTracePage(traceId: string, page: number, pageSize = TRACE_PAGE_SIZE): Promise<any[]> {
+  const res = await fetch(`/api/run/trace/${traceId}?start=${page * pageSize}&count=${pageSize}`);
+  if (!res.ok) throw new Error(`Failed to load steps ${page * pageSize}+ (${res.status})`);
+  const data = await res.json();
+  return data.steps || [];
+}
+
+// Write a fetched page into the sparse trace in place, so per-trace caches
+// (e.g. resolveGridVisual) stay valid
+export function fillPage(trace: any[], page: number, steps: any[], pageSize = TRACE_PAGE_SIZE) {
+  steps.forEach((step, i) => {
+    trace[page * pageSize + i] = step;
+  });
+}